@@ -0,0 +1,351 @@
+"""
+CRAWLER - Concurrent scraper for the uOttawa events listing and detail pages
+asyncio drives the crawl; pages are fetched through a pooled requests
+session on a bounded thread pool (same approach as AsyncSupabaseClient),
+with per-host politeness limits (robots.txt rules and Crawl-delay are
+honoured) and ETag/Last-Modified revalidation so unchanged pages are not
+downloaded or parsed again
+"""
+
+import os
+import re
+import json
+import time
+import sqlite3
+import asyncio
+from datetime import datetime
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urldefrag, urlparse
+from urllib.robotparser import RobotFileParser
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SCRAPER_START_URL = os.getenv('SCRAPER_START_URL', 'https://www.uottawa.ca/en/events-all')
+# Links that lead to event detail pages / further listing pages
+CRAWLER_DETAIL_PATTERN = os.getenv('CRAWLER_DETAIL_PATTERN', r'/en/(news-all/)?events?/[^?#]+')
+CRAWLER_LISTING_PATTERN = os.getenv('CRAWLER_LISTING_PATTERN', r'[?&]page=\d+')
+CRAWLER_CONCURRENCY = int(os.getenv('CRAWLER_CONCURRENCY', '16'))
+# Politeness: concurrent requests per host, and an opt-in minimum gap in seconds
+# between request starts per host (a longer Crawl-delay in the host's robots.txt wins)
+CRAWLER_PER_HOST = int(os.getenv('CRAWLER_PER_HOST', '2'))
+CRAWLER_HOST_DELAY = float(os.getenv('CRAWLER_HOST_DELAY', '0'))
+CRAWLER_OBEY_ROBOTS = os.getenv('CRAWLER_OBEY_ROBOTS', 'true').lower() == 'true'
+CRAWLER_MAX_PAGES = int(os.getenv('CRAWLER_MAX_PAGES', '500'))
+CRAWLER_TIMEOUT = float(os.getenv('CRAWLER_TIMEOUT', '10'))
+CRAWLER_CACHE_PATH = os.getenv('CRAWLER_CACHE_PATH', 'backend/data/crawler_cache.db')
+CRAWLER_USER_AGENT = os.getenv('CRAWLER_USER_AGENT', 'uOttawa-AI-Buddy-Scraper/1.0')
+
+CHUNK_SIZE = 16 * 1024
+VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta',
+             'param', 'source', 'track', 'wbr'}
+ISO_DATE_RE = re.compile(r'\d{4}-\d{2}-\d{2}')
+
+
+class PageParser(HTMLParser):
+    """
+    Streaming parser fed chunk by chunk while the page downloads.
+    Collects links plus the event fields of a detail page.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.links = []
+        self.fields = {}
+        self._meta = {}
+        self._capture = None   # (field, depth) while inside an element of interest
+        self._depth = 0
+        self._text = []
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'a' and attrs.get('href'):
+            self.links.append(attrs['href'])
+        elif tag == 'meta':
+            key = attrs.get('property') or attrs.get('name') or attrs.get('itemprop')
+            if key and attrs.get('content'):
+                self._meta.setdefault(key.lower(), attrs['content'])
+        elif tag == 'time' and attrs.get('datetime'):
+            self._meta.setdefault('time', attrs['datetime'])
+
+        if tag in VOID_TAGS:
+            if tag == 'br' and self._capture:
+                self._text.append(' ')
+            return
+        self._depth += 1
+        if self._capture is None:
+            field = self._field_for(tag, attrs.get('class') or '')
+            if field and field not in self.fields:
+                self._capture = (field, self._depth)
+                self._text = []
+
+    def _field_for(self, tag, classes):
+        if tag == 'h1':
+            return 'title'
+        classes = classes.lower()
+        if 'location' in classes or 'venue' in classes:
+            return 'location'
+        if tag != 'time' and ('event-time' in classes or 'hours' in classes or 'time' in classes.split()):
+            return 'event_time'
+        if tag == 'p':
+            return 'description'
+        return None
+
+    def handle_endtag(self, tag):
+        if tag in VOID_TAGS:
+            return
+        if self._capture and self._capture[1] == self._depth:
+            text = ' '.join(''.join(self._text).split())
+            if text:
+                self.fields[self._capture[0]] = text
+            self._capture = None
+        self._depth = max(0, self._depth - 1)
+
+    def handle_data(self, data):
+        if self._capture:
+            self._text.append(data)
+
+    def event(self):
+        """Event dict in the scraper's shape, or None when this is not an event page"""
+        title = self.fields.get('title') or self._meta.get('og:title')
+        when = self._meta.get('time') or self._meta.get('startdate') or self._meta.get('event:start_time') or ''
+        match = ISO_DATE_RE.search(when)
+        if not title or not match:
+            return None
+        return {
+            "title": title,
+            "description": self._meta.get('og:description') or self._meta.get('description')
+                           or self.fields.get('description', ''),
+            "event_date": match.group(0),
+            "event_time": self.fields.get('event_time', ''),
+            "location": self.fields.get('location', ''),
+            "category": "discovered",
+            "type": "Event",
+            "target_programs": [],
+            "target_ethnicity": [],
+            "target_interests": [],
+            "created_at": datetime.now().isoformat(),
+            "posted_by": "Auto-scraper"
+        }
+
+
+class PageCache:
+    """Validators and parse results per URL, for conditional GETs"""
+
+    def __init__(self, path=CRAWLER_CACHE_PATH):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                result TEXT NOT NULL,
+                fetched_at REAL NOT NULL
+            )
+        """)
+        self._db.commit()
+
+    def get(self, url):
+        row = self._db.execute("SELECT etag, last_modified, result FROM pages WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return None
+        return {"etag": row[0], "last_modified": row[1], "result": json.loads(row[2])}
+
+    def put(self, url, etag, last_modified, result):
+        self._db.execute("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?)",
+                         (url, etag, last_modified, json.dumps(result), time.time()))
+
+    def commit(self):
+        self._db.commit()
+
+
+class _HostLimiter:
+    """Per-host concurrency cap plus a minimum gap between request starts"""
+
+    def __init__(self, concurrency, delay):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.delay = delay
+        self.lock = asyncio.Lock()
+        self.next_start = 0.0
+
+    async def __aenter__(self):
+        await self.semaphore.acquire()
+        async with self.lock:
+            wait = self.next_start - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self.next_start = time.monotonic() + self.delay
+
+    async def __aexit__(self, *exc):
+        self.semaphore.release()
+
+
+class Crawler:
+    """Breadth-first crawl from a listing page; returns the parsed events"""
+
+    def __init__(self, start_url=SCRAPER_START_URL, concurrency=CRAWLER_CONCURRENCY,
+                 per_host=CRAWLER_PER_HOST, host_delay=CRAWLER_HOST_DELAY,
+                 max_pages=CRAWLER_MAX_PAGES, timeout=CRAWLER_TIMEOUT, cache=None,
+                 detail_pattern=CRAWLER_DETAIL_PATTERN, listing_pattern=CRAWLER_LISTING_PATTERN, on_event=None,
+                 stop=None):
+        self.start_url = start_url
+        self.on_event = on_event   # Called with each event as soon as its page is parsed
+        self.stop = stop           # threading.Event: once set, queued pages are dropped and the crawl ends
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.host_delay = host_delay
+        self.max_pages = max_pages
+        self.timeout = timeout
+        self.cache = cache or PageCache()
+        self.detail_re = re.compile(detail_pattern)
+        self.listing_re = re.compile(listing_pattern)
+        self.stats = {"fetched": 0, "not_modified": 0, "errors": 0, "disallowed": 0, "events": 0}
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers['User-Agent'] = CRAWLER_USER_AGENT
+
+    def _fetch(self, url, cached):
+        """Blocking conditional GET, parsed while streaming (runs on the thread pool)"""
+        headers = {}
+        if cached:
+            if cached['etag']:
+                headers['If-None-Match'] = cached['etag']
+            if cached['last_modified']:
+                headers['If-Modified-Since'] = cached['last_modified']
+
+        with self.session.get(url, headers=headers, timeout=self.timeout, stream=True) as response:
+            if response.status_code == 304 and cached:
+                return 304, cached['result'], None
+            if response.status_code != 200:
+                return response.status_code, None, None
+
+            response.encoding = response.encoding or 'utf-8'
+            parser = PageParser()
+            for chunk in response.iter_content(CHUNK_SIZE, decode_unicode=True):
+                parser.feed(chunk)
+            parser.close()
+
+            result = {"links": parser.links, "event": parser.event()}
+            validators = (response.headers.get('ETag'), response.headers.get('Last-Modified'))
+            return 200, result, validators
+
+    def _robots(self, url):
+        """Blocking fetch of the robots.txt of url's host; None when robots.txt is ignored"""
+        if not CRAWLER_OBEY_ROBOTS:
+            return None
+        parts = urlparse(url)
+        robots = RobotFileParser(f"{parts.scheme}://{parts.netloc}/robots.txt")
+        try:
+            response = self.session.get(robots.url, timeout=self.timeout)
+        except requests.RequestException as e:
+            print(f"  ⚠️  {robots.url}: {e}")
+            robots.allow_all = True
+            return robots
+        # Same reading as RobotFileParser.read(): 401/403 forbid everything, other errors allow it
+        if response.status_code in (401, 403):
+            robots.disallow_all = True
+        elif response.status_code >= 400:
+            robots.allow_all = True
+        else:
+            robots.parse(response.text.splitlines())
+        return robots
+
+    async def _open_host(self, loop, executor, url):
+        """(limiter, robots) for url's host, fetched once per host and crawl"""
+        robots = await loop.run_in_executor(executor, self._robots, url)
+        delay = self.host_delay
+        if robots is not None:
+            delay = max(delay, float(robots.crawl_delay(CRAWLER_USER_AGENT) or 0))
+        return _HostLimiter(self.per_host, delay), robots
+
+    def _classify(self, base, href):
+        """'detail', 'listing' or None for a link found on base"""
+        url = urldefrag(urljoin(base, href))[0]
+        if urlparse(url).netloc != urlparse(self.start_url).netloc:
+            return None, url
+        if self.listing_re.search(url):
+            return 'listing', url
+        if self.detail_re.search(urlparse(url).path):
+            return 'detail', url
+        return None, url
+
+    async def crawl(self):
+        loop = asyncio.get_running_loop()
+        executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='crawler')
+        hosts = {}
+        queue = asyncio.Queue()
+        seen = {self.start_url}
+        events = {}
+
+        await queue.put((self.start_url, 'listing'))
+
+        async def worker():
+            while True:
+                url, kind = await queue.get()
+                try:
+                    if self.stop is not None and self.stop.is_set():
+                        continue
+                    host = urlparse(url).netloc
+                    if host not in hosts:
+                        hosts[host] = asyncio.ensure_future(self._open_host(loop, executor, url))
+                    limiter, robots = await hosts[host]
+                    if robots is not None and not robots.can_fetch(CRAWLER_USER_AGENT, url):
+                        self.stats["disallowed"] += 1
+                        continue
+                    cached = self.cache.get(url)
+                    async with limiter:
+                        status, result, validators = await loop.run_in_executor(executor, self._fetch, url, cached)
+
+                    if result is None:
+                        self.stats["errors"] += 1
+                        continue
+                    if status == 304:
+                        self.stats["not_modified"] += 1
+                    else:
+                        self.stats["fetched"] += 1
+                        self.cache.put(url, validators[0], validators[1], result)
+
+                    if result.get('event') and url not in events:
+                        events[url] = result['event']
+                        if self.on_event:
+                            self.on_event(result['event'])
+                    # Only listing pages are expanded; detail pages are leaves
+                    if kind == 'listing':
+                        for href in result['links']:
+                            link_kind, link = self._classify(url, href)
+                            if link_kind and link not in seen and len(seen) < self.max_pages:
+                                seen.add(link)
+                                queue.put_nowait((link, link_kind))
+                except Exception as e:
+                    self.stats["errors"] += 1
+                    print(f"  ⚠️  {url}: {e}")
+                finally:
+                    queue.task_done()
+
+        workers = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+        try:
+            await queue.join()
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            executor.shutdown(wait=False)
+            self.cache.commit()
+
+        self.stats["events"] = len(events)
+        return list(events.values())
+
+    def run(self):
+        """Crawl synchronously (for callers outside an event loop)"""
+        return asyncio.run(self.crawl())
+
+    def close(self):
+        self.session.close()
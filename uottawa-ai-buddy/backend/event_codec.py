@@ -0,0 +1,437 @@
+"""
+EVENT CODEC - Versioned compact binary encoding for bus and log records
+Pure stdlib (struct): tagged values with varints, a per-record string table,
+a static dictionary of known keys/tags, raw 16-byte UUIDs, and fixed field
+layouts for NEW_OPPORTUNITY and MATCHES_FOUND so their keys are not stored.
+Payloads that do not start with the magic byte are read as JSON, so records
+written before this codec keep decoding
+
+Usage:
+    python backend/event_codec.py export <event log topic dir | segment | .bin log | .json log>
+    python backend/event_codec.py bench
+"""
+
+import re
+import sys
+import json
+import uuid
+import struct
+
+MAGIC = 0xEC
+VERSION = 1
+
+KIND_GENERIC = 0
+KIND_NEW_OPPORTUNITY = 1
+KIND_MATCHES_FOUND = 2
+
+# Value tags
+T_NONE, T_FALSE, T_TRUE, T_INT, T_FLOAT, T_STR, T_LIST, T_DICT, T_UUID = range(9)
+
+_FLOAT = struct.Struct('>d')
+UUID_RE = re.compile(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$')
+
+# Version 1 static dictionary: strings referenced by index instead of stored.
+# Append-only within a version; reordering requires bumping VERSION.
+STATIC_STRINGS = (
+    # Envelope and common keys
+    'type', 'topic', 'data', 'timestamp', 'NEW_OPPORTUNITY', 'MATCHES_FOUND',
+    'opportunities/new', 'matches/found', 'id', 'title', 'description',
+    'event_date', 'event_time', 'location', 'category', 'posted_by', 'created_at',
+    'target_programs', 'target_years', 'target_interests', 'opportunity_id',
+    'opportunity_title', 'matches', 'match_count', 'student_id', 'match_score',
+    'reasoning', 'opportunity', 'total_matches', 'status',
+    'sent', 'discovered', 'Event', 'Auto-scraper', 'All Programs',
+    # Programs (frontend/js/constants.js at version 1)
+    'Software Engineering', 'Computer Science', 'Commercial Sciences / Business',
+    'Nursing', 'Law', 'Arts and Sciences', 'Civil Engineering', 'Psychology',
+    'Biology', 'Mechanical Engineering', 'Electrical Engineering', 'Other',
+    # Interests
+    'Research', 'Academic Writing', 'Study Groups', 'Tutoring', 'Networking',
+    'Career Development', 'Entrepreneurship', 'Leadership',
+    'Artificial Intelligence', 'Web Development', 'Coding', 'Hackathons',
+    'Robotics', 'Video Games', 'Gaming',
+    'Music & Concerts', 'Dance', 'Theatre', 'Visual Arts', 'Film',
+    'Photography', 'Graphic Design', 'Reading',
+    'Competitive Sports', 'Fitness', 'Yoga', 'Mental Health', 'Meditation',
+    'Volunteering', 'Community Service', 'Sustainability', 'Social Justice',
+    'Politics',
+    'Cooking', 'Traveling', 'Writing', 'Languages', 'Board Games',
+    # Match idempotency keys
+    'idempotency_key'
+)
+_STATIC_INDEX = {s: i for i, s in enumerate(STATIC_STRINGS)}
+
+# Fixed field layouts (keys not listed here go into a trailing extras dict)
+OPPORTUNITY_FIELDS = (
+    'id', 'title', 'description', 'event_date', 'event_time', 'location', 'category',
+    'type', 'posted_by', 'created_at', 'target_programs', 'target_years', 'target_interests'
+)
+MATCH_FIELDS = ('student_id', 'match_score', 'reasoning')
+MATCHES_FOUND_FIELDS = ('opportunity_id', 'opportunity_title', 'matches', 'match_count')
+ENVELOPE_FIELDS = ('topic', 'timestamp', 'data')
+
+EVENT_KINDS = {'NEW_OPPORTUNITY': KIND_NEW_OPPORTUNITY, 'MATCHES_FOUND': KIND_MATCHES_FOUND}
+KIND_TYPES = {v: k for k, v in EVENT_KINDS.items()}
+
+
+class CodecError(ValueError):
+    """Raised when a payload cannot be decoded"""
+
+
+class _Writer:
+    def __init__(self):
+        self.out = bytearray()
+        self.strings = {}
+
+    def varint(self, n):
+        if n < 0x80:
+            self.out.append(n)
+            return
+        while n >= 0x80:
+            self.out.append((n & 0x7F) | 0x80)
+            n >>= 7
+        self.out.append(n)
+
+    def string(self, s):
+        """0 = new inline string, 1..k = static entry, k+1.. = earlier string in this record"""
+        static = _STATIC_INDEX.get(s)
+        if static is not None:
+            self.varint(1 + static)
+            return
+        seen = self.strings.get(s)
+        if seen is not None:
+            self.varint(1 + len(STATIC_STRINGS) + seen)
+            return
+        self.strings[s] = len(self.strings)
+        data = s.encode('utf-8')
+        self.varint(0)
+        self.varint(len(data))
+        self.out += data
+
+    def value(self, v):
+        t = type(v)  # Exact-type checks first: str/int/float dominate event payloads
+        if t is str:
+            if len(v) == 36 and v[8] == '-' and UUID_RE.match(v):
+                self.out.append(T_UUID)
+                self.out += bytes.fromhex(v.replace('-', ''))
+            else:
+                self.out.append(T_STR)
+                self.string(v)
+        elif v is None:
+            self.out.append(T_NONE)
+        elif t is bool:
+            self.out.append(T_TRUE if v else T_FALSE)
+        elif t is int:
+            self.out.append(T_INT)
+            self.varint((v << 1) if v >= 0 else ((-v << 1) - 1))  # zigzag
+        elif t is float:
+            self.out.append(T_FLOAT)
+            self.out += _FLOAT.pack(v)
+        elif t is dict:
+            self.out.append(T_DICT)
+            self.varint(len(v))
+            for key, item in v.items():
+                if type(key) is not str:
+                    raise TypeError(f"Keys must be str, not {type(key).__name__}")
+                self.string(key)
+                self.value(item)
+        elif t is list or t is tuple:
+            self.out.append(T_LIST)
+            self.varint(len(v))
+            for item in v:
+                self.value(item)
+        # Subclasses (IntEnum, OrderedDict, ...) are stored as their base type
+        elif isinstance(v, bool):
+            self.value(bool(v))
+        elif isinstance(v, int):
+            self.value(int(v))
+        elif isinstance(v, float):
+            self.value(float(v))
+        elif isinstance(v, str):
+            self.value(str(v))
+        elif isinstance(v, dict):
+            self.value(dict(v))
+        elif isinstance(v, (list, tuple)):
+            self.value(list(v))
+        else:
+            raise TypeError(f"Object of type {type(v).__name__} is not serializable")
+
+    def record(self, d, fields, nested=None):
+        """Presence bitmap, present fields in layout order, then a dict of the other keys"""
+        present = 0
+        for i, field in enumerate(fields):
+            if field in d:
+                present |= 1 << i
+        self.varint(present)
+        for field in fields:
+            if field in d:
+                if nested and field in nested:
+                    nested[field](self, d[field])
+                else:
+                    self.value(d[field])
+        self.value({k: v for k, v in d.items() if k not in fields})
+
+
+class _Reader:
+    def __init__(self, data, pos=0):
+        self.data = data
+        self.pos = pos
+        self.strings = []
+
+    def byte(self):
+        try:
+            b = self.data[self.pos]
+        except IndexError:
+            raise CodecError("Truncated payload")
+        self.pos += 1
+        return b
+
+    def take(self, n):
+        if self.pos + n > len(self.data):
+            raise CodecError("Truncated payload")
+        chunk = self.data[self.pos:self.pos + n]
+        self.pos += n
+        return chunk
+
+    def varint(self):
+        b = self.byte()
+        if b < 0x80:
+            return b
+        result, shift = b & 0x7F, 7
+        while True:
+            b = self.byte()
+            result |= (b & 0x7F) << shift
+            if b < 0x80:
+                return result
+            shift += 7
+
+    def string(self):
+        ref = self.varint()
+        if ref == 0:
+            s = bytes(self.take(self.varint())).decode('utf-8')
+            self.strings.append(s)
+            return s
+        if ref <= len(STATIC_STRINGS):
+            return STATIC_STRINGS[ref - 1]
+        try:
+            return self.strings[ref - 1 - len(STATIC_STRINGS)]
+        except IndexError:
+            raise CodecError(f"Bad string reference {ref}")
+
+    def value(self):
+        tag = self.byte()
+        # Most frequent tags first
+        if tag == T_STR:
+            return self.string()
+        if tag == T_INT:
+            n = self.varint()
+            return (n >> 1) if not n & 1 else -((n + 1) >> 1)
+        if tag == T_UUID:
+            h = self.take(16).hex()
+            return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+        if tag == T_FLOAT:
+            return _FLOAT.unpack(self.take(8))[0]
+        if tag == T_DICT:
+            d = {}
+            for _ in range(self.varint()):
+                key = self.string()
+                d[key] = self.value()
+            return d
+        if tag == T_LIST:
+            return [self.value() for _ in range(self.varint())]
+        if tag == T_NONE:
+            return None
+        if tag == T_TRUE:
+            return True
+        if tag == T_FALSE:
+            return False
+        raise CodecError(f"Unknown value tag {tag}")
+
+    def record(self, fields, nested=None):
+        present = self.varint()
+        d = {}
+        for i, field in enumerate(fields):
+            if present & (1 << i):
+                d[field] = nested[field](self) if nested and field in nested else self.value()
+        d.update(self.value())
+        return d
+
+
+def _is_records(v):
+    return isinstance(v, list) and all(isinstance(item, dict) for item in v)
+
+
+def _write_matches(w, matches):
+    # Match lists are usually lists of dicts; anything else is stored as a plain value
+    if not _is_records(matches):
+        w.out.append(0)
+        w.value(matches)
+        return
+    w.out.append(1)
+    w.varint(len(matches))
+    for match in matches:
+        w.record(match, MATCH_FIELDS)
+
+
+def _read_matches(r):
+    if r.byte() == 0:
+        return r.value()
+    return [r.record(MATCH_FIELDS) for _ in range(r.varint())]
+
+
+def _write_opportunity(w, data):
+    if not isinstance(data, dict):
+        w.out.append(0)
+        w.value(data)
+        return
+    w.out.append(1)
+    w.record(data, OPPORTUNITY_FIELDS)
+
+
+def _read_opportunity(r):
+    return r.record(OPPORTUNITY_FIELDS) if r.byte() else r.value()
+
+
+def _write_matches_found(w, data):
+    if not isinstance(data, dict):
+        w.out.append(0)
+        w.value(data)
+        return
+    w.out.append(1)
+    w.record(data, MATCHES_FOUND_FIELDS, {'matches': _write_matches})
+
+
+def _read_matches_found(r):
+    return r.record(MATCHES_FOUND_FIELDS, {'matches': _read_matches}) if r.byte() else r.value()
+
+
+_DATA_WRITERS = {KIND_NEW_OPPORTUNITY: _write_opportunity, KIND_MATCHES_FOUND: _write_matches_found}
+_DATA_READERS = {KIND_NEW_OPPORTUNITY: _read_opportunity, KIND_MATCHES_FOUND: _read_matches_found}
+
+
+def encode(record):
+    """Encode an event (or any JSON-compatible value) to bytes"""
+    w = _Writer()
+    kind = EVENT_KINDS.get(record.get('type')) if isinstance(record, dict) else None
+    w.out += bytes((MAGIC, VERSION, kind or KIND_GENERIC))
+    if kind is None:
+        w.value(record)
+    else:
+        body = {k: v for k, v in record.items() if k != 'type'}
+        w.record(body, ENVELOPE_FIELDS, {'data': _DATA_WRITERS[kind]})
+    return bytes(w.out)
+
+
+def decode(payload):
+    """Decode bytes from encode(); legacy JSON payloads are accepted too"""
+    if not payload or payload[0] != MAGIC:
+        return json.loads(bytes(payload).decode('utf-8'))
+    if len(payload) < 3:
+        raise CodecError("Truncated header")
+    version, kind = payload[1], payload[2]
+    if version != VERSION:
+        raise CodecError(f"Unsupported codec version {version}")
+
+    r = _Reader(payload, 3)
+    if kind == KIND_GENERIC:
+        return r.value()
+    if kind not in _DATA_READERS:
+        raise CodecError(f"Unknown record kind {kind}")
+    body = r.record(ENVELOPE_FIELDS, {'data': _DATA_READERS[kind]})
+    return {'type': KIND_TYPES[kind], **body}
+
+
+def export(path, out=sys.stdout):
+    """Print the records of an event log topic/segment or a log file as JSON lines"""
+    import os
+    from event_log import TopicLog, SEGMENT_SUFFIX
+    from log_writer import read_records
+
+    if os.path.isdir(path):
+        topic_log = TopicLog(os.path.dirname(path.rstrip('/')) or '.', os.path.basename(path.rstrip('/')))
+        offset, position = 0, None
+        while True:
+            records, position = topic_log.read(offset, 1000, position)
+            if not records:
+                break
+            for offset, payload in records:
+                out.write(json.dumps({"offset": offset, **_as_dict(decode(payload))}) + '\n')
+            offset += 1
+        return
+
+    if path.endswith(SEGMENT_SUFFIX):
+        directory = os.path.dirname(path)
+        topic_log = TopicLog(os.path.dirname(directory) or '.', os.path.basename(directory))
+        base = int(os.path.basename(path)[:-len(SEGMENT_SUFFIX)])
+        records, _ = topic_log.read(base, sys.maxsize, (base, 0))
+        for offset, payload in records:
+            out.write(json.dumps({"offset": offset, **_as_dict(decode(payload))}) + '\n')
+        return
+
+    for record in read_records(path):
+        out.write(json.dumps(record) + '\n')
+
+
+def _as_dict(record):
+    return record if isinstance(record, dict) else {"value": record}
+
+
+def benchmark(rounds=2000):
+    """Compare encode/decode speed and size against JSON on representative events"""
+    import time
+    import random
+    from scraper_agent import _curated_events
+    from scoring_engine import PROGRAMS as programs, INTERESTS as interests
+
+    random.seed(0)
+    events = []
+    # The fixed curated corpus: the benchmark stays offline and comparable between runs
+    for i, opportunity in enumerate(_curated_events()):
+        opportunity = dict(opportunity, id=str(uuid.UUID(int=random.getrandbits(128))),
+                           target_programs=random.sample(programs, 2),
+                           target_interests=random.sample(interests, 3), target_years=[1, 2])
+        events.append({"type": "NEW_OPPORTUNITY", "topic": "opportunities/new",
+                       "data": opportunity, "timestamp": time.time()})
+        events.append({"type": "MATCHES_FOUND", "topic": "matches/found", "timestamp": time.time(), "data": {
+            "opportunity_id": opportunity['id'],
+            "opportunity_title": opportunity['title'],
+            "matches": [{
+                "student_id": str(uuid.UUID(int=random.getrandbits(128))),
+                "match_score": random.randint(65, 98),
+                "reasoning": f"Matches {random.choice(programs)}, Year {random.randint(1, 4)}"
+            } for _ in range(15)],
+            "match_count": 15
+        }})
+
+    formats = {
+        'json': (lambda e: json.dumps(e).encode('utf-8'), lambda p: json.loads(p.decode('utf-8'))),
+        'binary': (encode, decode),
+    }
+    print(f"{'format':<8} {'bytes/event':>12} {'encode/s':>12} {'decode/s':>12}")
+    for name, (enc, dec) in formats.items():
+        payloads = [enc(e) for e in events]
+        assert [dec(p) for p in payloads] == events, f"{name} round trip failed"
+
+        start = time.perf_counter()
+        for _ in range(rounds // len(events) + 1):
+            for e in events:
+                enc(e)
+        encode_rate = (rounds // len(events) + 1) * len(events) / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for _ in range(rounds // len(events) + 1):
+            for p in payloads:
+                dec(p)
+        decode_rate = (rounds // len(events) + 1) * len(events) / (time.perf_counter() - start)
+
+        size = sum(len(p) for p in payloads) / len(payloads)
+        print(f"{name:<8} {size:>12.0f} {encode_rate:>12.0f} {decode_rate:>12.0f}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 3 and sys.argv[1] == 'export':
+        export(sys.argv[2])
+    elif len(sys.argv) >= 2 and sys.argv[1] == 'bench':
+        benchmark()
+    else:
+        print(__doc__)
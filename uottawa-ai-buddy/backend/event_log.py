@@ -0,0 +1,245 @@
+"""
+EVENT LOG - Durable, offset-addressed event log (local stand-in for Solace queues)
+Each topic is a directory of append-only segment files. Every record gets a
+monotonically increasing offset; consumers keep their own committed offset
+so they can resume after a crash without dropping or re-reading events
+"""
+
+import os
+import json
+import mmap
+import zlib
+import struct
+import bisect
+import threading
+from dotenv import load_dotenv
+import event_codec
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are only serialized within one process
+    fcntl = None
+
+load_dotenv()
+
+EVENT_LOG_DIR = os.getenv('EVENT_LOG_DIR', 'backend/data/event_log')
+EVENT_LOG_SEGMENT_BYTES = int(os.getenv('EVENT_LOG_SEGMENT_BYTES', str(64 * 1024 * 1024)))
+# 'binary' (event_codec) or 'json'; both are always readable
+EVENT_ENCODING = os.getenv('EVENT_ENCODING', 'binary')
+
+# Record header: offset (u64), payload length (u32), payload crc32 (u32)
+HEADER = struct.Struct('>QII')
+SEGMENT_SUFFIX = '.log'
+
+
+def _topic_dir_name(topic):
+    return topic.replace('/', '.')
+
+
+def _atomic_write(path, text):
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def encode_event(event):
+    if EVENT_ENCODING == 'json':
+        return json.dumps(event).encode('utf-8')
+    return event_codec.encode(event)
+
+
+def decode_event(payload):
+    return event_codec.decode(payload)
+
+
+class TopicLog:
+    """Segmented append-only log for one topic"""
+
+    def __init__(self, root, topic, segment_bytes=EVENT_LOG_SEGMENT_BYTES):
+        self.topic = topic
+        self.path = os.path.join(root, _topic_dir_name(topic))
+        self.segment_bytes = segment_bytes
+        os.makedirs(os.path.join(self.path, 'consumers'), exist_ok=True)
+        self._lock = threading.Lock()
+        self._lock_path = os.path.join(self.path, '.lock')
+        self._tail_cache = None
+
+    def _segments(self):
+        """Base offsets of all segments, ascending"""
+        return sorted(int(name[:-len(SEGMENT_SUFFIX)]) for name in os.listdir(self.path)
+                      if name.endswith(SEGMENT_SUFFIX))
+
+    def _segment_path(self, base_offset):
+        return os.path.join(self.path, f"{base_offset:020d}{SEGMENT_SUFFIX}")
+
+    def _scan(self, data, position):
+        """
+        Walk records from a byte position; yields (offset, start, end) of each
+        complete, valid record. Stops at a torn or corrupt tail.
+        """
+        size = len(data)
+        while position + HEADER.size <= size:
+            offset, length, crc = HEADER.unpack_from(data, position)
+            end = position + HEADER.size + length
+            if end > size or zlib.crc32(data[position + HEADER.size:end]) != crc:
+                return
+            yield offset, position, end
+            position = end
+
+    def _tail(self):
+        """
+        (base offset of the last segment, its valid byte size, next offset).
+        Only bytes appended since the last call are scanned, so appends stay
+        O(1) even when another process writes to the same topic.
+        """
+        segments = self._segments()
+        if not segments:
+            return 0, 0, 0
+        base = segments[-1]
+        path = self._segment_path(base)
+        size = os.path.getsize(path)
+
+        valid_size, next_offset = 0, base
+        if self._tail_cache and self._tail_cache[0] == base and self._tail_cache[1] <= size:
+            valid_size, next_offset = self._tail_cache[1], self._tail_cache[2]
+
+        if size > valid_size:
+            with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                for offset, _, end in self._scan(data, valid_size):
+                    valid_size = end
+                    next_offset = offset + 1
+
+        self._tail_cache = (base, valid_size, next_offset)
+        return self._tail_cache
+
+    def append(self, payload):
+        """Append one payload and return its offset"""
+        with self._lock, open(self._lock_path, 'a') as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                base, size, offset = self._tail()
+                path = self._segment_path(base)
+                if size and size >= self.segment_bytes:
+                    base, size = offset, 0
+                    path = self._segment_path(base)
+
+                with open(path, 'ab') as f:
+                    if f.tell() != size:
+                        f.truncate(size)  # Drop a torn record left by a crash
+                    record = HEADER.pack(offset, len(payload), zlib.crc32(payload)) + payload
+                    f.write(record)
+                    f.flush()
+                    os.fsync(f.fileno())
+                self._tail_cache = (base, size + len(record), offset + 1)
+                return offset
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def end_offset(self):
+        """Offset the next appended record will get"""
+        return self._tail()[2]
+
+    def read(self, from_offset, max_records=100, position=None):
+        """
+        Read up to max_records starting at from_offset.
+        Returns ([(offset, payload)], position) where position lets the next
+        call continue without rescanning the segment.
+        """
+        segments = self._segments()
+        if not segments:
+            return [], position
+
+        records = []
+        i = max(0, bisect.bisect_right(segments, from_offset) - 1)
+        while i < len(segments) and len(records) < max_records:
+            base = segments[i]
+            start = position[1] if position and position[0] == base else 0
+            path = self._segment_path(base)
+            if not os.path.getsize(path):
+                i += 1
+                continue
+
+            with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                for offset, record_start, end in self._scan(data, start):
+                    position = (base, end)
+                    if offset < from_offset:
+                        continue
+                    records.append((offset, bytes(data[record_start + HEADER.size:end])))
+                    if len(records) >= max_records:
+                        break
+            i += 1
+
+        return records, position
+
+
+class Consumer:
+    """Reads one topic for one consumer group; offsets survive restarts"""
+
+    def __init__(self, topic_log, group):
+        self.topic_log = topic_log
+        self.group = group
+        self._offset_path = os.path.join(topic_log.path, 'consumers', f"{group}.offset")
+        self.committed = self._load_offset()
+        self.next_offset = self.committed
+        self._position = None
+
+    def _load_offset(self):
+        try:
+            with open(self._offset_path) as f:
+                return int(f.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def poll(self, max_records=100):
+        """Return [(offset, event)] after the last polled record"""
+        records, self._position = self.topic_log.read(self.next_offset, max_records, self._position)
+        events = []
+        for offset, payload in records:
+            events.append((offset, decode_event(payload)))
+            self.next_offset = offset + 1
+        return events
+
+    def commit(self, offset):
+        """Mark everything up to and including offset as processed"""
+        self.committed = offset + 1
+        _atomic_write(self._offset_path, str(self.committed))
+
+    def seek(self, offset):
+        """Re-read from a given offset (e.g. replay for a new analytics consumer)"""
+        self.next_offset = offset
+        self._position = None
+
+    def lag(self):
+        return self.topic_log.end_offset() - self.committed
+
+
+class EventLog:
+    """Collection of topic logs under one directory"""
+
+    def __init__(self, root=EVENT_LOG_DIR, segment_bytes=EVENT_LOG_SEGMENT_BYTES):
+        self.root = root
+        self.segment_bytes = segment_bytes
+        self._topics = {}
+        self._lock = threading.Lock()
+
+    def topic(self, name):
+        with self._lock:
+            if name not in self._topics:
+                self._topics[name] = TopicLog(self.root, name, self.segment_bytes)
+            return self._topics[name]
+
+    def publish(self, topic, event):
+        """Append an event to a topic; returns its offset"""
+        return self.topic(topic).append(encode_event(event))
+
+    def consumer(self, group, topic):
+        return Consumer(self.topic(topic), group)
+
+
+# Global instance
+event_log = EventLog()
@@ -0,0 +1,92 @@
+"""
+FINGERPRINT STORE - Local record of the events the scraper has already seen
+Keeps one content fingerprint per event key, so each scrape can be diffed
+against the previous one (new / changed / removed) and only the events
+that actually changed are published to the matching pipeline
+"""
+
+import os
+import time
+import sqlite3
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SCRAPER_FINGERPRINT_PATH = os.getenv('SCRAPER_FINGERPRINT_PATH', 'backend/data/scraper_fingerprints.db')
+
+
+class FingerprintStore:
+    """SQLite table of event_key -> content hash from the last published scrape"""
+
+    def __init__(self, path=SCRAPER_FINGERPRINT_PATH):
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS fingerprints (
+                event_key TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL,
+                title TEXT,
+                first_seen REAL NOT NULL,
+                last_seen REAL NOT NULL
+            )
+        """)
+        self._db.commit()
+
+    def diff(self, events):
+        """
+        Compare a scrape ({event_key: (content_hash, event)}) with the store.
+        Returns {'new': [...], 'changed': [...], 'removed': [...], 'unchanged': n};
+        removed holds {'event_key', 'title'} of events missing from this scrape
+        """
+        with self._lock:
+            known = {key: (content, title) for key, content, title in
+                     self._db.execute("SELECT event_key, content_hash, title FROM fingerprints")}
+
+        result = {"new": [], "changed": [], "removed": [], "unchanged": 0}
+        for key, (content, event) in events.items():
+            if key not in known:
+                result["new"].append(event)
+            elif known[key][0] != content:
+                result["changed"].append(event)
+            else:
+                result["unchanged"] += 1
+        result["removed"] = [{"event_key": key, "title": title}
+                             for key, (_, title) in known.items() if key not in events]
+        return result
+
+    def status(self, key, content_hash):
+        """'new', 'changed' or 'unchanged' for one event (streaming use)"""
+        with self._lock:
+            row = self._db.execute("SELECT content_hash FROM fingerprints WHERE event_key = ?", (key,)).fetchone()
+        if row is None:
+            return 'new'
+        return 'unchanged' if row[0] == content_hash else 'changed'
+
+    def record(self, events, removed_keys=()):
+        """Store fingerprints ({event_key: (content_hash, event)}) and forget removed events"""
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                """INSERT INTO fingerprints VALUES (?, ?, ?, ?, ?)
+                   ON CONFLICT(event_key) DO UPDATE SET
+                       content_hash = excluded.content_hash,
+                       title = excluded.title,
+                       last_seen = excluded.last_seen""",
+                [(key, content, event.get('title'), now, now) for key, (content, event) in events.items()]
+            )
+            self._db.executemany("DELETE FROM fingerprints WHERE event_key = ?",
+                                 [(key,) for key in removed_keys])
+            self._db.commit()
+
+    def clear(self):
+        """Forget every fingerprint so the next scrape publishes everything again"""
+        with self._lock:
+            self._db.execute("DELETE FROM fingerprints")
+            self._db.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM fingerprints").fetchone()[0]
@@ -0,0 +1,347 @@
+"""
+GEMINI GATEWAY - Single entry point for Gemini API calls
+Token-bucket rate limiting (requests and tokens per minute), adaptive
+concurrency and a circuit breaker that sends callers straight to the
+rule-based path while Gemini is failing
+"""
+
+import os
+import time
+import threading
+import requests
+from dotenv import load_dotenv
+from metrics import counter, histogram, SLOW_BUCKETS
+
+load_dotenv()
+
+GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
+GEMINI_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-3-flash-preview:generateContent"
+
+GEMINI_TIMEOUT = float(os.getenv('GEMINI_TIMEOUT', '60'))
+GEMINI_RPM = float(os.getenv('GEMINI_RPM', '60'))
+GEMINI_TPM = float(os.getenv('GEMINI_TPM', '1000000'))
+GEMINI_MAX_IN_FLIGHT = int(os.getenv('GEMINI_MAX_IN_FLIGHT', '8'))
+# How long a call may wait for rate/concurrency budget before it is rejected
+GEMINI_QUEUE_TIMEOUT = float(os.getenv('GEMINI_QUEUE_TIMEOUT', '30'))
+GEMINI_BREAKER_THRESHOLD = int(os.getenv('GEMINI_BREAKER_THRESHOLD', '3'))
+GEMINI_BREAKER_COOLDOWN = float(os.getenv('GEMINI_BREAKER_COOLDOWN', '30'))
+# Rough output budget added to the prompt estimate when reserving tokens
+GEMINI_OUTPUT_TOKENS = int(os.getenv('GEMINI_OUTPUT_TOKENS', '1024'))
+
+
+GEMINI_SECONDS = histogram('gemini_request_duration_seconds', 'Duration of Gemini API calls', ['status'],
+                           buckets=SLOW_BUCKETS)
+GEMINI_CALLS = counter('gemini_gateway_total', 'Gemini gateway outcomes (calls, successes, failures, ...)',
+                       ['outcome'])
+
+
+class GeminiUnavailable(Exception):
+    """Call rejected locally (breaker open or no rate budget); nothing was sent"""
+
+
+class GeminiError(Exception):
+    """Gemini answered with an error status"""
+
+    def __init__(self, status_code, text=''):
+        self.status_code = status_code
+        super().__init__(f"Gemini API error: {status_code}")
+
+
+def estimate_tokens(text):
+    """Cheap token estimate (~4 characters per token)"""
+    return len(text) // 4 + 1
+
+
+class TokenBucket:
+    """Continuous-refill token bucket; capacity is one minute of budget"""
+
+    def __init__(self, per_minute):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.level = per_minute
+        self.updated = time.monotonic()
+        self._cond = threading.Condition()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount, timeout):
+        """Take amount tokens, waiting up to timeout seconds; returns False on timeout"""
+        amount = min(amount, self.capacity)
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                self._refill()
+                if self.level >= amount:
+                    self.level -= amount
+                    return True
+                wait = (amount - self.level) / self.rate
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or wait > remaining:
+                    return False
+                self._cond.wait(wait)
+
+    def consume(self, amount):
+        """Debit tokens after the fact (the level may go negative)"""
+        with self._cond:
+            self._refill()
+            self.level -= amount
+
+    def refund(self, amount):
+        """Give back tokens taken for a request that was never sent"""
+        amount = min(amount, self.capacity)
+        with self._cond:
+            self._refill()
+            self.level = min(self.capacity, self.level + amount)
+            self._cond.notify_all()
+
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limit: +1 after a window of successes,
+    halved on throttling, never below 1 or above max_limit
+    """
+
+    def __init__(self, max_limit):
+        self.max_limit = max_limit
+        self.limit = max_limit
+        self.in_flight = 0
+        self._successes = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, timeout):
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self.in_flight >= self.limit:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            self.in_flight += 1
+            return True
+
+    def release(self, throttled=False):
+        with self._cond:
+            self.in_flight -= 1
+            if throttled:
+                self.limit = max(1, self.limit // 2)
+                self._successes = 0
+            else:
+                self._successes += 1
+                if self._successes >= self.limit and self.limit < self.max_limit:
+                    self.limit += 1
+                    self._successes = 0
+            self._cond.notify_all()
+
+
+class CircuitBreaker:
+    """closed -> open after N consecutive failures -> half_open while probing"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, threshold, cooldown):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0
+        self.trips = 0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            return self.state == self.CLOSED
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.state = self.CLOSED
+
+    def record_failure(self):
+        """Returns True when this failure tripped the breaker"""
+        with self._lock:
+            self.failures += 1
+            if self.state == self.CLOSED and self.failures >= self.threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self.trips += 1
+                return True
+            return False
+
+    def begin_probe(self):
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = self.HALF_OPEN
+                return True
+            return False
+
+    def end_probe(self, ok):
+        with self._lock:
+            if ok:
+                self.state = self.CLOSED
+                self.failures = 0
+            else:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+class GeminiGateway:
+    """Rate-limited, breaker-protected Gemini client"""
+
+    def __init__(self, api_key=GEMINI_API_KEY, url=GEMINI_URL, timeout=GEMINI_TIMEOUT,
+                 rpm=GEMINI_RPM, tpm=GEMINI_TPM, max_in_flight=GEMINI_MAX_IN_FLIGHT,
+                 queue_timeout=GEMINI_QUEUE_TIMEOUT, breaker_threshold=GEMINI_BREAKER_THRESHOLD,
+                 breaker_cooldown=GEMINI_BREAKER_COOLDOWN):
+        self.api_key = api_key
+        self.url = url
+        self.timeout = timeout
+        self.queue_timeout = queue_timeout
+        self.requests_bucket = TokenBucket(rpm)
+        self.tokens_bucket = TokenBucket(tpm)
+        self.limiter = AdaptiveLimiter(max_in_flight)
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_cooldown)
+        self.session = requests.Session()
+
+        self.calls = 0
+        self.successes = 0
+        self.failures = 0
+        self.throttled = 0
+        self.rejected = 0
+        self._stats_lock = threading.Lock()
+        self._probe_thread = None
+
+    def is_available(self):
+        """False while the breaker is open: callers should use the rule-based path"""
+        return self.breaker.allow()
+
+    def generate(self, prompt):
+        """
+        Send one prompt and return the response text.
+        Raises GeminiUnavailable without touching the network when the
+        breaker is open or no budget frees up within queue_timeout.
+        """
+        if not self.breaker.allow():
+            self._count('rejected')
+            raise GeminiUnavailable(f"circuit breaker {self.breaker.state}")
+
+        estimate = estimate_tokens(prompt) + GEMINI_OUTPUT_TOKENS
+        if not self.requests_bucket.acquire(1, self.queue_timeout):
+            self._count('rejected')
+            raise GeminiUnavailable("rate limit budget exhausted")
+        if not self.tokens_bucket.acquire(estimate, self.queue_timeout):
+            self.requests_bucket.refund(1)
+            self._count('rejected')
+            raise GeminiUnavailable("rate limit budget exhausted")
+
+        if not self.limiter.acquire(self.queue_timeout):
+            # Nothing was sent: the budget goes back to the buckets
+            self.requests_bucket.refund(1)
+            self.tokens_bucket.refund(estimate)
+            self._count('rejected')
+            raise GeminiUnavailable("too many calls in flight")
+
+        throttled = False
+        try:
+            text, used = self._call(prompt)
+        except GeminiError as e:
+            throttled = e.status_code == 429
+            self._on_failure('throttled' if throttled else 'failures')
+            raise
+        except Exception:
+            self._on_failure('failures')
+            raise
+        finally:
+            self.limiter.release(throttled)
+
+        if used and used > estimate:
+            self.tokens_bucket.consume(used - estimate)
+        self.breaker.record_success()
+        self._count('successes')
+        return text
+
+    def _call(self, prompt):
+        """Raw HTTP call; returns (text, total_tokens_used or None)"""
+        self._count('calls')
+        started = time.time()
+        try:
+            response = self.session.post(
+                self.url,
+                params={'key': self.api_key},
+                headers={'Content-Type': 'application/json'},
+                json={
+                    "contents": [{
+                        "parts": [{"text": prompt}]
+                    }]
+                },
+                timeout=self.timeout
+            )
+        except Exception:
+            GEMINI_SECONDS.labels(status='error').observe(time.time() - started)
+            raise
+        GEMINI_SECONDS.labels(status=response.status_code).observe(time.time() - started)
+        if response.status_code != 200:
+            raise GeminiError(response.status_code, response.text)
+
+        data = response.json()
+        text = data['candidates'][0]['content']['parts'][0]['text']
+        used = data.get('usageMetadata', {}).get('totalTokenCount')
+        return text, used
+
+    def _on_failure(self, counter):
+        self._count(counter)
+        if self.breaker.record_failure():
+            print(f"⚠️  Gemini circuit breaker OPEN after {self.breaker.failures} failures, "
+                  f"using rule-based matching")
+            self._start_probe()
+
+    def _start_probe(self):
+        """Background thread that retries Gemini after the cooldown until it recovers"""
+        if self._probe_thread and self._probe_thread.is_alive():
+            return
+        self._probe_thread = threading.Thread(target=self._probe_loop, daemon=True)
+        self._probe_thread.start()
+
+    def _probe_loop(self):
+        while True:
+            time.sleep(self.breaker.cooldown)
+            if not self.breaker.begin_probe():
+                if self.breaker.state == CircuitBreaker.CLOSED:
+                    return
+                continue
+            try:
+                self._call("Reply with the single word: ok")
+                ok = True
+            except Exception:
+                ok = False
+            self.breaker.end_probe(ok)
+            if ok:
+                print("✅ Gemini recovered, circuit breaker closed")
+                return
+
+    def _count(self, name):
+        with self._stats_lock:
+            setattr(self, name, getattr(self, name) + 1)
+        GEMINI_CALLS.labels(outcome=name).inc()
+
+    def get_stats(self):
+        """Get gateway statistics"""
+        return {
+            "calls": self.calls,
+            "successes": self.successes,
+            "failures": self.failures,
+            "throttled": self.throttled,
+            "rejected": self.rejected,
+            "breaker_state": self.breaker.state,
+            "breaker_trips": self.breaker.trips,
+            "concurrency_limit": self.limiter.limit,
+            "in_flight": self.limiter.in_flight,
+            "timestamp": time.time()
+        }
+
+
+# Global instance
+gemini_gateway = GeminiGateway()
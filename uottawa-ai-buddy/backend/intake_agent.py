@@ -5,9 +5,12 @@ and publishes events to Solace for other agents to process
 """
 
 import os
-import json
 import time
 from dotenv import load_dotenv
+from event_log import event_log
+from transport import get_transport, EVENT_TRANSPORT
+from log_writer import get_writer
+from metrics import counter, gauge, start_metrics_server
 
 # Load environment variables
 load_dotenv()
@@ -18,12 +21,17 @@ SOLACE_HOST = os.getenv('SOLACE_HOST')
 SOLACE_USERNAME = os.getenv('SOLACE_USERNAME')
 SOLACE_PASSWORD = os.getenv('SOLACE_PASSWORD')
 
-# For hackathon demo, we'll simulate Solace with a simple queue
-# Replace with actual Solace SDK for production
+# Events go through the transport selected by EVENT_TRANSPORT: the durable
+# local log (backend/data/event_log) by default, or the Solace broker
+
+OPPORTUNITIES_TOPIC = "opportunities/new"
+METRICS_DEFAULT_PORT = 9101
+
+INTAKE_PUBLISHED = counter('intake_opportunities_total', 'Opportunities received by intake', ['outcome'])
+PENDING_EVENTS = gauge('intake_pending_events', 'Published opportunities the matching agent has not consumed yet')
 
 class IntakeAgent:
     def __init__(self):
-        self.message_queue = []
         print(" Intake Agent started")
         print(f" Connected to Solace at: {SOLACE_HOST}")
         print(" Listening for new opportunities...")
@@ -43,42 +51,42 @@ class IntakeAgent:
             }
             
             print(f"\n Received new opportunity: {opportunity_data.get('title', 'Untitled')}")
-            print(f" Publishing to Solace topic: opportunities/new")
+            print(" Publishing to Solace topic: opportunities/new")
             
-            # Simulate publishing to Solace
-            # In production: solace_publisher.publish(event, topic="opportunities/new")
-            self.message_queue.append(event)
+            offset = get_transport().publish(OPPORTUNITIES_TOPIC, event)
             
             # Log the event
             self._log_event(event)
             
-            print(f" Event published successfully!")
-            print(f" Matching agent will now process this opportunity")
+            if offset is not None:
+                print(f" Event published successfully! (offset {offset})")
+            else:
+                print(" Event published successfully!")
+            print(" Matching agent will now process this opportunity")
+            INTAKE_PUBLISHED.labels(outcome='published').inc()
             
             return True
             
         except Exception as e:
             print(f" Error publishing opportunity: {e}")
+            INTAKE_PUBLISHED.labels(outcome='failed').inc()
             return False
     
     def _log_event(self, event):
         """Log events to a file for debugging"""
         try:
-            with open('backend/logs/intake_events.json', 'a') as f:
-                f.write(json.dumps(event) + '\n')
-        except:
-            # Create logs directory if it doesn't exist
-            os.makedirs('backend/logs', exist_ok=True)
-            with open('backend/logs/intake_events.json', 'a') as f:
-                f.write(json.dumps(event) + '\n')
-    
-    def get_pending_events(self):
-        """Get all pending events (for demo purposes)"""
-        return self.message_queue
+            get_writer('intake_events.json').write(event)
+        except Exception as e:
+            print(f" Error logging event: {e}")
     
-    def clear_queue(self):
-        """Clear the message queue"""
-        self.message_queue = []
+    def pending_count(self, consumer_group='matching'):
+        """
+        Number of published events a consumer group has not committed yet.
+        None with the Solace transport: the broker's queue depth is not visible from here
+        """
+        if EVENT_TRANSPORT != 'local':
+            return None
+        return event_log.consumer(consumer_group, OPPORTUNITIES_TOPIC).lag()
 
 # Global instance
 intake_agent = IntakeAgent()
@@ -95,17 +103,24 @@ if __name__ == "__main__":
     print(" INTAKE AGENT - Solace Event Publisher")
     print("="*60)
     
+    if EVENT_TRANSPORT == 'local':
+        PENDING_EVENTS.set_function(intake_agent.pending_count)
+    start_metrics_server(METRICS_DEFAULT_PORT)
+    
     # Keep agent running
     print("\n Agent is running. Press Ctrl+C to stop.")
     print(" Waiting for opportunities to be posted via the website...")
     
     try:
+        last_pending = 0
         while True:
             time.sleep(1)
             
-            # Check for pending events every 5 seconds
-            if len(intake_agent.message_queue) > 0:
-                print(f"\n Pending events: {len(intake_agent.message_queue)}")
+            # Report events the matching agent has not consumed yet
+            pending = intake_agent.pending_count()
+            if pending and pending != last_pending:
+                print(f"\n Pending events: {pending}")
+            last_pending = pending
     
     except KeyboardInterrupt:
         print("\n\n Intake Agent stopped")
\ No newline at end of file
@@ -0,0 +1,156 @@
+"""
+LLM CACHE - Persistent cache of Gemini match results
+Keyed by fingerprints of the opportunity and of each student profile, so
+unchanged (opportunity, student) pairs are served without a network call
+"""
+
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()
+
+LLM_CACHE_PATH = os.getenv('LLM_CACHE_PATH', 'backend/data/llm_cache.db')
+LLM_CACHE_MAX_ENTRIES = int(os.getenv('LLM_CACHE_MAX_ENTRIES', '200000'))
+LLM_CACHE_TTL_SECONDS = float(os.getenv('LLM_CACHE_TTL_SECONDS', str(7 * 24 * 3600)))
+
+# Bump when the prompt changes so old answers are not reused
+PROMPT_VERSION = 1
+
+# Fields that go into the Gemini prompt (see MatchingAgent._create_matching_prompt)
+OPPORTUNITY_FIELDS = ['title', 'description', 'category', 'type',
+                      'target_programs', 'target_years', 'target_interests']
+STUDENT_FIELDS = ['id', 'name', 'program', 'year', 'interests', 'ethnicity']
+
+# Keep SQL statements under SQLite's bound-parameter limit
+_QUERY_CHUNK = 500
+
+
+def _fingerprint(record, fields):
+    payload = json.dumps([PROMPT_VERSION] + [record.get(f) for f in fields],
+                         sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def opportunity_fingerprint(opportunity):
+    """Stable hash of the opportunity fields the prompt uses"""
+    return _fingerprint(opportunity, OPPORTUNITY_FIELDS)
+
+
+def student_fingerprint(student):
+    """Stable hash of the student fields the prompt uses"""
+    return _fingerprint(student, STUDENT_FIELDS)
+
+
+class LLMCache:
+    """
+    SQLite-backed pair cache with TTL and LRU eviction.
+    A cached entry with match_score None means Gemini saw the student and
+    did not consider it a match, which is also worth remembering.
+    """
+
+    def __init__(self, path=LLM_CACHE_PATH, max_entries=LLM_CACHE_MAX_ENTRIES,
+                 ttl_seconds=LLM_CACHE_TTL_SECONDS):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS llm_matches (
+                opportunity_fp TEXT NOT NULL,
+                student_fp TEXT NOT NULL,
+                match_score REAL,
+                reasoning TEXT,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (opportunity_fp, student_fp)
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_llm_matches_access ON llm_matches (last_access)")
+        self._db.commit()
+
+    def get_many(self, opportunity_fp, student_fps):
+        """Return {student_fp: (match_score, reasoning)} for fresh cached pairs"""
+        now = time.time()
+        found = {}
+
+        with self._lock:
+            for i in range(0, len(student_fps), _QUERY_CHUNK):
+                chunk = student_fps[i:i + _QUERY_CHUNK]
+                rows = self._db.execute(
+                    f"SELECT student_fp, match_score, reasoning FROM llm_matches "
+                    f"WHERE opportunity_fp = ? AND created_at > ? "
+                    f"AND student_fp IN ({','.join('?' * len(chunk))})",
+                    [opportunity_fp, now - self.ttl_seconds] + chunk
+                ).fetchall()
+                for student_fp, score, reasoning in rows:
+                    found[student_fp] = (score, reasoning)
+
+            if found:
+                keys = list(found)
+                for i in range(0, len(keys), _QUERY_CHUNK):
+                    chunk = keys[i:i + _QUERY_CHUNK]
+                    self._db.execute(
+                        f"UPDATE llm_matches SET last_access = ? WHERE opportunity_fp = ? "
+                        f"AND student_fp IN ({','.join('?' * len(chunk))})",
+                        [now, opportunity_fp] + chunk
+                    )
+                self._db.commit()
+
+            self.hits += len(found)
+            self.misses += len(student_fps) - len(found)
+
+        return found
+
+    def put_many(self, opportunity_fp, results):
+        """Store {student_fp: (match_score or None, reasoning or None)}"""
+        if not results:
+            return
+        now = time.time()
+
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO llm_matches VALUES (?, ?, ?, ?, ?, ?)",
+                [(opportunity_fp, fp, score, reasoning, now, now)
+                 for fp, (score, reasoning) in results.items()]
+            )
+            self._evict(now)
+            self._db.commit()
+
+    def _evict(self, now):
+        """Drop expired entries, then least recently used ones over the size limit"""
+        self._db.execute("DELETE FROM llm_matches WHERE created_at <= ?", (now - self.ttl_seconds,))
+        size = self._db.execute("SELECT COUNT(*) FROM llm_matches").fetchone()[0]
+        if size > self.max_entries:
+            self._db.execute(
+                "DELETE FROM llm_matches WHERE rowid IN "
+                "(SELECT rowid FROM llm_matches ORDER BY last_access LIMIT ?)",
+                (size - self.max_entries,)
+            )
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM llm_matches")
+            self._db.commit()
+
+    def get_stats(self):
+        """Get cache statistics"""
+        with self._lock:
+            size = self._db.execute("SELECT COUNT(*) FROM llm_matches").fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": size
+        }
@@ -0,0 +1,222 @@
+"""
+LOG WRITER - Buffered JSONL writer shared by the agents' backend/logs files
+Records go to an in-memory buffer; a background thread writes them in
+batches (one write + one fsync per batch), rotates files by size and
+compresses rotated segments. Buffers are flushed at interpreter exit.
+With LOG_FORMAT=binary records are event_codec frames in a .bin file;
+read_records() reads either format
+"""
+
+import os
+import json
+import gzip
+import shutil
+import atexit
+import struct
+import threading
+from dotenv import load_dotenv
+import event_codec
+
+try:
+    import zstandard
+except ImportError:  # Optional: only needed for LOG_COMPRESSION=zstd
+    zstandard = None
+
+load_dotenv()
+
+LOG_DIR = 'backend/logs'
+# Flush when this many records are buffered, or every LOG_FLUSH_INTERVAL seconds
+LOG_BUFFER_RECORDS = int(os.getenv('LOG_BUFFER_RECORDS', '1000'))
+LOG_FLUSH_INTERVAL = float(os.getenv('LOG_FLUSH_INTERVAL', '1.0'))
+LOG_FSYNC = os.getenv('LOG_FSYNC', 'true').lower() == 'true'
+# Rotate once a file reaches LOG_MAX_BYTES; keep LOG_BACKUP_COUNT old segments
+LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', str(50 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', '5'))
+# 'gzip', 'zstd' or 'none'
+LOG_COMPRESSION = os.getenv('LOG_COMPRESSION', 'gzip')
+# 'json' (one JSON object per line) or 'binary' (length-prefixed event_codec records)
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'json')
+
+COMPRESSION_SUFFIXES = {'gzip': '.gz', 'zstd': '.zst', 'none': ''}
+FRAME = struct.Struct('>I')
+
+
+class LogWriter:
+    """Append-only JSONL file written in batches by a background thread"""
+
+    def __init__(self, path, buffer_records=LOG_BUFFER_RECORDS, flush_interval=LOG_FLUSH_INTERVAL,
+                 fsync=LOG_FSYNC, max_bytes=LOG_MAX_BYTES, backup_count=LOG_BACKUP_COUNT,
+                 compression=LOG_COMPRESSION, format=LOG_FORMAT):
+        if compression == 'zstd' and zstandard is None:
+            print(" zstandard is not installed, compressing rotated logs with gzip")
+            compression = 'gzip'
+        if compression not in COMPRESSION_SUFFIXES:
+            raise ValueError(f"Unknown log compression: {compression}")
+        if format not in ('json', 'binary'):
+            raise ValueError(f"Unknown log format: {format}")
+
+        self.path = path
+        self.buffer_records = buffer_records
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.compression = compression
+        self.format = format
+        self.written = 0
+        self.rotations = 0
+
+        self._buffer = []
+        self._file = None
+        self._closed = False
+        self._lock = threading.Lock()          # Guards the buffer
+        self._io_lock = threading.Lock()       # Serializes file writes and rotation
+        self._wakeup = threading.Condition(self._lock)
+        self._thread = threading.Thread(target=self._run, name=f"log-writer-{os.path.basename(path)}",
+                                        daemon=True)
+        self._thread.start()
+
+    def write(self, record):
+        """Queue one record; never blocks on disk"""
+        if self.format == 'binary':
+            payload = event_codec.encode(record)
+            line = FRAME.pack(len(payload)) + payload
+        else:
+            line = (json.dumps(record) + '\n').encode('utf-8')
+        with self._lock:
+            if self._closed:
+                raise ValueError(f"Log writer for {self.path} is closed")
+            self._buffer.append(line)
+            if len(self._buffer) >= self.buffer_records:
+                self._wakeup.notify()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._closed and len(self._buffer) < self.buffer_records:
+                    self._wakeup.wait(self.flush_interval)
+                closed = self._closed
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"⚠️  Error writing {self.path}: {e}")
+            if closed:
+                return
+
+    def flush(self):
+        """Write everything buffered so far (one write and one fsync)"""
+        with self._lock:
+            lines, self._buffer = self._buffer, []
+        if not lines:
+            return
+
+        with self._io_lock:
+            if self._file is None:
+                if os.path.dirname(self.path):
+                    os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                self._file = open(self.path, 'ab')
+            self._file.write(b''.join(lines))
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            self.written += len(lines)
+
+            if self.max_bytes and self._file.tell() >= self.max_bytes:
+                self._rotate()
+
+    def _segment(self, n):
+        return f"{self.path}.{n}{COMPRESSION_SUFFIXES[self.compression]}"
+
+    def _rotate(self):
+        """path -> path.1(.gz), path.1 -> path.2, ...; the oldest segment is dropped"""
+        self._file.close()
+        self._file = None
+
+        if self.backup_count <= 0:
+            os.remove(self.path)
+            return
+
+        if os.path.exists(self._segment(self.backup_count)):
+            os.remove(self._segment(self.backup_count))
+        for n in range(self.backup_count - 1, 0, -1):
+            if os.path.exists(self._segment(n)):
+                os.replace(self._segment(n), self._segment(n + 1))
+
+        # Move the live file aside first so new records go to a fresh file while it is compressed
+        rotated = f"{self.path}.1"
+        os.replace(self.path, rotated)
+        if self.compression != 'none':
+            self._compress(rotated, self._segment(1))
+            os.remove(rotated)
+        self.rotations += 1
+
+    def _compress(self, source, target):
+        with open(source, 'rb') as src:
+            if self.compression == 'zstd':
+                with open(target, 'wb') as dst:
+                    zstandard.ZstdCompressor().copy_stream(src, dst)
+            else:
+                with gzip.open(target, 'wb') as dst:
+                    shutil.copyfileobj(src, dst)
+
+    def close(self):
+        """Flush remaining records and stop the background thread"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._wakeup.notify()
+        self._thread.join()
+        with self._io_lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+
+def read_records(path):
+    """Yield the records of a log file or rotated segment, in either format"""
+    if path.endswith('.gz'):
+        opener = gzip.open
+    elif path.endswith('.zst'):
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read .zst segments")
+        opener = lambda p, mode: zstandard.open(p, mode)
+    else:
+        opener = open
+
+    with opener(path, 'rb') as f:
+        if '.bin' in os.path.basename(path):
+            while True:
+                header = f.read(FRAME.size)
+                if len(header) < FRAME.size:
+                    return
+                payload = f.read(FRAME.unpack(header)[0])
+                yield event_codec.decode(payload)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def get_writer(name):
+    """Shared writer for a file in backend/logs, e.g. get_writer('matches.json')"""
+    if LOG_FORMAT == 'binary' and name.endswith('.json'):
+        name = name[:-len('.json')] + '.bin'
+    path = os.path.join(LOG_DIR, name)
+    with _writers_lock:
+        if path not in _writers:
+            _writers[path] = LogWriter(path)
+        return _writers[path]
+
+
+@atexit.register
+def close_all():
+    """Flush every writer (runs automatically at interpreter exit)"""
+    with _writers_lock:
+        writers = list(_writers.values())
+    for writer in writers:
+        writer.close()
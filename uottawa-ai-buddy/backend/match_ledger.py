@@ -0,0 +1,218 @@
+"""
+MATCH LEDGER - Exactly-once bookkeeping for opportunity matching
+Remembers which opportunities were matched (by content fingerprint,
+scoring version and student set version) and which matches were already
+emitted, keyed by an idempotency key, so orchestrator re-runs skip
+finished work and only new or changed matches are written and notified.
+Also persists the watermarks of incremental runs
+"""
+
+import os
+import time
+import hashlib
+import sqlite3
+import threading
+from datetime import date
+from dotenv import load_dotenv
+from scoring_engine import SCORING_VERSION
+from llm_cache import PROMPT_VERSION, opportunity_fingerprint
+
+load_dotenv()
+
+MATCH_LEDGER_PATH = os.getenv('MATCH_LEDGER_PATH', 'backend/data/match_ledger.db')
+
+# Rule weights and the Gemini prompt both decide the matches
+MATCH_VERSION = f"{SCORING_VERSION}.{PROMPT_VERSION}"
+
+_QUERY_CHUNK = 500
+
+
+def opportunity_key(opportunity):
+    """Ledger id of an opportunity (opportunities posted without an id are keyed by title)"""
+    return str(opportunity.get('id') or opportunity.get('title'))
+
+
+def opportunity_key_type(opportunity):
+    """'id' or 'title': which field opportunity_key() took the key from"""
+    return 'id' if opportunity.get('id') else 'title'
+
+
+def _event_day(opportunity):
+    """ISO event date of an opportunity, or None when it has none (or it does not parse)"""
+    try:
+        return date.fromisoformat(str(opportunity.get('event_date'))[:10]).isoformat()
+    except ValueError:
+        return None
+
+
+def idempotency_key(opportunity_id, student_id, version=MATCH_VERSION):
+    """Stable key of one (opportunity, student) match under one scoring version"""
+    payload = f"{opportunity_id}:{student_id}:{version}"
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+
+
+class MatchLedger:
+    """SQLite record of processed opportunities and emitted matches"""
+
+    def __init__(self, path=MATCH_LEDGER_PATH, version=MATCH_VERSION):
+        self.version = version
+        self.skipped = 0
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS processed (
+                opportunity_id TEXT PRIMARY KEY,
+                fingerprint TEXT NOT NULL,
+                version TEXT NOT NULL,
+                processed_at REAL NOT NULL,
+                student_version TEXT,
+                key_type TEXT,
+                event_date TEXT
+            );
+            CREATE TABLE IF NOT EXISTS emitted (
+                idempotency_key TEXT PRIMARY KEY,
+                opportunity_id TEXT NOT NULL,
+                student_id TEXT NOT NULL,
+                match_score REAL NOT NULL,
+                emitted_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_emitted_opportunity ON emitted (opportunity_id);
+            CREATE TABLE IF NOT EXISTS watermarks (
+                name TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+        """)
+        # Ledgers created before student set versions were tracked
+        columns = [row[1] for row in self._db.execute("PRAGMA table_info(processed)")]
+        if 'student_version' not in columns:
+            self._db.execute("ALTER TABLE processed ADD COLUMN student_version TEXT")
+        # Older rows keep a NULL key type until they are recorded again
+        if 'key_type' not in columns:
+            self._db.execute("ALTER TABLE processed ADD COLUMN key_type TEXT")
+        if 'event_date' not in columns:
+            self._db.execute("ALTER TABLE processed ADD COLUMN event_date TEXT")
+        self._db.commit()
+
+    def _is_done(self, row, opportunity, student_version):
+        if row is None or tuple(row[:2]) != (opportunity_fingerprint(opportunity), self.version):
+            return False
+        return student_version is None or row[2] == student_version
+
+    def is_processed(self, opportunity, student_version=None):
+        """
+        True when this exact opportunity content was already matched under this
+        version (and, when given, against this student set version)
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT fingerprint, version, student_version FROM processed WHERE opportunity_id = ?",
+                (opportunity_key(opportunity),)
+            ).fetchone()
+        done = self._is_done(row, opportunity, student_version)
+        if done:
+            self.skipped += 1
+        return done
+
+    def pending(self, opportunities, student_version=None):
+        """The opportunities that is_processed() would not skip (does not count skips)"""
+        markers = {}
+        keys = [opportunity_key(o) for o in opportunities]
+        with self._lock:
+            for i in range(0, len(keys), _QUERY_CHUNK):
+                chunk = keys[i:i + _QUERY_CHUNK]
+                marks = ','.join('?' * len(chunk))
+                for row in self._db.execute(
+                    f"SELECT opportunity_id, fingerprint, version, student_version FROM processed "
+                    f"WHERE opportunity_id IN ({marks})", chunk
+                ):
+                    markers[row[0]] = row[1:]
+        return [o for o, key in zip(opportunities, keys)
+                if not self._is_done(markers.get(key), o, student_version)]
+
+    def stale(self, student_version, today=None):
+        """
+        Table ids of processed opportunities last matched against another student
+        set version (opportunities keyed by title cannot be looked up and are left out).
+        Events that are over are not re-matched for new students
+        """
+        today = (today or date.today()).isoformat()
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT opportunity_id FROM processed WHERE version = ? AND key_type = 'id' "
+                "AND (student_version IS NULL OR student_version != ?) "
+                "AND (event_date IS NULL OR event_date >= ?)",
+                (self.version, student_version, today)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def delta(self, opportunity, matches):
+        """Matches not emitted before, or whose score changed; each gets its idempotency key"""
+        opportunity_id = opportunity_key(opportunity)
+        keyed = [dict(m, idempotency_key=idempotency_key(opportunity_id, m['student_id'], self.version))
+                 for m in matches]
+        emitted = {}
+        with self._lock:
+            for i in range(0, len(keyed), _QUERY_CHUNK):
+                chunk = [m['idempotency_key'] for m in keyed[i:i + _QUERY_CHUNK]]
+                marks = ','.join('?' * len(chunk))
+                emitted.update(self._db.execute(
+                    f"SELECT idempotency_key, match_score FROM emitted WHERE idempotency_key IN ({marks})", chunk
+                ).fetchall())
+        return [m for m in keyed if emitted.get(m['idempotency_key']) != float(m['match_score'])]
+
+    def record(self, opportunity, emitted_matches, complete=True, student_version=None):
+        """
+        Remember emitted matches (as returned by delta()) and, when complete,
+        mark the opportunity as processed (against student_version) so it is
+        skipped next time
+        """
+        opportunity_id = opportunity_key(opportunity)
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO emitted VALUES (?, ?, ?, ?, ?)",
+                [(m['idempotency_key'], opportunity_id, str(m['student_id']), float(m['match_score']), now)
+                 for m in emitted_matches]
+            )
+            if complete:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO processed VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (opportunity_id, opportunity_fingerprint(opportunity), self.version, now, student_version,
+                     opportunity_key_type(opportunity), _event_day(opportunity))
+                )
+            self._db.commit()
+
+    def forget(self, opportunity_id=None):
+        """Drop processed markers (all, or one opportunity) so the next run re-matches"""
+        with self._lock:
+            if opportunity_id is None:
+                self._db.execute("DELETE FROM processed")
+            else:
+                self._db.execute("DELETE FROM processed WHERE opportunity_id = ?", (str(opportunity_id),))
+            self._db.commit()
+
+    def get_watermark(self, name):
+        """Last persisted value of an incremental-run watermark, or None"""
+        with self._lock:
+            row = self._db.execute("SELECT value FROM watermarks WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def set_watermark(self, name, value):
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO watermarks VALUES (?, ?)", (name, str(value)))
+            self._db.commit()
+
+    def get_stats(self):
+        """Get ledger statistics"""
+        with self._lock:
+            processed = self._db.execute("SELECT COUNT(*) FROM processed").fetchone()[0]
+            emitted = self._db.execute("SELECT COUNT(*) FROM emitted").fetchone()[0]
+        return {
+            "processed": processed,
+            "emitted": emitted,
+            "skipped": self.skipped,
+            "version": self.version,
+            "timestamp": time.time()
+        }
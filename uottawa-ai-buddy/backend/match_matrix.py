@@ -0,0 +1,291 @@
+"""
+MATCH MATRIX - Materialized student x opportunity score matrix
+Only the new row (student signs up) or column (opportunity arrives) is
+recomputed; cells are persisted so feeds are a lookup, not an LLM call
+"""
+
+import os
+import time
+import sqlite3
+import threading
+from datetime import date
+import numpy as np
+from dotenv import load_dotenv
+from scoring_engine import ScoringEngine, rule_reasoning, MIN_SCORE, MAX_SCORE
+from semantic_index import SemanticIndex
+from llm_cache import opportunity_fingerprint, student_fingerprint
+
+load_dotenv()
+
+MATCH_MATRIX_PATH = os.getenv('MATCH_MATRIX_PATH', 'backend/data/match_matrix.db')
+# Best students kept per opportunity column (keeps open-to-all events sparse).
+# Every kept cell is also a row in the Supabase matches table, so this bounds the
+# upserts a new opportunity costs (and the deletes when it is recomputed or ends)
+MATRIX_COLUMN_LIMIT = int(os.getenv('MATRIX_COLUMN_LIMIT', '200'))
+# Points added on top of the rule score for a perfect semantic match
+MATRIX_SEMANTIC_BONUS = int(os.getenv('MATRIX_SEMANTIC_BONUS', '10'))
+
+_QUERY_CHUNK = 500
+
+
+def is_active(opportunity, today=None):
+    """Opportunities whose event date has passed drop out of the matrix"""
+    event_date = opportunity.get('event_date')
+    if not event_date:
+        return True
+    try:
+        return date.fromisoformat(str(event_date)[:10]) >= (today or date.today())
+    except ValueError:
+        return True
+
+
+class MatchMatrix:
+    """
+    Sparse score matrix persisted in SQLite.
+    Cells written by the matching agent (Gemini or fallback) have source
+    'agent' and are never overwritten by the rule-based recomputation.
+    """
+
+    def __init__(self, path=MATCH_MATRIX_PATH, column_limit=MATRIX_COLUMN_LIMIT, index=None):
+        self.column_limit = column_limit
+        self.engine = ScoringEngine()
+        self.index = index or SemanticIndex()
+        self.opportunities = {}
+        self._dirty = {}
+        self._removed = set()   # (student_id, opportunity_id) of rule cells dropped since the last drain
+        self._lock = threading.RLock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS cells (
+                student_id TEXT NOT NULL,
+                opportunity_id TEXT NOT NULL,
+                score REAL NOT NULL,
+                reasoning TEXT,
+                source TEXT NOT NULL DEFAULT 'rule',
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (student_id, opportunity_id)
+            );
+            CREATE INDEX IF NOT EXISTS idx_cells_student ON cells (student_id, score);
+            CREATE INDEX IF NOT EXISTS idx_cells_opportunity ON cells (opportunity_id, score);
+            CREATE TABLE IF NOT EXISTS fingerprints (
+                kind TEXT NOT NULL,
+                record_id TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                PRIMARY KEY (kind, record_id)
+            );
+        """)
+        self._db.commit()
+
+    def sync(self, students, opportunities):
+        """
+        Bring the matrix up to date with the current students and opportunities.
+        Only changed columns and rows are recomputed. Returns (columns, rows) updated.
+        """
+        with self._lock:
+            active = [o for o in opportunities if o.get('id') is not None and is_active(o)]
+            self.opportunities = {str(o['id']): o for o in active}
+
+            self.index.sync_students(students)
+            for opportunity in active:
+                self.index.upsert_opportunity(opportunity)
+            self.engine.load(students)
+
+            seen = self._fingerprints()
+            new_opportunities = [o for o in active
+                                 if seen['opportunity'].get(str(o['id'])) != opportunity_fingerprint(o)]
+            new_students = [s for s in students
+                            if seen['student'].get(str(s['id'])) != student_fingerprint(s)]
+
+            # Drop rows/columns that no longer exist (or whose event is over)
+            gone_opportunities = set(seen['opportunity']) - set(self.opportunities)
+            gone_students = set(seen['student']) - {str(s['id']) for s in students}
+            self._delete('opportunity', gone_opportunities)
+            self._delete('student', gone_students)
+
+            # Rows first: new columns below are recomputed in full anyway
+            changed_ids = {str(o['id']) for o in new_opportunities}
+            unchanged = [o for o in active if str(o['id']) not in changed_ids]
+            if new_students and unchanged:
+                self._compute_rows(new_students, unchanged)
+
+            for opportunity in new_opportunities:
+                self._compute_column(opportunity)
+
+            self._save_fingerprints('opportunity', {str(o['id']): opportunity_fingerprint(o) for o in new_opportunities})
+            self._save_fingerprints('student', {str(s['id']): student_fingerprint(s) for s in new_students})
+            self._db.commit()
+            return len(new_opportunities), len(new_students)
+
+    def _combined_scores(self, rule_scores, similarity):
+        bonus = np.rint(MATRIX_SEMANTIC_BONUS * similarity).astype(np.int16)
+        combined = np.minimum(rule_scores + bonus, MAX_SCORE)
+        # Only students that pass the rule threshold are eligible at all
+        return np.where(rule_scores >= MIN_SCORE, combined, -1)
+
+    def _compute_column(self, opportunity):
+        """Score one opportunity against every student and keep the best column_limit"""
+        opportunity_id = str(opportunity['id'])
+        rule_scores = self.engine.score(opportunity)
+        similarity = self.index.score_students(opportunity, self.engine.student_ids)
+        combined = self._combined_scores(rule_scores, similarity)
+        top = self.engine.rank(combined, limit=self.column_limit, min_score=MIN_SCORE, tiebreak=similarity)
+
+        agent_cells = self._agent_cells(opportunity_id)
+        self._drop_rule_cells('opportunity_id', [opportunity_id])
+
+        now = time.time()
+        rows = []
+        for i in top:
+            student = self.engine.students[i]
+            student_id = str(student['id'])
+            if student_id in agent_cells:
+                continue
+            reasoning = rule_reasoning(student, opportunity)
+            rows.append((student_id, opportunity_id, float(combined[i]), reasoning, 'rule', now))
+            self._mark_dirty(student_id, opportunity_id,
+                             (student['id'], opportunity['id'], int(combined[i]), reasoning))
+        self._db.executemany("INSERT OR REPLACE INTO cells VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+    def _compute_rows(self, students, opportunities):
+        """Score new or changed students against every known opportunity"""
+        row_engine = ScoringEngine()
+        row_engine.load(students)
+        rule_scores = row_engine.score_batch(opportunities)  # (n_opportunities, n_students)
+        opportunity_ids = [str(o['id']) for o in opportunities]
+        now = time.time()
+
+        for j, student in enumerate(students):
+            student_id = str(student['id'])
+            similarity = self.index.score_opportunities(student, opportunity_ids)
+            combined = self._combined_scores(rule_scores[:, j], similarity)
+            self._drop_rule_cells('student_id', [student_id])
+
+            for k in np.flatnonzero(combined >= MIN_SCORE):
+                opportunity = opportunities[k]
+                if not self._column_has_room(opportunity_ids[k], combined[k]):
+                    continue
+                reasoning = rule_reasoning(student, opportunity)
+                cursor = self._db.execute(
+                    "INSERT OR IGNORE INTO cells VALUES (?, ?, ?, ?, 'rule', ?)",
+                    (student_id, opportunity_ids[k], float(combined[k]), reasoning, now)
+                )
+                if cursor.rowcount:
+                    self._mark_dirty(student_id, opportunity_ids[k],
+                                     (student['id'], opportunity['id'], int(combined[k]), reasoning))
+
+    def _column_has_room(self, opportunity_id, score):
+        """Make room in a full column if score beats its weakest rule cell"""
+        count = self._db.execute("SELECT COUNT(*) FROM cells WHERE opportunity_id = ?",
+                                 (opportunity_id,)).fetchone()[0]
+        if count < self.column_limit:
+            return True
+        weakest = self._db.execute(
+            "SELECT student_id, score FROM cells WHERE opportunity_id = ? AND source = 'rule' "
+            "ORDER BY score LIMIT 1", (opportunity_id,)
+        ).fetchone()
+        if weakest is None or weakest[1] >= score:
+            return False
+        self._db.execute("DELETE FROM cells WHERE student_id = ? AND opportunity_id = ?",
+                         (weakest[0], opportunity_id))
+        self._mark_removed(weakest[0], opportunity_id)
+        return True
+
+    def _mark_dirty(self, student_id, opportunity_id, row):
+        self._dirty[(student_id, opportunity_id)] = row
+        self._removed.discard((student_id, opportunity_id))
+
+    def _mark_removed(self, student_id, opportunity_id):
+        self._dirty.pop((student_id, opportunity_id), None)
+        self._removed.add((student_id, opportunity_id))
+
+    def _drop_rule_cells(self, column, record_ids):
+        """Delete the rule cells of some rows or columns, remembering them for drain_changes()"""
+        for i in range(0, len(record_ids), _QUERY_CHUNK):
+            chunk = record_ids[i:i + _QUERY_CHUNK]
+            marks = ','.join('?' * len(chunk))
+            where = f"{column} IN ({marks}) AND source = 'rule'"
+            for student_id, opportunity_id in self._db.execute(
+                    f"SELECT student_id, opportunity_id FROM cells WHERE {where}", chunk).fetchall():
+                self._mark_removed(student_id, opportunity_id)
+            self._db.execute(f"DELETE FROM cells WHERE {where}", chunk)
+
+    def _agent_cells(self, opportunity_id):
+        rows = self._db.execute("SELECT student_id FROM cells WHERE opportunity_id = ? AND source = 'agent'",
+                                (opportunity_id,)).fetchall()
+        return {r[0] for r in rows}
+
+    def _delete(self, kind, record_ids):
+        column = 'opportunity_id' if kind == 'opportunity' else 'student_id'
+        record_ids = list(record_ids)
+        self._drop_rule_cells(column, record_ids)
+        for i in range(0, len(record_ids), _QUERY_CHUNK):
+            chunk = record_ids[i:i + _QUERY_CHUNK]
+            marks = ','.join('?' * len(chunk))
+            self._db.execute(f"DELETE FROM cells WHERE {column} IN ({marks})", chunk)
+            self._db.execute(f"DELETE FROM fingerprints WHERE kind = ? AND record_id IN ({marks})", [kind] + chunk)
+        if kind == 'opportunity':
+            for record_id in record_ids:
+                self.index.remove_opportunity(record_id)
+
+    def _fingerprints(self):
+        seen = {'student': {}, 'opportunity': {}}
+        for kind, record_id, fingerprint in self._db.execute("SELECT kind, record_id, fingerprint FROM fingerprints"):
+            seen[kind][record_id] = fingerprint
+        return seen
+
+    def _save_fingerprints(self, kind, fingerprints):
+        self._db.executemany("INSERT OR REPLACE INTO fingerprints VALUES (?, ?, ?)",
+                             [(kind, record_id, fp) for record_id, fp in fingerprints.items()])
+
+    def record_agent_matches(self, opportunity_id, matches):
+        """Store matches produced by the matching agent; they take precedence over rule cells"""
+        if opportunity_id is None:
+            return
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO cells VALUES (?, ?, ?, ?, 'agent', ?)",
+                [(str(m['student_id']), str(opportunity_id), float(m['match_score']), m.get('reasoning'), now)
+                 for m in matches]
+            )
+            self._db.commit()
+
+    def drain_changes(self):
+        """
+        (upserts, deletes) since the last call, shaped for the matches table:
+        rows written, and the (student_id, opportunity_id) keys of rule cells dropped
+        """
+        with self._lock:
+            changes = list(self._dirty.values())
+            removed = sorted(self._removed)
+            self._dirty = {}
+            self._removed = set()
+        return [{
+            "student_id": student_id,
+            "opportunity_id": opportunity_id,
+            "match_score": score,
+            "reasoning": reasoning
+        } for student_id, opportunity_id, score, reasoning in changes], removed
+
+    def feed(self, student_id, limit=50):
+        """Precomputed feed for one student, best score first"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT opportunity_id, score, reasoning FROM cells WHERE student_id = ? "
+                "ORDER BY score DESC LIMIT ?", (str(student_id), limit)
+            ).fetchall()
+        return [{"opportunity_id": o, "match_score": s, "reasoning": r} for o, s, r in rows]
+
+    def get_stats(self):
+        """Get matrix statistics"""
+        with self._lock:
+            cells = self._db.execute("SELECT COUNT(*) FROM cells").fetchone()[0]
+        return {
+            "cells": cells,
+            "students": len(self.engine.student_ids),
+            "opportunities": len(self.opportunities),
+            "timestamp": time.time()
+        }
@@ -6,142 +6,422 @@ Listens to Solace for new opportunities and publishes match results
 import os
 import json
 import time
-import requests
+import threading
+import functools
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from scoring_engine import ScoringEngine, rule_reasoning
+from llm_cache import LLMCache, opportunity_fingerprint, student_fingerprint
+from student_store import StudentStore
+from supabase_client import supabase
+from gemini_gateway import gemini_gateway
+from semantic_index import SemanticIndex
+from match_matrix import MatchMatrix
+from transport import get_transport
+from worker_pool import OrderedWorkerPool
+from scheduler import OpportunityScheduler
+from match_ledger import MatchLedger
+from log_writer import get_writer
+from metrics import counter, gauge, histogram, start_metrics_server, SLOW_BUCKETS
 
 load_dotenv()
 
-# API Keys
-GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
-SUPABASE_URL = os.getenv('SUPABASE_URL')
-SUPABASE_KEY = os.getenv('SUPABASE_KEY')
+# Gemini sharding: every student is covered, shards are sent concurrently
+GEMINI_SHARD_SIZE = int(os.getenv('GEMINI_SHARD_SIZE', '20'))
+GEMINI_MAX_CONCURRENCY = int(os.getenv('GEMINI_MAX_CONCURRENCY', '4'))
+MATCH_TOP_K = int(os.getenv('MATCH_TOP_K', '15'))
+
+# Retrieve-then-rerank: how many rule-based candidates are sent to Gemini (0 = everyone)
+MATCH_RECALL_BUDGET = int(os.getenv('MATCH_RECALL_BUDGET', '100'))
+# Extra candidates picked by semantic similarity on top of the rule-based ones
+MATCH_SEMANTIC_RECALL = int(os.getenv('MATCH_SEMANTIC_RECALL', '25'))
+
+# Match rows per bulk upsert request
+MATCH_WRITE_BATCH_SIZE = int(os.getenv('MATCH_WRITE_BATCH_SIZE', '500'))
+
+# Opportunities matched concurrently, opportunities accepted before intake blocks,
+# and seconds one opportunity may take before rule-based matches are used instead
+MATCH_WORKERS = int(os.getenv('MATCH_WORKERS', '4'))
+MATCH_QUEUE_SIZE = int(os.getenv('MATCH_QUEUE_SIZE', '16'))
+MATCH_TIMEOUT = float(os.getenv('MATCH_TIMEOUT', '120'))
+
+OPPORTUNITIES_MATCHED = counter('matching_opportunities_total', 'Opportunities matched (fallback rate denominator)')
+MATCHING_FALLBACKS = counter('matching_fallback_total', 'Rule-based matching used instead of Gemini', ['reason'])
+MATCHES_PER_OPPORTUNITY = histogram('matching_matches_per_opportunity', 'Matches found per opportunity',
+                                    buckets=(0, 1, 2, 5, 10, 15, 25, 50, 100))
+MATCHES_PUBLISHED = counter('matching_matches_published_total', 'New or changed matches sent downstream')
+MATCH_SECONDS = histogram('matching_duration_seconds', 'Time to compute the matches of one opportunity',
+                          buckets=SLOW_BUCKETS)
+METRICS_DEFAULT_PORT = 9102
+
+SCHEDULER_DEPTH = gauge('matching_scheduler_depth', 'Opportunities waiting in the matching scheduler')
+
+class MatchList(list):
+    """
+    Matches of one opportunity plus the student set version they were computed
+    against; the version travels with the result, so nothing is left behind
+    when a timed-out compute finishes after its opportunity was published
+    """
+
+    def __init__(self, matches, student_version=None):
+        super().__init__(matches)
+        self.student_version = student_version
+
 
 class MatchingAgent:
     def __init__(self):
         self.matched_count = 0
+        self._stats_lock = threading.Lock()
+        self.scoring_engine = ScoringEngine()
+        self._engine_lock = threading.Lock()
+        self.llm_cache = LLMCache()
+        self.student_store = StudentStore()
+        self.semantic_index = SemanticIndex()
+        self.match_matrix = MatchMatrix(index=self.semantic_index)
+        self.scheduler = OpportunityScheduler()
+        self.ledger = MatchLedger()
+        SCHEDULER_DEPTH.set_function(lambda: len(self.scheduler))
         print(" Matching Agent started")
         print(" Gemini AI matching engine initialized")
         print(" Listening for opportunity events...")
     
-    def listen_for_opportunities(self, intake_agent):
+    def listen_for_opportunities(self, consumer_group='matching', workers=MATCH_WORKERS):
         """
         Listens to Solace for new opportunity events
-        In production, this would use Solace SDK to subscribe to topics
+        Events wait in the priority scheduler (manual posts and the nearest
+        event dates first) and are dispatched to a bounded worker pool as
+        workers free up; acks still happen in arrival order
         """
-        while True:
-            # Get pending events from intake agent (simulating Solace)
-            events = intake_agent.get_pending_events()
-            
-            if events:
-                for event in events:
-                    if event['type'] == 'NEW_OPPORTUNITY':
-                        print(f"\n Received event: {event['topic']}")
-                        self.process_opportunity(event['data'])
-                
-                # Clear processed events
-                intake_agent.clear_queue()
-            
-            time.sleep(2)  # Check every 2 seconds
+        # Keep the pool queue short so the backlog is ordered by the scheduler
+        pool = self.create_worker_pool(workers, queue_size=workers)
+        stop = threading.Event()
+        
+        def on_event(event, ack):
+            if event['type'] == 'NEW_OPPORTUNITY':
+                print(f"\n Received event: {event['topic']} ({len(self.scheduler) + 1} waiting)")
+                self.scheduler.push(event['data'], on_done=ack)
+            else:
+                self.scheduler.skip(ack)
+        
+        def dispatch():
+            while not stop.is_set():
+                popped = self.scheduler.pop(timeout=1)
+                if popped:
+                    opportunity, ticket = popped
+                    pool.submit(opportunity, on_published=functools.partial(self.scheduler.done, ticket))
+        
+        dispatcher = threading.Thread(target=dispatch, name='matching-dispatcher', daemon=True)
+        dispatcher.start()
+        
+        subscription = get_transport().subscribe("opportunities/new", consumer_group, on_event, manual_ack=True)
+        try:
+            subscription.wait()
+        finally:
+            subscription.close()
+            stop.set()
+            dispatcher.join()
+            pool.close()
+    
+    def create_worker_pool(self, workers=MATCH_WORKERS, queue_size=MATCH_QUEUE_SIZE, timeout=MATCH_TIMEOUT):
+        """Pool that computes matches concurrently and publishes them in submission order"""
+        return OrderedWorkerPool(
+            work=self.compute_matches,
+            publish=self.publish_results,
+            workers=workers,
+            queue_size=queue_size,
+            timeout=timeout,
+            on_timeout=self._timeout_matches,
+            name='matching'
+        )
+    
+    def process_opportunities(self, opportunities, workers=MATCH_WORKERS):
+        """Match many opportunities concurrently, most urgent first (see scheduler.py)"""
+        opportunities = self.scheduler.prioritize(opportunities)
+        if workers <= 1:
+            for opportunity in opportunities:
+                self.process_opportunity(opportunity)
+            return
+        
+        pool = self.create_worker_pool(workers)
+        try:
+            for opportunity in opportunities:
+                pool.submit(opportunity)
+        finally:
+            pool.close()
     
     def process_opportunity(self, opportunity):
         """Process a new opportunity and match to students"""
+        matches = self.compute_matches(opportunity)
+        self.publish_results(opportunity, matches)
+    
+    def compute_matches(self, opportunity):
+        """Match one opportunity to students; returns matches, or None when skipped"""
         try:
+            # Students and their version come from one sync, so a concurrent sync
+            # cannot pair this list with a newer version
+            students, student_version = self.student_store.snapshot()
+            
+            # Same content under the same scoring version was matched against these students before
+            if self.ledger.is_processed(opportunity, student_version):
+                print(f" Already matched: {opportunity['title']} (skipping)")
+                return None
+            
             print(f"\n{'='*60}")
             print(f" MATCHING: {opportunity['title']}")
             print(f"{'='*60}")
             
-            # Get all students from database
-            students = self._get_all_students()
             print(f" Found {len(students)} students in database")
             
             if not students:
                 print("  No students found. Skipping matching.")
-                return
+                return None
             
-            # Use Gemini AI to find matches
-            print(f" Analyzing with Gemini AI...")
-            matches = self._match_with_gemini(opportunity, students)
+            # Keep the offline vector index in step with students and opportunities
+            self.semantic_index.sync_students(students)
+            self.semantic_index.upsert_opportunity(opportunity)
             
-            print(f" Found {len(matches)} high-quality matches!")
+            started = time.time()
             
-            # Publish matches to Solace
-            self._publish_matches(opportunity, matches)
+            # Stage 1: rule-based retrieval over the full student table
+            candidates = self._retrieve_candidates(opportunity, students)
+            print(f" Retrieved {len(candidates)} candidates (recall budget {MATCH_RECALL_BUDGET})")
             
-            # Log matches
-            self._log_matches(opportunity, matches)
+            # Stage 2: Gemini reranks and explains the candidates only
+            print(" Analyzing with Gemini AI...")
+            matches, degraded = self._match_with_gemini(opportunity, candidates)
             
-            self.matched_count += len(matches)
+            print(f" Found {len(matches)} high-quality matches for {opportunity['title']}!")
+            MATCH_SECONDS.observe(time.time() - started)
+            # Rule-based (partial) results carry no version, so the ledger retries them with Gemini
+            return MatchList(matches, None if degraded else student_version)
             
         except Exception as e:
             print(f" Error processing opportunity: {e}")
+            return None
     
-    def _get_all_students(self):
-        """Get all student profiles from Supabase"""
+    def publish_results(self, opportunity, matches, publish_event=True):
+        """
+        Publish, log and count the matches of one opportunity; returns the matches sent downstream.
+        publish_event=False saves the matches without the matches/found event, for callers
+        that notify students themselves
+        """
+        if matches is None:
+            return
+        # Fallback results carry no version: they are re-matched on the next run
+        student_version = getattr(matches, 'student_version', None)
+        
+        # Only matches that are new or changed since the last run go downstream
+        delta = self.ledger.delta(opportunity, matches)
+        
+        # Publish matches to Solace
+        published = self._publish_matches(opportunity, matches, delta, publish_event)
+        if published is not None:
+            # Unsaved matches stay out of the ledger so the next run retries them
+            self.ledger.record(opportunity, published, complete=len(published) == len(delta),
+                               student_version=student_version)
+        
+        # Log matches
+        self._log_matches(opportunity, matches)
+        
+        with self._stats_lock:
+            self.matched_count += len(matches)
+        OPPORTUNITIES_MATCHED.inc()
+        MATCHES_PER_OPPORTUNITY.observe(len(matches))
+        MATCHES_PUBLISHED.inc(len(published or []))
+        return published
+    
+    def _timeout_matches(self, opportunity):
+        """Rule-based matches for an opportunity whose Gemini matching took too long"""
+        print(f"  Matching {opportunity.get('title')} timed out, using rule-based matching")
+        MATCHING_FALLBACKS.labels(reason='timeout').inc()
         try:
-            response = requests.get(
-                f"{SUPABASE_URL}/rest/v1/students?select=*",
-                headers={
-                    'apikey': SUPABASE_KEY,
-                    'Authorization': f'Bearer {SUPABASE_KEY}'
-                }
-            )
-            
-            if response.status_code == 200:
-                return response.json()
-            else:
-                print(f"  Error fetching students: {response.status_code}")
-                return []
-                
+            return self._simple_match(opportunity, self._get_all_students())
         except Exception as e:
-            print(f" Database error: {e}")
-            return []
+            print(f" Error in fallback matching: {e}")
+            return None
     
-    def _match_with_gemini(self, opportunity, students):
-        """Use Gemini AI to intelligently match students to opportunity"""
+    def update_match_matrix(self, opportunities):
+        """
+        Refresh the precomputed student x opportunity matrix (only new rows
+        and columns are scored) and push changed cells to the matches table,
+        which is what student feeds read.
+        """
         try:
-            # Prepare prompt for Gemini
-            prompt = self._create_matching_prompt(opportunity, students)
+            students = self._get_all_students()
+            columns, rows = self.match_matrix.sync(students, opportunities)
+            changes, removed = self.match_matrix.drain_changes()
+            print(f"🧮 Match matrix: {columns} new/changed opportunities, {rows} new/changed students, "
+                  f"{len(changes)} cells updated, {len(removed)} dropped")
             
-            # Call Gemini API
-            response = requests.post(
-                f"https://generativelanguage.googleapis.com/v1beta/models/gemini-3-flash-preview:generateContent?key={GEMINI_API_KEY}",
-                headers={'Content-Type': 'application/json'},
-                json={
-                    "contents": [{
-                        "parts": [{"text": prompt}]
-                    }]
-                }
-            )
+            if changes:
+                saved, failures = self.save_matches(changes)
+                print(f"✅ Pushed {saved}/{len(changes)} precomputed matches to database")
+            if removed:
+                deleted = self.delete_matches(removed)
+                print(f"🗑️  Deleted {deleted}/{len(removed)} dropped precomputed matches from database")
+        except Exception as e:
+            print(f"❌ Error updating match matrix: {e}")
+    
+    def _retrieve_candidates(self, opportunity, students):
+        """
+        First stage of the pipeline: score every student with the rule-based
+        engine and keep the best MATCH_RECALL_BUDGET as candidates for Gemini.
+        Candidates are not filtered by the match threshold; Gemini decides.
+        The MATCH_SEMANTIC_RECALL students closest to the opportunity text
+        are added as well, so relevant students outside the tags are not lost.
+        """
+        if MATCH_RECALL_BUDGET <= 0 or len(students) <= MATCH_RECALL_BUDGET:
+            return students
+        
+        # The shared engine holds one student list at a time
+        with self._engine_lock:
+            self.scoring_engine.load(students)
+            scores = self.scoring_engine.score(opportunity)
+            similarity = self.semantic_index.score_students(opportunity, self.scoring_engine.student_ids)
+            ranked = list(self.scoring_engine.rank(scores, limit=MATCH_RECALL_BUDGET, min_score=0,
+                                                   tiebreak=similarity))
+        
+        if MATCH_SEMANTIC_RECALL > 0:
+            chosen = set(ranked)
+            for i in np.argsort(-similarity, kind='stable')[:MATCH_SEMANTIC_RECALL]:
+                if similarity[i] > 0 and i not in chosen:
+                    ranked.append(i)
+        
+        return [students[i] for i in ranked]
+    
+    def _get_all_students(self):
+        """Get all student profiles (in-memory store, delta-synced with Supabase)"""
+        return self.student_store.get_all()
+    
+    def invalidate_students(self):
+        """
+        Reload the students table on the next match. Call after editing or deleting
+        students: the delta sync only sees rows with a newer watermark
+        """
+        self.student_store.invalidate()
+    
+    def _match_with_gemini(self, opportunity, students):
+        """
+        Use Gemini AI to intelligently match students to opportunity.
+        The population is split into prompt-sized shards that are sent
+        concurrently, then merged into one globally ranked top-k list.
+        Pairs already answered by Gemini are served from the LLM cache.
+        Returns (matches, degraded): degraded when some students fell back to rule-based matching
+        """
+        # Pairs Gemini already judged (same opportunity + same profile) skip the network
+        opportunity_fp = opportunity_fingerprint(opportunity)
+        student_fps = {str(s['id']): student_fingerprint(s) for s in students}
+        cached = self.llm_cache.get_many(opportunity_fp, list(student_fps.values()))
+        
+        matches = []
+        uncached = []
+        for student in students:
+            hit = cached.get(student_fps[str(student['id'])])
+            if hit is None:
+                uncached.append(student)
+            elif hit[0] is not None:
+                matches.append({
+                    'student_id': student['id'],
+                    'match_score': hit[0],
+                    'reasoning': hit[1]
+                })
+        
+        if cached:
+            print(f"  LLM cache: {len(cached)} hit(s), {len(uncached)} miss(es)")
+        
+        shards = [uncached[i:i + GEMINI_SHARD_SIZE] for i in range(0, len(uncached), GEMINI_SHARD_SIZE)]
+        failed_students = []
+        if shards and not gemini_gateway.is_available():
+            # Breaker is open: go straight to the rule-based path, no waiting
+            print(f"⚠️  Gemini unavailable ({gemini_gateway.breaker.state}), skipping LLM call")
+            failed_students = uncached
+        elif shards:
+            print(f"  Sending {len(uncached)} students in {len(shards)} shard(s) "
+                  f"(max {GEMINI_MAX_CONCURRENCY} concurrent)")
             
-            if response.status_code == 200:
-                data = response.json()
-                text = data['candidates'][0]['content']['parts'][0]['text']
-                
-                # Parse JSON response
-                matches = self._parse_gemini_response(text)
+            with ThreadPoolExecutor(max_workers=min(GEMINI_MAX_CONCURRENCY, len(shards))) as pool:
+                futures = [pool.submit(self._match_shard, opportunity, shard) for shard in shards]
                 
-                # Display matches
-                for match in matches:
-                    student = next((s for s in students if s['id'] == match['student_id']), None)
-                    if student:
-                        print(f"  ✓ {student['name']} ({match['match_score']}%) - {match['reasoning']}")
-                
-                return matches
-            else:
-                print(f"⚠️  Gemini API error: {response.status_code}")
-                # Fallback to simple matching
-                return self._simple_match(opportunity, students)
-                
-        except Exception as e:
-            print(f"❌ Gemini error: {e}")
+                # Collect in shard order so fallback keeps the original student order
+                for future, shard in zip(futures, shards):
+                    try:
+                        shard_matches = future.result()
+                    except Exception as e:
+                        print(f"⚠️  Gemini shard failed ({len(shard)} students): {e}")
+                        failed_students.extend(shard)
+                        continue
+                    
+                    matches.extend(shard_matches)
+                    self._cache_shard(opportunity_fp, student_fps, shard, shard_matches)
+        
+        if failed_students and len(failed_students) == len(students):
             # Fallback to simple matching
-            return self._simple_match(opportunity, students)
+            MATCHING_FALLBACKS.labels(reason='gemini').inc()
+            return self._simple_match(opportunity, students), True
+        if failed_students:
+            MATCHING_FALLBACKS.labels(reason='partial').inc()
+            matches.extend(self._simple_match(opportunity, failed_students))
+        
+        matches = self._rank_matches(matches)
+        
+        # Display matches
+        students_by_id = {str(s['id']): s for s in students}
+        for match in matches:
+            student = students_by_id.get(str(match['student_id']))
+            if student:
+                print(f"  ✓ {student['name']} ({match['match_score']}%) - {match['reasoning']}")
+        
+        return matches, bool(failed_students)
     
-    def _create_matching_prompt(self, opportunity, students):
-        """Create the prompt for Gemini"""
-        # Limit to first 20 students for faster response
-        students_sample = students[:20]
+    def _cache_shard(self, opportunity_fp, student_fps, shard, shard_matches):
+        """
+        Remember Gemini's verdict for every student of a successful shard.
+        Only called once the reply parsed, so absent students are real "no match" verdicts
+        """
+        results = {student_fps[str(s['id'])]: (None, None) for s in shard}
+        for match in shard_matches:
+            try:
+                score = float(match['match_score'])
+            except (KeyError, TypeError, ValueError):
+                continue
+            results[student_fps[str(match['student_id'])]] = (score, match.get('reasoning', ''))
+        try:
+            self.llm_cache.put_many(opportunity_fp, results)
+        except Exception as e:
+            print(f"⚠️  Error writing LLM cache: {e}")
+    
+    def _match_shard(self, opportunity, shard):
+        """Match one shard of students with a single Gemini call (raises on API errors and unparseable replies)"""
+        prompt = self._create_matching_prompt(opportunity, shard)
+        text = gemini_gateway.generate(prompt)
+        
+        # Parse JSON response and drop ids Gemini made up or took from elsewhere
+        shard_ids = {str(s['id']) for s in shard}
+        return [m for m in self._parse_gemini_response(text)
+                if isinstance(m, dict) and str(m.get('student_id')) in shard_ids]
+    
+    def _rank_matches(self, matches):
+        """Merge shard results: one entry per student, best score first, top-k"""
+        best = {}
+        for match in matches:
+            try:
+                match['match_score'] = float(match['match_score'])
+            except (KeyError, TypeError, ValueError):
+                continue
+            if match['match_score'].is_integer():
+                match['match_score'] = int(match['match_score'])
+            match.setdefault('reasoning', '')
+            
+            key = str(match['student_id'])
+            if key not in best or match['match_score'] > best[key]['match_score']:
+                best[key] = match
         
+        ranked = sorted(best.values(), key=lambda m: m['match_score'], reverse=True)
+        return ranked[:MATCH_TOP_K]
+    
+    def _create_matching_prompt(self, opportunity, students):
+        """Create the prompt for Gemini (one shard of students)"""
         return f"""You are a university opportunity matching system.
 
 Opportunity:
@@ -149,11 +429,11 @@ Opportunity:
 - Description: {opportunity['description']}
 - Category: {opportunity['category']}
 - Type: {opportunity['type']}
-- Target Programs: {', '.join(opportunity.get('target_programs', []))}
-- Target Years: {', '.join(map(str, opportunity.get('target_years', [])))}
-- Target Interests: {', '.join(opportunity.get('target_interests', []))}
+- Target Programs: {', '.join(opportunity.get('target_programs') or [])}
+- Target Years: {', '.join(map(str, opportunity.get('target_years') or []))}
+- Target Interests: {', '.join(opportunity.get('target_interests') or [])}
 
-Students (showing first {len(students_sample)}):
+Students ({len(students)}):
 {json.dumps([{
     'id': s['id'],
     'name': s['name'],
@@ -161,7 +441,7 @@ Students (showing first {len(students_sample)}):
     'year': s['year'],
     'interests': s.get('interests', []),
     'ethnicity': s.get('ethnicity', [])
-} for s in students_sample], indent=2)}
+} for s in students], indent=2)}
 
 Analyze and return ONLY students with match_score > 70.
 Return JSON array with this exact format:
@@ -176,107 +456,148 @@ Return JSON array with this exact format:
 Return ONLY the JSON array, no other text."""
     
     def _parse_gemini_response(self, text):
-        """Parse Gemini's JSON response"""
+        """
+        Parse Gemini's JSON response. Raises ValueError on a malformed or
+        truncated reply, so the shard falls back to rule-based matching
+        instead of being cached as "no match" for everyone
+        """
+        # Clean up response
+        clean_text = (text or '').strip()
+        if clean_text.startswith('```json'):
+            clean_text = clean_text[7:]
+        if clean_text.endswith('```'):
+            clean_text = clean_text[:-3]
+        clean_text = clean_text.strip()
+        
+        # Parse JSON
         try:
-            # Clean up response
-            clean_text = text.strip()
-            if clean_text.startswith('```json'):
-                clean_text = clean_text[7:]
-            if clean_text.endswith('```'):
-                clean_text = clean_text[:-3]
-            clean_text = clean_text.strip()
-            
-            # Parse JSON
             matches = json.loads(clean_text)
-            return matches
-            
-        except Exception as e:
-            print(f"⚠️  Error parsing Gemini response: {e}")
-            return []
+        except ValueError as e:
+            raise ValueError(f"Unparseable Gemini response: {e}") from e
+        if not isinstance(matches, list):
+            raise ValueError(f"Gemini response is a {type(matches).__name__}, expected a list")
+        return matches
     
     def _simple_match(self, opportunity, students):
-        """Fallback simple matching based on program and year"""
+        """Fallback simple matching based on program, year and interests"""
         print("🔄 Using simple fallback matching...")
-        matches = []
         
-        # 🔥 FIX: Gérer les None et listes vides
-        target_programs = opportunity.get('target_programs') or []
-        target_years = opportunity.get('target_years') or []
-        target_interests = opportunity.get('target_interests') or []
+        # Vectorized scoring over the whole population (see scoring_engine.py)
+        # Equal rule scores (e.g. open-to-all events) are ordered by semantic similarity
+        with self._engine_lock:
+            self.scoring_engine.load(students)
+            similarity = self.semantic_index.score_students(opportunity, self.scoring_engine.student_ids)
+            ranked = self.scoring_engine.top_matches(opportunity, limit=15, tiebreak=similarity)  # Top 15
         
-        # Si aucun critère, accepter tout le monde
-        if not target_programs and not target_years and not target_interests:
-            for student in students[:15]:  # Limiter à 10
-                matches.append({
-                    'student_id': student['id'],
-                    'match_score': 75,
-                    'reasoning': f"Open to all students - {student['program']}, Year {student['year']}"
-                })
-            return matches
+        return [{
+            'student_id': student['id'],
+            'match_score': score,
+            'reasoning': rule_reasoning(student, opportunity)
+        } for student, score in ranked]
+    
+    def save_matches(self, rows):
+        """
+        Bulk upsert match rows, MATCH_WRITE_BATCH_SIZE per request.
+        Conflicts on (student_id, opportunity_id) update the existing row,
+        which needs a unique constraint on those two columns in Supabase.
+        Returns (saved_count, [(row, error), ...]).
+        """
+        saved = 0
+        failures = []
+        for i in range(0, len(rows), MATCH_WRITE_BATCH_SIZE):
+            batch_saved, batch_failures = self._upsert_match_batch(rows[i:i + MATCH_WRITE_BATCH_SIZE])
+            saved += batch_saved
+            failures.extend(batch_failures)
+        return saved, failures
+    
+    def delete_matches(self, keys):
+        """
+        Delete match rows by (student_id, opportunity_id), one request per
+        opportunity and MATCH_WRITE_BATCH_SIZE students. Returns the number of keys deleted
+        """
+        by_opportunity = {}
+        for student_id, opportunity_id in keys:
+            by_opportunity.setdefault(opportunity_id, []).append(student_id)
         
-        # Sinon, matcher normalement
-        accept_all_programs = not target_programs or 'All Programs' in target_programs
+        deleted = 0
+        for opportunity_id, student_ids in by_opportunity.items():
+            for i in range(0, len(student_ids), MATCH_WRITE_BATCH_SIZE):
+                chunk = student_ids[i:i + MATCH_WRITE_BATCH_SIZE]
+                try:
+                    response = supabase.delete('matches', {
+                        'opportunity_id': f'eq.{opportunity_id}',
+                        'student_id': f"in.({','.join(chunk)})"
+                    })
+                except Exception as e:
+                    print(f"  ⚠️  Error deleting matches of opportunity {opportunity_id}: {e}")
+                    continue
+                if 200 <= response.status_code < 300:
+                    deleted += len(chunk)
+                else:
+                    print(f"  ⚠️  Error deleting matches of opportunity {opportunity_id}: "
+                          f"{response.status_code} {response.text}")
+        return deleted
+    
+    def _upsert_match_batch(self, rows):
+        """POST one array of rows; if it is rejected, split it to find the bad rows"""
+        if not rows:
+            return 0, []
         
-        for student in students:
-            score = 50
-            
-            # Program match
-            if accept_all_programs or student['program'] in target_programs:
-                score += 20
-            
-            # Year match
-            if not target_years or student['year'] in target_years:
-                score += 15
-            
-            # Interests match
-            if target_interests and student.get('interests'):
-                matching = set(target_interests) & set(student['interests'])
-                if matching:
-                    score += 15
-            
-            if score >= 65:
-                matches.append({
-                    'student_id': student['id'],
-                    'match_score': min(score, 90),
-                    'reasoning': f"Matches {student['program']}, Year {student['year']}"
-                })
+        try:
+            response = supabase.insert('matches', rows, on_conflict='student_id,opportunity_id')
+            ok = 200 <= response.status_code < 300
+            error = None if ok else f"{response.status_code} {response.text}"
+        except Exception as e:
+            ok = False
+            error = str(e)
         
-        return matches[:15]  # Top 15
+        if ok:
+            return len(rows), []
+        if len(rows) == 1:
+            return 0, [(rows[0], error)]
+        
+        # One bad row fails the whole array: bisect to report failures per row
+        middle = len(rows) // 2
+        left_saved, left_failures = self._upsert_match_batch(rows[:middle])
+        right_saved, right_failures = self._upsert_match_batch(rows[middle:])
+        return left_saved + right_saved, left_failures + right_failures
     
-    def _publish_matches(self, opportunity, matches):
-        """Publish matches to Solace AND save to database"""
+    def _publish_matches(self, opportunity, matches, delta, publish_event=True):
+        """
+        Publish matches to Solace AND save to database.
+        Only delta (new or changed matches) is written and published; returns
+        the delta matches that were saved, or None on error
+        """
         try:
+            # Agent results take precedence over rule cells in the precomputed matrix
+            self.match_matrix.record_agent_matches(opportunity.get('id'), matches)
+            
+            if not delta:
+                print(f"\n✅ No new or changed matches ({len(matches)} already published)")
+                return []
+            
             # 1. Save to database first
-            print(f"\n💾 Saving {len(matches)} matches to database...")
+            print(f"\n💾 Saving {len(delta)} new/changed matches to database ({len(matches)} total)...")
             
-            saved = 0
-            for match in matches:
-                match_data = {
-                    "student_id": match['student_id'],
-                    "opportunity_id": opportunity.get('id'),
-                    "match_score": match['match_score'],
-                    "reasoning": match['reasoning']
-                }
-                
-                response = requests.post(
-                    f"{SUPABASE_URL}/rest/v1/matches",
-                    headers={
-                        'apikey': SUPABASE_KEY,
-                        'Authorization': f'Bearer {SUPABASE_KEY}',
-                        'Content-Type': 'application/json',
-                        'Prefer': 'return=representation'
-                    },
-                    json=match_data
-                )
-                
-                if response.status_code == 201:
-                    saved += 1
-                    student_id_short = str(match['student_id'])[:8]
-                    print(f"  ✅ Match saved for student {student_id_short}...")
-                else:
-                    print(f"  ❌ Failed to save match: {response.text}")
+            rows = [{
+                "student_id": match['student_id'],
+                "opportunity_id": opportunity.get('id'),
+                "match_score": match['match_score'],
+                "reasoning": match['reasoning']
+            } for match in delta]
+            
+            saved, failures = self.save_matches(rows)
+            failed = set()
+            for row, error in failures:
+                failed.add(str(row['student_id']))
+                student_id_short = str(row['student_id'])[:8]
+                print(f"  ❌ Failed to save match for student {student_id_short}...: {error}")
+            
+            print(f"✅ Saved {saved}/{len(delta)} matches to database")
             
-            print(f"✅ Saved {saved}/{len(matches)} matches to database")
+            delta = [match for match in delta if str(match['student_id']) not in failed]
+            if not delta:
+                return []
             
             # 2. Then publish to Solace (simulated)
             event = {
@@ -285,30 +606,32 @@ Return ONLY the JSON array, no other text."""
                 "data": {
                     "opportunity_id": opportunity.get('id'),
                     "opportunity_title": opportunity['title'],
-                    "matches": matches,
-                    "match_count": len(matches)
+                    "matches": delta,
+                    "match_count": len(delta)
                 },
                 "timestamp": time.time()
             }
             
-            print(f"\n📢 Publishing to Solace topic: matches/found")
-            
-            # Save event (simulating Solace)
             self._save_event(event)
+            if not publish_event:
+                return delta
             
-            print(f"✅ Published {len(matches)} matches!")
+            print("\n📢 Publishing to Solace topic: matches/found")
+            get_transport().publish("matches/found", event)
+            
+            print(f"✅ Published {len(delta)} matches!")
+            return delta
             
         except Exception as e:
             print(f"❌ Error publishing matches: {e}")
             import traceback
             traceback.print_exc()
+            return None
     
     def _save_event(self, event):
         """Save event to file"""
         try:
-            os.makedirs('backend/logs', exist_ok=True)
-            with open('backend/logs/matching_events.json', 'a') as f:
-                f.write(json.dumps(event) + '\n')
+            get_writer('matching_events.json').write(event)
         except Exception as e:
             print(f"⚠️  Error saving event: {e}")
     
@@ -322,12 +645,19 @@ Return ONLY the JSON array, no other text."""
                 "matches": matches
             }
             
-            os.makedirs('backend/logs', exist_ok=True)
-            with open('backend/logs/matches.json', 'a') as f:
-                f.write(json.dumps(log_entry) + '\n')
-                
+            get_writer('matches.json').write(log_entry)
+            
         except Exception as e:
             print(f"⚠️  Error logging: {e}")
+    
+    def get_stats(self):
+        """Get matching statistics, including the scheduler's queue depth and wait times"""
+        return {
+            "total_matches": self.matched_count,
+            "scheduler": self.scheduler.get_stats(),
+            "ledger": self.ledger.get_stats(),
+            "timestamp": time.time()
+        }
 
 # Global instance
 matching_agent = MatchingAgent()
@@ -337,19 +667,20 @@ if __name__ == "__main__":
     print("🤖 MATCHING AGENT - Gemini AI Matcher")
     print("="*60)
     
-    # Import intake agent to listen to its events
+    start_metrics_server(METRICS_DEFAULT_PORT)
+    
     try:
-        from intake_agent import intake_agent
-        
         print("\n⚡ Agent is running. Press Ctrl+C to stop.")
         print("👂 Listening for new opportunities from Intake Agent...")
         
-        # Start listening
-        matching_agent.listen_for_opportunities(intake_agent)
+        # Start listening (events come from the shared event log)
+        matching_agent.listen_for_opportunities()
         
     except KeyboardInterrupt:
         print("\n\n👋 Matching Agent stopped")
-        print(f"📊 Total matches made: {matching_agent.matched_count}")
+        stats = matching_agent.get_stats()
+        print(f"📊 Total matches made: {stats['total_matches']}")
+        print(f"⏱️  Scheduler: {stats['scheduler']['dispatched']} dispatched, "
+              f"p95 wait {stats['scheduler']['wait_p95']:.1f}s, {stats['scheduler']['depth']} still waiting")
     except Exception as e:
-        print(f"\n❌ Error: {e}")
-        print("💡 Make sure intake_agent.py is in the same directory")
\ No newline at end of file
+        print(f"\n❌ Error: {e}")
\ No newline at end of file
@@ -4,70 +4,88 @@ Listens to Solace for match events and notifies students
 """
 
 import os
-import json
 import time
-import requests
+import threading
+from collections import OrderedDict, deque
 from dotenv import load_dotenv
+from supabase_client import supabase
+from transport import get_transport
+from log_writer import get_writer
+from metrics import counter, gauge, start_metrics_server
 
 load_dotenv()
 
-SUPABASE_URL = os.getenv('SUPABASE_URL')
-SUPABASE_KEY = os.getenv('SUPABASE_KEY')
+# Seconds a student's matches are collected before one digest is sent (0 = immediately)
+NOTIFICATION_DIGEST_WINDOW = float(os.getenv('NOTIFICATION_DIGEST_WINDOW', '30'))
+# Seconds a looked-up student profile is reused
+STUDENT_CACHE_TTL = float(os.getenv('STUDENT_CACHE_TTL', '60'))
+# Student ids per id=in.(...) query (keeps the URL length bounded)
+STUDENT_LOOKUP_BATCH = int(os.getenv('STUDENT_LOOKUP_BATCH', '200'))
+# Idempotency keys remembered to drop redelivered matches
+NOTIFICATION_SEEN_KEYS = int(os.getenv('NOTIFICATION_SEEN_KEYS', '100000'))
+# Backoff before retrying a digest whose student lookup failed (doubles per attempt, up to the max)
+NOTIFICATION_RETRY_SECONDS = float(os.getenv('NOTIFICATION_RETRY_SECONDS', '2'))
+NOTIFICATION_RETRY_MAX_SECONDS = float(os.getenv('NOTIFICATION_RETRY_MAX_SECONDS', '300'))
+METRICS_DEFAULT_PORT = 9103
+
+NOTIFICATIONS_SENT = counter('notifications_sent_total', 'Matches delivered to students')
+DIGESTS_SENT = counter('notification_digests_sent_total', 'Digests sent (one per student per window)')
+DUPLICATES_SKIPPED = counter('notification_duplicates_skipped_total', 'Redelivered matches dropped by idempotency key')
+PENDING_STUDENTS = gauge('notification_pending_students', 'Students with matches waiting for their digest')
+
+class _Delivery:
+    """One received match event: acknowledged once all of its students' digests went out"""
+    __slots__ = ('remaining', 'ack')
+
+    def __init__(self, ack):
+        self.remaining = 0
+        self.ack = ack
 
 class NotificationAgent:
-    def __init__(self):
+    def __init__(self, digest_window=NOTIFICATION_DIGEST_WINDOW):
         self.notifications_sent = 0
+        self.digests_sent = 0
+        self.digest_window = digest_window
+        self._pending = {}        # student_id -> {"since": ts, "items": [...], "deliveries": [...]}
+        self._deliveries = deque()  # Received events in order, until their digests are sent
+        self._student_cache = {}  # student_id -> (student or None, expires_at)
+        self._cache_lock = threading.Lock()
+        self._seen_keys = OrderedDict()
+        self.duplicates_skipped = 0
+        self._lock = threading.Lock()
+        PENDING_STUDENTS.set_function(lambda: len(self._pending))
         print(" Notification Agent started")
         print(" Ready to send notifications to students")
         print(" Listening for match events...")
     
-    def listen_for_matches(self):
+    def listen_for_matches(self, consumer_group='notification'):
         """
         Listens to Solace for match events
-        In production, this would use Solace SDK
+        Events are pushed to process_match_event as they are published
         """
         print("\n Monitoring match events...")
         
-        last_position = 0
-        
-        while True:
-            try:
-                # Read match events from file (simulating Solace)
-                events = self._read_match_events(last_position)
-                
-                if events:
-                    for event in events:
-                        self.process_match_event(event)
-                        last_position += 1
-                
-                time.sleep(2)  # Check every 2 seconds
-                
-            except FileNotFoundError:
-                # No events yet
-                time.sleep(5)
-            except Exception as e:
-                print(f" Error: {e}")
-                time.sleep(5)
-    
-    def _read_match_events(self, start_from):
-        """Read match events from log file"""
+        # Events are acknowledged only once their digests are sent, so matches
+        # waiting in a digest window are redelivered after a crash
+        subscription = get_transport().subscribe("matches/found", consumer_group, self.process_match_event,
+                                                 manual_ack=True)
         try:
-            with open('backend/logs/matching_events.json', 'r') as f:
-                lines = f.readlines()
-                
-            # Get new events only
-            new_events = []
-            for i in range(start_from, len(lines)):
-                event = json.loads(lines[i])
-                new_events.append(event)
-            
-            return new_events
-            
-        except FileNotFoundError:
-            return []
+            # Wake up once a second to send digests whose window has elapsed
+            while not subscription.wait(1):
+                self.flush_digests()
+        finally:
+            self.flush_digests(force=True)
+            subscription.close()
     
-    def process_match_event(self, event):
-        """Process a match event and notify students"""
+    def process_match_event(self, event, ack=None):
+        """
+        Queue a match event's students for their next digest.
+        ack (if given) runs once every digest carrying this event's matches is
+        sent; acks run in the order events were received
+        """
+        delivery = _Delivery(ack)
+        with self._lock:
+            self._deliveries.append(delivery)
         try:
             if event['type'] != 'MATCHES_FOUND':
                 return
@@ -79,36 +97,117 @@ class NotificationAgent:
             print(f"\n{'='*60}")
             print(f" NEW MATCHES for: {opportunity_title}")
             print(f"{'='*60}")
-            print(f" Notifying {len(matches)} students...")
-            
-            for match in matches:
-                self._notify_student(match, opportunity_title)
+            print(f" Queued {len(matches)} students for notification")
             
-            print(f" All notifications sent!")
+            now = time.time()
+            with self._lock:
+                for match in matches:
+                    # Redelivered event (at-least-once transport): already queued once.
+                    # The ledger re-emits a changed score under the same key, so the score is part of it
+                    key = match.get('idempotency_key')
+                    if key:
+                        key = (key, match['match_score'])
+                        if key in self._seen_keys:
+                            self.duplicates_skipped += 1
+                            DUPLICATES_SKIPPED.inc()
+                            continue
+                        self._seen_keys[key] = True
+                        if len(self._seen_keys) > NOTIFICATION_SEEN_KEYS:
+                            self._seen_keys.popitem(last=False)
+                    pending = self._pending.setdefault(match['student_id'],
+                                                       {"since": now, "items": [], "deliveries": []})
+                    pending["items"].append({
+                        "opportunity_title": opportunity_title,
+                        "match_score": match['match_score'],
+                        "reasoning": match['reasoning']
+                    })
+                    pending["deliveries"].append(delivery)
+                    delivery.remaining += 1
             
         except Exception as e:
             print(f" Error processing event: {e}")
+        finally:
+            self._release_acks()
+        
+        if self.digest_window <= 0:
+            self.flush_digests(force=True)
+    
+    def _release_acks(self):
+        """Run the acks of the leading events whose digests have all been sent"""
+        acks = []
+        with self._lock:
+            while self._deliveries and self._deliveries[0].remaining == 0:
+                ack = self._deliveries.popleft().ack
+                if ack:
+                    acks.append(ack)
+        for ack in acks:
+            ack()
     
-    def _notify_student(self, match, opportunity_title):
-        """Send notification to a student"""
+    def flush_digests(self, force=False):
+        """
+        Send one digest per student whose window has elapsed (all of them if force).
+        Digests waiting to retry a failed student lookup are sent once their backoff is over
+        """
+        now = time.time()
+        with self._lock:
+            due = {student_id: pending for student_id, pending in self._pending.items()
+                   if pending.get("retry_at", 0) <= now
+                   and (force or now - pending["since"] >= self.digest_window)}
+            for student_id in due:
+                del self._pending[student_id]
+        
+        if not due:
+            return 0
+        
+        # One lookup for every student of every event in the window
+        students = self._get_students(list(due))
+        
+        sent = 0
+        retry = {}
+        for student_id, pending in due.items():
+            if student_id not in students:
+                # Lookup failed: keep the digest and retry it after a backoff instead of dropping it
+                attempts = pending.get("attempts", 0) + 1
+                pending["attempts"] = attempts
+                pending["retry_at"] = now + min(NOTIFICATION_RETRY_MAX_SECONDS,
+                                                NOTIFICATION_RETRY_SECONDS * 2 ** (attempts - 1))
+                retry[student_id] = pending
+                continue
+            self._send_digest(student_id, students[student_id], pending["items"])
+            sent += 1
+        
+        with self._lock:
+            for student_id, pending in due.items():
+                if student_id in retry:
+                    newer = self._pending.get(student_id)
+                    if newer:
+                        pending["items"].extend(newer["items"])
+                        pending["deliveries"].extend(newer["deliveries"])
+                    self._pending[student_id] = pending
+                else:
+                    for delivery in pending["deliveries"]:
+                        delivery.remaining -= 1
+        self._release_acks()
+        
+        if retry:
+            print(f" {len(retry)} digests kept for retry (student lookup failed)")
+        print(f" Sent {sent} digests")
+        return sent
+    
+    def _send_digest(self, student_id, student, items):
+        """Send one notification covering all of a student's new matches"""
         try:
-            student_id = match['student_id']
-            match_score = match['match_score']
-            reasoning = match['reasoning']
-            
-            # Get student details
-            student = self._get_student(student_id)
-            
             if not student:
                 print(f"   Student {student_id} not found")
                 return
             
+            items = sorted(items, key=lambda item: item['match_score'], reverse=True)
+            
             # Create notification
             notification = {
                 "student_id": student_id,
-                "opportunity_title": opportunity_title,
-                "match_score": match_score,
-                "reasoning": reasoning,
+                "matches": items,
+                "match_count": len(items),
                 "timestamp": time.time(),
                 "status": "sent"
             }
@@ -117,50 +216,72 @@ class NotificationAgent:
             self._log_notification(notification)
             
             # Display notification
-            print(f"   → {student['name']}")
-            print(f"     Match: {match_score}% - {reasoning}")
+            print(f"   → {student['name']} ({len(items)} new matches)")
+            for item in items:
+                print(f"     Match: {item['match_score']}% - {item['opportunity_title']} - {item['reasoning']}")
             
             # In production: Send actual email/push notification
-            # self._send_email(student['email'], opportunity_title, reasoning)
+            # self._send_email(student['email'], items)
             
-            self.notifications_sent += 1
+            self.notifications_sent += len(items)
+            self.digests_sent += 1
+            NOTIFICATIONS_SENT.inc(len(items))
+            DIGESTS_SENT.inc()
             
         except Exception as e:
             print(f"  Error notifying student: {e}")
     
-    def _get_student(self, student_id):
-        """Get student details from database"""
-        try:
-            response = requests.get(
-                f"{SUPABASE_URL}/rest/v1/students?id=eq.{student_id}&select=*",
-                headers={
-                    'apikey': SUPABASE_KEY,
-                    'Authorization': f'Bearer {SUPABASE_KEY}'
-                }
-            )
+    def _get_students(self, student_ids):
+        """
+        Get student details for many ids: TTL cache first, then id=in.(...) queries.
+        Unknown students map to None; ids whose lookup failed are left out
+        """
+        now = time.time()
+        found = {}
+        missing = []
+        with self._cache_lock:
+            for student_id in student_ids:
+                cached = self._student_cache.get(student_id)
+                if cached and cached[1] > now:
+                    found[student_id] = cached[0]
+                else:
+                    missing.append(student_id)
+        
+        for i in range(0, len(missing), STUDENT_LOOKUP_BATCH):
+            batch = missing[i:i + STUDENT_LOOKUP_BATCH]
+            try:
+                ids = ','.join(str(student_id) for student_id in batch)
+                rows = supabase.select('students', {'id': f'in.({ids})', 'select': '*'})
+            except Exception as e:
+                print(f"   Error fetching students: {e}")
+                continue
             
-            if response.status_code == 200:
-                students = response.json()
-                return students[0] if students else None
-            else:
-                return None
-                
-        except Exception as e:
-            print(f"   Error fetching student: {e}")
-            return None
+            by_id = {str(row['id']): row for row in rows}
+            expires = now + STUDENT_CACHE_TTL
+            with self._cache_lock:
+                for student_id in batch:
+                    # Unknown ids are cached too so they are not re-queried every event
+                    student = by_id.get(str(student_id))
+                    self._student_cache[student_id] = (student, expires)
+                    found[student_id] = student
+        
+        # Expired entries are dropped lazily to keep the cache bounded
+        with self._cache_lock:
+            if len(self._student_cache) > 10 * STUDENT_LOOKUP_BATCH:
+                self._student_cache = {k: v for k, v in self._student_cache.items() if v[1] > now}
+        
+        return found
     
     def _log_notification(self, notification):
         """Log notification to file"""
         try:
-            os.makedirs('backend/logs', exist_ok=True)
-            with open('backend/logs/notifications.json', 'a') as f:
-                f.write(json.dumps(notification) + '\n')
+            get_writer('notifications.json').write(notification)
         except Exception as e:
             print(f"   Error logging notification: {e}")
     
-    def _send_email(self, email, opportunity_title, reasoning):
+    def _send_email(self, email, items):
         """
-        Send actual email notification
+        Send actual email notification (one digest of matches)
         Placeholder for production implementation
         """
         # In production, integrate with:
@@ -174,6 +295,9 @@ class NotificationAgent:
         """Get notification statistics"""
         return {
             "total_sent": self.notifications_sent,
+            "digests_sent": self.digests_sent,
+            "pending_students": len(self._pending),
+            "duplicates_skipped": self.duplicates_skipped,
             "timestamp": time.time()
         }
 
@@ -188,6 +312,8 @@ if __name__ == "__main__":
     print("\n Agent is running. Press Ctrl+C to stop.")
     print(" Waiting for match events from Matching Agent...")
     
+    start_metrics_server(METRICS_DEFAULT_PORT)
+    
     try:
         # Start listening for match events
         notification_agent.listen_for_matches()
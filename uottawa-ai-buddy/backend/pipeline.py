@@ -0,0 +1,295 @@
+"""
+PIPELINE - Streaming orchestrator: scrape -> dedupe -> match -> persist -> notify
+Stages run concurrently and are connected by bounded queues, so an event is
+matched while the crawl is still running and a slow stage pushes back on the
+ones before it instead of buffering without limit. On shutdown (Ctrl+C) the
+crawl is cancelled and everything already in flight drains through to the end
+"""
+
+import os
+import time
+import queue
+import threading
+from dotenv import load_dotenv
+from fingerprint_store import FingerprintStore
+from metrics import counter, gauge, histogram, start_metrics_server
+
+load_dotenv()
+
+# Items a stage may have waiting before the stage in front of it blocks
+PIPELINE_QUEUE_SIZE = int(os.getenv('PIPELINE_QUEUE_SIZE', '32'))
+# Dedupe saves opportunities in batches of up to this many (waiting at most PIPELINE_BATCH_WAIT seconds)
+PIPELINE_DEDUPE_BATCH = int(os.getenv('PIPELINE_DEDUPE_BATCH', '50'))
+PIPELINE_BATCH_WAIT = float(os.getenv('PIPELINE_BATCH_WAIT', '0.2'))
+PIPELINE_MATCH_WORKERS = int(os.getenv('PIPELINE_MATCH_WORKERS', os.getenv('MATCH_WORKERS', '4')))
+PIPELINE_PERSIST_WORKERS = int(os.getenv('PIPELINE_PERSIST_WORKERS', '2'))
+# Seconds one opportunity may spend in Gemini matching before rule-based matching is used
+PIPELINE_MATCH_TIMEOUT = float(os.getenv('PIPELINE_MATCH_TIMEOUT', os.getenv('MATCH_TIMEOUT', '120')))
+# By default matches go out as matches/found events and notification_agent.py
+# notifies. true: notify in-process instead (no matches/found event is published,
+# so a notification agent started later does not notify the same students again)
+PIPELINE_NOTIFY = os.getenv('PIPELINE_NOTIFY', 'false').lower() == 'true'
+
+METRICS_DEFAULT_PORT = 9100
+
+STAGE_QUEUE_DEPTH = gauge('pipeline_queue_depth', 'Items waiting in front of a pipeline stage', ['stage'])
+STAGE_ITEMS = counter('pipeline_items_total', 'Items a pipeline stage passed on', ['stage'])
+STAGE_ERRORS = counter('pipeline_errors_total', 'Items lost to a failing pipeline stage', ['stage'])
+STAGE_SECONDS = histogram('pipeline_stage_duration_seconds', 'Time a stage worker spent on one item or batch',
+                          ['stage'])
+
+_DONE = object()
+
+
+class Stage:
+    """
+    One pipeline step. fn takes an item (or a list of items when batch_size > 1)
+    and returns the items to pass on; workers run it concurrently
+    """
+
+    def __init__(self, name, fn, workers=1, queue_size=PIPELINE_QUEUE_SIZE, batch_size=1,
+                 batch_wait=PIPELINE_BATCH_WAIT):
+        self.name = name
+        self.fn = fn
+        self.workers = workers
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.received = 0
+        self.emitted = 0
+        self.errors = 0
+        self.busy = 0.0
+        self.max_depth = 0
+        self._lock = threading.Lock()
+        self._threads = []
+        STAGE_QUEUE_DEPTH.labels(stage=name).set_function(self.queue.qsize)
+
+    def put(self, item):
+        """Hand an item to this stage; blocks while its queue is full (backpressure)"""
+        self.queue.put(item)
+        depth = self.queue.qsize()
+        with self._lock:
+            self.received += 1
+            self.max_depth = max(self.max_depth, depth)
+
+    def start(self, downstream):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, args=(downstream,),
+                                      name=f"pipeline-{self.name}-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def finish(self):
+        """Signal end of input and wait until every worker has drained the queue"""
+        for _ in self._threads:
+            self.queue.put(_DONE)
+        for thread in self._threads:
+            thread.join()
+
+    def _take(self):
+        """(items, ended): the next item, or a batch of up to batch_size items"""
+        first = self.queue.get()
+        if first is _DONE:
+            return [], True
+        batch = [first]
+        deadline = time.time() + self.batch_wait
+        while len(batch) < self.batch_size:
+            try:
+                item = self.queue.get(timeout=max(0, deadline - time.time()))
+            except queue.Empty:
+                break
+            if item is _DONE:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _work(self, downstream):
+        ended = False
+        while not ended:
+            batch, ended = self._take()
+            if not batch:
+                continue
+            start = time.time()
+            try:
+                results = self.fn(batch if self.batch_size > 1 else batch[0]) or []
+            except Exception as e:
+                print(f"⚠️  Pipeline stage {self.name} failed: {e}")
+                results = []
+                with self._lock:
+                    self.errors += len(batch)
+                STAGE_ERRORS.labels(stage=self.name).inc(len(batch))
+            elapsed = time.time() - start
+            with self._lock:
+                self.busy += elapsed
+                self.emitted += len(results)
+            STAGE_SECONDS.labels(stage=self.name).observe(elapsed)
+            STAGE_ITEMS.labels(stage=self.name).inc(len(results))
+            if downstream:
+                for item in results:
+                    downstream.put(item)
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "received": self.received,
+                "emitted": self.emitted,
+                "errors": self.errors,
+                "busy_seconds": round(self.busy, 3),
+                "max_queue_depth": self.max_depth
+            }
+
+
+class Pipeline:
+    """A source feeding a chain of stages; run() returns once everything has drained"""
+
+    def __init__(self, source, stages):
+        self.source = source   # source(emit, stopping) calls emit(item) until stopping is set
+        self.stages = stages
+        self.stopping = threading.Event()
+        self.dropped = 0
+
+    def _emit(self, item):
+        if self.stopping.is_set():
+            self.dropped += 1
+            return
+        self.stages[0].put(item)
+
+    def _run_source(self):
+        try:
+            self.source(self._emit, self.stopping)
+        except Exception as e:
+            print(f"⚠️  Pipeline source failed: {e}")
+
+    def stop(self):
+        """Stop the source and stop taking new items; items already in the pipeline still finish"""
+        self.stopping.set()
+
+    def run(self):
+        started = time.time()
+        for stage, downstream in zip(self.stages, self.stages[1:] + [None]):
+            stage.start(downstream)
+
+        source = threading.Thread(target=self._run_source, name="pipeline-source", daemon=True)
+        source.start()
+        try:
+            while source.is_alive():
+                source.join(0.5)
+        except KeyboardInterrupt:
+            print("\n⏳ Stopping: draining items already in the pipeline (Ctrl+C again to abort)")
+            self.stop()
+            source.join()
+
+        # Stages end front to back, each after the one feeding it
+        for stage in self.stages:
+            stage.finish()
+        return self.get_stats(time.time() - started)
+
+    def get_stats(self, wall_seconds=None):
+        return {
+            "wall_seconds": round(wall_seconds, 3) if wall_seconds is not None else None,
+            "dropped": self.dropped,
+            "stages": {stage.name: stage.get_stats() for stage in self.stages}
+        }
+
+
+def build_pipeline(start_url=None, notify=PIPELINE_NOTIFY, fingerprints=None):
+    """
+    The scrape -> dedupe -> match -> persist -> notify pipeline of the AI Buddy system.
+    Without notify the last stage is persist, which publishes matches/found for the notification agent
+    """
+    from scraper_agent import scrape_uottawa_events, save_to_database, event_key, content_hash
+    from matching_agent import matching_agent
+
+    store = fingerprints if fingerprints is not None else FingerprintStore()
+    seen = set()
+
+    def scrape(emit, stopping):
+        scrape_uottawa_events(start_url, on_event=emit, stop=stopping)
+
+    def dedupe(batch):
+        """
+        Drop events unchanged since the last scrape, upsert the rest (rows come back with ids).
+        Fingerprints are recorded by persist, so an event that fails later is retried next run
+        """
+        fresh = []
+        for opportunity in batch:
+            key = event_key(opportunity)
+            if key in seen:
+                continue
+            seen.add(key)
+            if store.status(key, content_hash(opportunity)) != 'unchanged':
+                fresh.append(opportunity)
+        if not fresh:
+            return []
+        return save_to_database(fresh, return_rows=True)["rows"]
+
+    def match(opportunity):
+        # The late result of a timed-out match is dropped, as in OrderedWorkerPool
+        result = {}
+        worker = threading.Thread(target=lambda: result.update(matches=matching_agent.compute_matches(opportunity)),
+                                  name="pipeline-match-call", daemon=True)
+        worker.start()
+        worker.join(PIPELINE_MATCH_TIMEOUT)
+        if worker.is_alive():
+            return [(opportunity, matching_agent._timeout_matches(opportunity))]
+        return [(opportunity, result.get('matches'))]
+
+    def persist(item):
+        opportunity, matches = item
+        published = matching_agent.publish_results(opportunity, matches, publish_event=not notify)
+        # Fingerprint only once the ledger has the opportunity fully matched and published
+        if not matching_agent.ledger.pending([opportunity]):
+            store.record({opportunity['event_key']: (opportunity['content_hash'], opportunity)})
+        return [(opportunity, published)] if published else []
+
+    stages = [
+        # One worker: repeats within a run are caught by the seen set
+        Stage('dedupe', dedupe, workers=1, batch_size=PIPELINE_DEDUPE_BATCH),
+        Stage('match', match, workers=PIPELINE_MATCH_WORKERS),
+        Stage('persist', persist, workers=PIPELINE_PERSIST_WORKERS),
+    ]
+
+    if notify:
+        from notification_agent import notification_agent
+
+        def send(item):
+            opportunity, published = item
+            notification_agent.process_match_event({
+                "type": "MATCHES_FOUND",
+                "data": {
+                    "opportunity_id": opportunity.get('id'),
+                    "opportunity_title": opportunity['title'],
+                    "matches": published,
+                    "match_count": len(published)
+                },
+                "timestamp": time.time()
+            })
+            notification_agent.flush_digests()
+            return []
+
+        stages.append(Stage('notify', send, workers=1))
+
+    return Pipeline(scrape, stages)
+
+
+def run_pipeline(start_url=None, notify=PIPELINE_NOTIFY):
+    """Run the streaming pipeline once and print per-stage statistics"""
+    pipeline = build_pipeline(start_url, notify)
+    stats = pipeline.run()
+
+    if notify:
+        from notification_agent import notification_agent
+        notification_agent.flush_digests(force=True)
+
+    print(f"\n⏱️  Pipeline finished in {stats['wall_seconds']}s")
+    for name, stage in stats['stages'].items():
+        print(f"  {name:<8} {stage['received']:>5} in  {stage['emitted']:>5} out  "
+              f"{stage['busy_seconds']:>8.2f}s busy  x{stage['workers']}  "
+              f"max queue {stage['max_queue_depth']}  errors {stage['errors']}")
+    return stats
+
+
+if __name__ == "__main__":
+    start_metrics_server(METRICS_DEFAULT_PORT)
+    run_pipeline()
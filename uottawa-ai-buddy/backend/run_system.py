@@ -1,16 +1,21 @@
 """
 ORCHESTRATOR - Runs the entire system for demo
+The scraped events stream through pipeline.py; run_scraper/run_matching
+remain available as the batch steps
 """
 
 import os
-import time
-import requests
+import sys
 from dotenv import load_dotenv
+from supabase_client import supabase
 
 load_dotenv()
 
-SUPABASE_URL = os.getenv('SUPABASE_URL')
-SUPABASE_KEY = os.getenv('SUPABASE_KEY')
+# Column used to find new/changed opportunities. created_at is kept on update,
+# so it only finds new ones; the table needs an updated_at column
+OPPORTUNITY_WATERMARK_COLUMN = os.getenv('OPPORTUNITY_WATERMARK_COLUMN', 'updated_at')
+OPPORTUNITY_WATERMARK = 'opportunities'
+_ID_CHUNK = 200
 
 def run_scraper():
     """Step 1: Run scraper to get opportunities"""
@@ -18,47 +23,107 @@ def run_scraper():
     print("STEP 1: SCRAPING OPPORTUNITIES")
     print("="*60)
     
-    from scraper_agent import scrape_uottawa_events, save_to_database
+    from scraper_agent import scrape_uottawa_events, save_to_database, publish_changes
     
     events = scrape_uottawa_events()
     
     if len(events) > 0:
-        saved = save_to_database(events)
-        print(f"\n✅ Scraper complete: {saved} opportunities added")
+        counts = save_to_database(events, return_rows=True)
+        # Only new or changed events are sent on to the matching agent, as saved
+        # rows so the matches reference their database id
+        changes = publish_changes(counts['rows'], failed_keys=counts['failed_keys'])
+        print(f"\n✅ Scraper complete: {counts['inserted']} opportunities added, {counts['updated']} updated, "
+              f"{changes['new'] + changes['changed'] - changes['failed']} published for matching")
         return True
     else:
         print("\n❌ No events scraped")
         return False
 
-def run_matching():
-    """Step 2: Matching agent processes opportunities"""
+def _changed_opportunities(ledger, student_version):
+    """
+    Opportunities created/changed since the watermark, plus those last matched
+    against an older student set. Returns (opportunities, changed)
+    """
+    watermark = ledger.get_watermark(OPPORTUNITY_WATERMARK)
+    params = {'select': '*', 'order': f'{OPPORTUNITY_WATERMARK_COLUMN}.asc,id.asc'}
+    if watermark is not None:
+        # gte: rows sharing the watermark timestamp are not missed (the ledger skips repeats)
+        params[OPPORTUNITY_WATERMARK_COLUMN] = f'gte.{watermark}'
+    changed = supabase.select_all('opportunities', params)
+    if any(OPPORTUNITY_WATERMARK_COLUMN not in o for o in changed):
+        raise RuntimeError(f"opportunities has no {OPPORTUNITY_WATERMARK_COLUMN} column: add it "
+                           f"or set OPPORTUNITY_WATERMARK_COLUMN (use --full meanwhile)")
+    
+    fetched = {str(o['id']) for o in changed}
+    stale = [i for i in ledger.stale(student_version) if i not in fetched]
+    rematch = []
+    for i in range(0, len(stale), _ID_CHUNK):
+        chunk = stale[i:i + _ID_CHUNK]
+        rematch.extend(supabase.select('opportunities', {'select': '*', 'id': f"in.({','.join(chunk)})"}))
+    
+    # Ledger entries of deleted opportunities would be looked up on every run
+    for missing in set(stale) - {str(o['id']) for o in rematch}:
+        ledger.forget(missing)
+    
+    print(f"📋 {len(changed)} new/changed opportunities since {watermark or 'the beginning'}, "
+          f"{len(rematch)} to re-match against new students")
+    return changed + rematch, changed
+
+def _advance_watermark(ledger, changed, student_version):
+    """Move the watermark past the changed opportunities that are now fully matched"""
+    values = lambda rows: [o[OPPORTUNITY_WATERMARK_COLUMN] for o in rows if o.get(OPPORTUNITY_WATERMARK_COLUMN)]
+    unfinished = values(ledger.pending(changed, student_version))
+    if unfinished:
+        # Stop at the oldest unfinished one; it is fetched again next run
+        ledger.set_watermark(OPPORTUNITY_WATERMARK, min(unfinished))
+    elif values(changed):
+        ledger.set_watermark(OPPORTUNITY_WATERMARK, max(values(changed)))
+
+def run_matching(full=False):
+    """
+    Step 2: Matching agent processes opportunities.
+    Incremental by default: only opportunities changed since the last run and
+    those not yet matched against newly signed-up students. full=True matches
+    every opportunity (the ledger still skips finished work)
+    """
     print("\n" + "="*60)
     print("STEP 2: MATCHING WITH GEMINI AI")
     print("="*60)
     
     from matching_agent import matching_agent
     
-    # Get all opportunities from database
-    response = requests.get(
-        f"{SUPABASE_URL}/rest/v1/opportunities?select=*",
-        headers={
-            'apikey': SUPABASE_KEY,
-            'Authorization': f'Bearer {SUPABASE_KEY}'
-        }
-    )
-    
-    if response.status_code == 200:
-        opportunities = response.json()
-        print(f"📋 Found {len(opportunities)} opportunities to match")
-        
-        for opp in opportunities:
-            matching_agent.process_opportunity(opp)
-        
-        print(f"\n✅ Matching complete: {matching_agent.matched_count} total matches")
-        return True
-    else:
-        print("❌ Could not fetch opportunities")
+    ledger = matching_agent.ledger
+    matching_agent.student_store.get_all()
+    student_version = matching_agent.student_store.set_version()
+    
+    try:
+        if full:
+            opportunities = changed = supabase.select_all('opportunities')
+            print(f"📋 Found {len(opportunities)} opportunities to match (full run)")
+        else:
+            opportunities, changed = _changed_opportunities(ledger, student_version)
+    except Exception as e:
+        print(f"❌ Could not fetch opportunities: {e}")
         return False
+    
+    if not opportunities:
+        print("\n✅ Nothing to match since the last run")
+        return True
+    
+    # Opportunities are matched concurrently (MATCH_WORKERS), published in order
+    matching_agent.process_opportunities(opportunities)
+    _advance_watermark(ledger, changed, student_version)
+    
+    # Precompute feeds for every student; the matrix needs the whole catalogue
+    # (to drop removed events) but only rescores new rows and columns
+    try:
+        catalogue = opportunities if full else supabase.select_all('opportunities')
+        matching_agent.update_match_matrix(catalogue)
+    except Exception as e:
+        print(f"❌ Could not refresh match matrix: {e}")
+    
+    print(f"\n✅ Matching complete: {matching_agent.matched_count} total matches")
+    return True
 
 def verify_results():
     """Verify everything worked"""
@@ -66,41 +131,20 @@ def verify_results():
     print("VERIFICATION")
     print("="*60)
     
-    # Check opportunities
-    response = requests.get(
-        f"{SUPABASE_URL}/rest/v1/opportunities?select=count",
-        headers={
-            'apikey': SUPABASE_KEY,
-            'Authorization': f'Bearer {SUPABASE_KEY}',
-            'Prefer': 'count=exact'
-        }
-    )
-    opp_count = response.headers.get('Content-Range', '*/0').split('/')[-1]
-    print(f"  📋 Opportunities: {opp_count}")
-    
-    # Check students
-    response = requests.get(
-        f"{SUPABASE_URL}/rest/v1/students?select=count",
-        headers={
-            'apikey': SUPABASE_KEY,
-            'Authorization': f'Bearer {SUPABASE_KEY}',
-            'Prefer': 'count=exact'
-        }
-    )
-    student_count = response.headers.get('Content-Range', '*/0').split('/')[-1]
+    counts = {}
+    for table in ('opportunities', 'students', 'matches'):
+        try:
+            counts[table] = str(supabase.count(table))
+        except Exception as e:
+            print(f"  ⚠️  Could not count {table}: {e}")
+            counts[table] = '?'
+    
+    print(f"  📋 Opportunities: {counts['opportunities']}")
+    
+    student_count = counts['students']
     print(f"  👥 Students: {student_count}")
     
-    # Check matches
-    response = requests.get(
-        f"{SUPABASE_URL}/rest/v1/matches?select=count",
-        headers={
-            'apikey': SUPABASE_KEY,
-            'Authorization': f'Bearer {SUPABASE_KEY}',
-            'Prefer': 'count=exact'
-        }
-    )
-    match_count = response.headers.get('Content-Range', '*/0').split('/')[-1]
-    print(f"  🎯 Matches: {match_count}")
+    print(f"  🎯 Matches: {counts['matches']}")
     
     if student_count == '0':
         print("\n⚠️  WARNING: No students in database!")
@@ -112,13 +156,15 @@ if __name__ == "__main__":
     print("="*70)
     
     try:
-        # Step 1: Scrape
-        run_scraper()
-        time.sleep(2)
+        # Scrape, dedupe, match, persist and notify as one streaming pipeline
+        from pipeline import run_pipeline, METRICS_DEFAULT_PORT
+        from metrics import start_metrics_server
+        start_metrics_server(METRICS_DEFAULT_PORT)
+        run_pipeline()
         
-        # Step 2: Match
-        run_matching()
-        time.sleep(2)
+        # Catch-up pass: opportunities posted outside the scraper, re-matches
+        # against new students (--full: everything), and the match matrix
+        run_matching(full='--full' in sys.argv)
         
         # Verify
         verify_results()
@@ -0,0 +1,184 @@
+"""
+SCHEDULER - Priority and deadline ordering for opportunities awaiting matching
+Pending opportunities are served by priority class (manual posts before
+scraped ones), then by event date, so tomorrow's event is not stuck behind
+a backlog of events months away. Waiting items are promoted over time so
+low classes and undated events are never starved
+"""
+
+import os
+import time
+import threading
+from collections import deque
+from datetime import date, datetime, time as day_time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Priority classes, most urgent first
+SCHEDULER_CLASSES = [c.strip() for c in os.getenv('SCHEDULER_CLASSES', 'manual,scraped').split(',') if c.strip()]
+# Seconds of waiting that promote an item by one class
+SCHEDULER_AGING_SECONDS = float(os.getenv('SCHEDULER_AGING_SECONDS', '120'))
+# Items waiting longer than this jump ahead of everything else
+SCHEDULER_MAX_WAIT_SECONDS = float(os.getenv('SCHEDULER_MAX_WAIT_SECONDS', '900'))
+# Pending items accepted before push() blocks
+SCHEDULER_MAX_PENDING = int(os.getenv('SCHEDULER_MAX_PENDING', '1000'))
+
+SCRAPED_POSTER = 'Auto-scraper'
+NO_DEADLINE = float('inf')
+_WAIT_SAMPLES = 1000
+
+
+def priority_class(opportunity, classes=SCHEDULER_CLASSES):
+    """Explicit 'priority' field if it names a class, else scraped vs manual"""
+    requested = opportunity.get('priority')
+    if requested in classes:
+        return requested
+    scraped = opportunity.get('posted_by') == SCRAPED_POSTER or opportunity.get('category') == 'discovered'
+    return 'scraped' if scraped else 'manual'
+
+
+def deadline(opportunity, now=None):
+    """End of the event day as a timestamp; past or missing dates have no deadline"""
+    event_date = opportunity.get('event_date')
+    if not event_date:
+        return NO_DEADLINE
+    try:
+        day = date.fromisoformat(str(event_date)[:10])
+    except ValueError:
+        return NO_DEADLINE
+    end = datetime.combine(day, day_time.max).timestamp()
+    # Events that are already over can wait behind everything else
+    return end if end >= (now or time.time()) else NO_DEADLINE
+
+
+class _Item:
+    __slots__ = ('seq', 'value', 'rank', 'deadline', 'enqueued_at', 'on_done', 'done')
+
+    def __init__(self, seq, value, rank, deadline, enqueued_at, on_done):
+        self.seq = seq
+        self.value = value
+        self.rank = rank
+        self.deadline = deadline
+        self.enqueued_at = enqueued_at
+        self.on_done = on_done
+        self.done = False
+
+
+class OpportunityScheduler:
+    """
+    Bounded priority queue of opportunities.
+    pop() returns the most urgent item; done(ticket) marks it finished.
+    on_done callbacks (event acks) still run in push order, so a committed
+    offset never covers an opportunity that has not been matched yet.
+    """
+
+    def __init__(self, classes=SCHEDULER_CLASSES, aging_seconds=SCHEDULER_AGING_SECONDS,
+                 max_wait=SCHEDULER_MAX_WAIT_SECONDS, max_pending=SCHEDULER_MAX_PENDING):
+        self.classes = list(classes)
+        self.aging_seconds = aging_seconds
+        self.max_wait = max_wait
+        self.max_pending = max_pending
+        self._pending = []
+        self._in_order = deque()   # Every pushed item, in push order, until acknowledged
+        self._seq = 0
+        self._cond = threading.Condition()
+        self.dispatched = 0
+        self.promoted = 0
+        self._waits = deque(maxlen=_WAIT_SAMPLES)
+
+    def _rank(self, opportunity):
+        name = priority_class(opportunity, self.classes)
+        return self.classes.index(name) if name in self.classes else len(self.classes)
+
+    def key(self, item, now):
+        """Sort key: starved items first, then aged class, then deadline, then arrival"""
+        waited = now - item.enqueued_at
+        if self.max_wait and waited >= self.max_wait:
+            return (-1, 0, item.seq)
+        rank = item.rank
+        if self.aging_seconds:
+            rank = max(0, rank - int(waited // self.aging_seconds))
+        return (rank, item.deadline, item.seq)
+
+    def push(self, opportunity, on_done=None, timeout=None):
+        """Queue an opportunity; blocks while max_pending items are waiting"""
+        with self._cond:
+            if not self._cond.wait_for(lambda: len(self._pending) < self.max_pending, timeout):
+                raise TimeoutError("Scheduler is full")
+            now = time.time()
+            item = _Item(self._seq, opportunity, self._rank(opportunity), deadline(opportunity, now), now, on_done)
+            self._seq += 1
+            self._pending.append(item)
+            self._in_order.append(item)
+            self._cond.notify_all()
+
+    def skip(self, on_done):
+        """Record a non-opportunity event: acknowledged once everything before it is done"""
+        with self._cond:
+            item = _Item(self._seq, None, 0, NO_DEADLINE, time.time(), on_done)
+            item.done = True
+            self._seq += 1
+            self._in_order.append(item)
+        self._release()
+
+    def pop(self, timeout=None):
+        """Remove and return (opportunity, ticket) for the most urgent item, or None on timeout"""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._pending, timeout):
+                return None
+            now = time.time()
+            best = min(self._pending, key=lambda item: self.key(item, now))
+            self._pending.remove(best)
+            if self.key(best, now)[0] < best.rank:
+                self.promoted += 1
+            self.dispatched += 1
+            self._waits.append(now - best.enqueued_at)
+            self._cond.notify_all()
+            return best.value, best
+
+    def done(self, ticket):
+        """Mark a popped item finished and run the acks that are now in order"""
+        with self._cond:
+            ticket.done = True
+        self._release()
+
+    def _release(self):
+        callbacks = []
+        with self._cond:
+            while self._in_order and self._in_order[0].done:
+                callbacks.append(self._in_order.popleft().on_done)
+        for callback in callbacks:
+            if callback:
+                callback()
+
+    def prioritize(self, opportunities):
+        """Order a batch the way pop() would serve it right now"""
+        now = time.time()
+        items = [_Item(i, o, self._rank(o), deadline(o, now), now, None) for i, o in enumerate(opportunities)]
+        return [item.value for item in sorted(items, key=lambda item: self.key(item, now))]
+
+    def __len__(self):
+        return len(self._pending)
+
+    def get_stats(self):
+        """Queue depth and wait-time statistics"""
+        with self._cond:
+            now = time.time()
+            depth_by_class = {name: 0 for name in self.classes}
+            for item in self._pending:
+                name = self.classes[item.rank] if item.rank < len(self.classes) else 'other'
+                depth_by_class[name] = depth_by_class.get(name, 0) + 1
+            waits = sorted(self._waits)
+            oldest = max((now - item.enqueued_at for item in self._pending), default=0)
+            return {
+                "depth": len(self._pending),
+                "depth_by_class": depth_by_class,
+                "dispatched": self.dispatched,
+                "promoted": self.promoted,
+                "oldest_wait": oldest,
+                "wait_avg": sum(waits) / len(waits) if waits else 0,
+                "wait_p95": waits[int(0.95 * (len(waits) - 1))] if waits else 0,
+                "wait_max": waits[-1] if waits else 0,
+                "timestamp": now
+            }
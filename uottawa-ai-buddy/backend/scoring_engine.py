@@ -0,0 +1,228 @@
+"""
+SCORING ENGINE - Vectorized rule-based scoring for student/opportunity matching
+Encodes program, year and interests as integer bitmasks in NumPy arrays so the
+whole student population is scored against an opportunity in a single pass
+"""
+
+import numpy as np
+
+# Fixed vocabularies, kept in sync with frontend/js/constants.js
+PROGRAMS = [
+    'Software Engineering',
+    'Computer Science',
+    'Commercial Sciences / Business',
+    'Nursing',
+    'Law',
+    'Arts and Sciences',
+    'Civil Engineering',
+    'Psychology',
+    'Biology',
+    'Mechanical Engineering',
+    'Electrical Engineering',
+    'Other'
+]
+
+ALL_PROGRAMS = 'All Programs'  # Only for event posters
+
+YEARS = [1, 2, 3, 4, 5]
+
+INTERESTS = [
+    'Research', 'Academic Writing', 'Study Groups', 'Tutoring', 'Networking',
+    'Career Development', 'Entrepreneurship', 'Leadership',
+    'Artificial Intelligence', 'Web Development', 'Coding', 'Hackathons',
+    'Robotics', 'Video Games', 'Gaming',
+    'Music & Concerts', 'Dance', 'Theatre', 'Visual Arts', 'Film',
+    'Photography', 'Graphic Design', 'Reading',
+    'Competitive Sports', 'Fitness', 'Yoga', 'Mental Health', 'Meditation',
+    'Volunteering', 'Community Service', 'Sustainability', 'Social Justice',
+    'Politics',
+    'Cooking', 'Traveling', 'Writing', 'Languages', 'Board Games'
+]
+
+# Bump when the rules or weights below change (part of match idempotency keys)
+SCORING_VERSION = 1
+
+# Scoring rules (same weights as the original per-student loop)
+BASE_SCORE = 50
+PROGRAM_POINTS = 20
+YEAR_POINTS = 15
+INTEREST_POINTS = 15
+OPEN_SCORE = 75      # Opportunity with no targeting criteria at all
+MIN_SCORE = 65       # Threshold to count as a match
+MAX_SCORE = 90       # Rule-based scores are capped below LLM scores
+
+WORD_BITS = 64
+
+
+def is_open_to_all(opportunity):
+    """True when an opportunity has no program, year or interest targeting"""
+    return not (opportunity.get('target_programs') or opportunity.get('target_years')
+                or opportunity.get('target_interests'))
+
+
+def rule_reasoning(student, opportunity):
+    """Short explanation attached to rule-based matches"""
+    if is_open_to_all(opportunity):
+        return f"Open to all students - {student['program']}, Year {student['year']}"
+    return f"Matches {student['program']}, Year {student['year']}"
+
+
+class Vocabulary:
+    """Maps tags to bit positions; grows when students use tags outside constants.js"""
+
+    def __init__(self, terms=()):
+        self.index = {}
+        for term in terms:
+            self.add(term)
+
+    def add(self, term):
+        if term not in self.index:
+            self.index[term] = len(self.index)
+        return self.index[term]
+
+    @property
+    def words(self):
+        """Number of uint64 words needed to hold one mask"""
+        return max(1, (len(self.index) + WORD_BITS - 1) // WORD_BITS)
+
+    def mask(self, terms, words=None):
+        """Encode known terms as a multi-word bitmask (unknown terms are ignored)"""
+        row = np.zeros(words or self.words, dtype=np.uint64)
+        for term in terms:
+            bit = self.index.get(term)
+            if bit is not None and bit < len(row) * WORD_BITS:
+                row[bit // WORD_BITS] |= np.uint64(1 << (bit % WORD_BITS))
+        return row
+
+
+def _year_bit(year):
+    """Bit for a study year, or 0 when the value can't be read as a small int"""
+    try:
+        year = int(year)
+    except (TypeError, ValueError):
+        return 0
+    return 1 << year if 0 <= year < WORD_BITS else 0
+
+
+class ScoringEngine:
+    """Scores all loaded students against one or many opportunities at once"""
+
+    def __init__(self):
+        self.programs = Vocabulary(PROGRAMS)
+        self.interests = Vocabulary(INTERESTS)
+        self.students = None
+        self.student_ids = []
+        self.program_masks = np.zeros((0, 1), dtype=np.uint64)
+        self.year_masks = np.zeros(0, dtype=np.uint64)
+        self.interest_masks = np.zeros((0, 1), dtype=np.uint64)
+
+    def load(self, students):
+        """
+        Encode a student list into bitmask arrays.
+        Re-encoding is skipped when the exact same list object is passed again.
+        """
+        if students is self.students:
+            return
+
+        for student in students:
+            if student.get('program'):
+                self.programs.add(student['program'])
+            for interest in student.get('interests') or []:
+                self.interests.add(interest)
+
+        n = len(students)
+        program_words = self.programs.words
+        interest_words = self.interests.words
+        self.program_masks = np.zeros((n, program_words), dtype=np.uint64)
+        self.interest_masks = np.zeros((n, interest_words), dtype=np.uint64)
+        self.year_masks = np.zeros(n, dtype=np.uint64)
+
+        for i, student in enumerate(students):
+            if student.get('program'):
+                self.program_masks[i] = self.programs.mask([student['program']], program_words)
+            self.year_masks[i] = _year_bit(student.get('year'))
+            self.interest_masks[i] = self.interests.mask(student.get('interests') or [], interest_words)
+
+        self.students = students
+        self.student_ids = [s['id'] for s in students]
+
+    def _encode_opportunity(self, opportunity):
+        """Return (open_to_all, accept_all_programs, program_mask, year_mask, interest_mask)"""
+        target_programs = opportunity.get('target_programs') or []
+        target_years = opportunity.get('target_years') or []
+        target_interests = opportunity.get('target_interests') or []
+
+        open_to_all = is_open_to_all(opportunity)
+        accept_all_programs = not target_programs or ALL_PROGRAMS in target_programs
+
+        year_mask = 0
+        for year in target_years:
+            year_mask |= _year_bit(year)
+
+        return (
+            open_to_all,
+            accept_all_programs,
+            self.programs.mask(target_programs, self.program_masks.shape[1]),
+            np.uint64(year_mask) if target_years else None,
+            self.interests.mask(target_interests, self.interest_masks.shape[1]) if target_interests else None
+        )
+
+    def score(self, opportunity):
+        """Score every loaded student for one opportunity; returns an int array"""
+        return self.score_batch([opportunity])[0]
+
+    def score_batch(self, opportunities, chunk_size=64):
+        """
+        Score a batch of opportunities against all loaded students.
+        Returns an (n_opportunities, n_students) int array; opportunities are
+        processed in chunks to bound the size of the broadcast temporaries.
+        """
+        n = len(self.student_ids)
+        scores = np.zeros((len(opportunities), n), dtype=np.int16)
+
+        for start in range(0, len(opportunities), chunk_size):
+            chunk = [self._encode_opportunity(o) for o in opportunities[start:start + chunk_size]]
+
+            open_to_all = np.array([c[0] for c in chunk])[:, None]
+            accept_all = np.array([c[1] for c in chunk])[:, None]
+            program_masks = np.stack([c[2] for c in chunk])
+            no_years = np.array([c[3] is None for c in chunk])[:, None]
+            year_masks = np.array([c[3] or 0 for c in chunk], dtype=np.uint64)[:, None]
+            no_interests = np.array([c[4] is None for c in chunk])[:, None]
+            interest_masks = np.stack([
+                c[4] if c[4] is not None else np.zeros(self.interest_masks.shape[1], dtype=np.uint64)
+                for c in chunk
+            ])
+
+            program_hit = accept_all | (self.program_masks[None, :, :] & program_masks[:, None, :]).any(axis=2)
+            year_hit = no_years | ((self.year_masks[None, :] & year_masks) != 0)
+            interest_hit = ~no_interests & (self.interest_masks[None, :, :] & interest_masks[:, None, :]).any(axis=2)
+
+            chunk_scores = (
+                BASE_SCORE
+                + PROGRAM_POINTS * program_hit
+                + YEAR_POINTS * year_hit
+                + INTEREST_POINTS * interest_hit
+            )
+            chunk_scores = np.minimum(chunk_scores, MAX_SCORE)
+            scores[start:start + len(chunk)] = np.where(open_to_all, OPEN_SCORE, chunk_scores)
+
+        return scores
+
+    def rank(self, scores, limit=None, min_score=MIN_SCORE, tiebreak=None):
+        """
+        Indices of students with score >= min_score, best first.
+        Ties are broken by the optional tiebreak array (higher first),
+        then by student order, so results are deterministic.
+        """
+        eligible = np.flatnonzero(scores >= min_score)
+        if tiebreak is None:
+            order = eligible[np.argsort(-scores[eligible], kind='stable')]
+        else:
+            order = eligible[np.lexsort((-tiebreak[eligible], -scores[eligible]))]
+        return order[:limit] if limit is not None else order
+
+    def top_matches(self, opportunity, limit=15, tiebreak=None):
+        """Return [(student, score)] for the best rule-based matches"""
+        scores = self.score(opportunity)
+        return [(self.students[i], int(scores[i])) for i in self.rank(scores, limit, tiebreak=tiebreak)]
@@ -1,18 +1,64 @@
 import os
-import requests
 from dotenv import load_dotenv
 from datetime import datetime
 import json
+import hashlib
+from supabase_client import supabase
+from crawler import Crawler
+from fingerprint_store import FingerprintStore
 
 load_dotenv()
 
 YELLOWCAKE_API_KEY = os.getenv('YELLOWCAKE_API_KEY')
-SUPABASE_URL = os.getenv('SUPABASE_URL')
-SUPABASE_KEY = os.getenv('SUPABASE_KEY')
 
-def scrape_uottawa_events():
-    """Scrape uOttawa events - using real event data from uottawa.ca/en/events-all"""
+# Rows per lookup/upsert request
+SCRAPER_BATCH_SIZE = int(os.getenv('SCRAPER_BATCH_SIZE', '500'))
+# 'crawl' (live uottawa.ca pages, curated list as fallback) or 'curated'
+SCRAPER_MODE = os.getenv('SCRAPER_MODE', 'crawl')
+
+# Bulk ingest needs two columns on the opportunities table:
+#   ALTER TABLE opportunities ADD COLUMN event_key text UNIQUE;
+#   ALTER TABLE opportunities ADD COLUMN content_hash text;
+# event_key identifies an event across scrapes (title + date), content_hash
+# tells whether anything about it changed since the last scrape.
+
+# Fields that do not count as content: database bookkeeping and scrape time
+VOLATILE_FIELDS = {'id', 'created_at', 'updated_at', 'event_key', 'content_hash'}
+
+def scrape_uottawa_events(start_url=None, on_event=None, stop=None):
+    """
+    Scrape uOttawa events - crawls uottawa.ca/en/events-all, falls back to the curated list.
+    on_event, if given, receives each event as soon as it is scraped; setting the
+    stop event (threading.Event) cancels the crawl
+    """
     print("🕷️ Starting scraper...")
+    if SCRAPER_MODE == 'crawl':
+        options = {"start_url": start_url} if start_url else {}
+        crawler = Crawler(on_event=on_event, stop=stop, **options)
+        try:
+            events = crawler.run()
+            print(f"🌐 Crawled {crawler.stats['fetched']} pages "
+                  f"({crawler.stats['not_modified']} unchanged, {crawler.stats['errors']} errors)")
+            if stop is not None and stop.is_set():
+                print(f"⏹️  Crawl cancelled after {len(events)} events")
+                return events
+            if events:
+                print(f"✅ Found {len(events)} events from uOttawa")
+                return events
+            print("⚠️  Crawl found no events")
+        except Exception as e:
+            print(f"⚠️  Crawl failed: {e}")
+        finally:
+            crawler.close()
+    events = _curated_events()
+    if on_event:
+        for event in events:
+            on_event(event)
+    return events
+
+
+def _curated_events():
+    """Curated event data from the uOttawa events page (Jan 2026)"""
     print("ℹ️  Using curated event data from uOttawa events page (Jan 2026)")
     
     events = [
@@ -218,50 +264,158 @@ def scrape_uottawa_events():
     return events
 
 
-def save_to_database(opportunities):
-    """Save opportunities to Supabase"""
+def event_key(opportunity):
+    """Stable identity of a scraped event: normalized title and event date"""
+    title = ' '.join(str(opportunity.get('title', '')).lower().split())
+    payload = f"{title}|{opportunity.get('event_date') or ''}"
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def content_hash(opportunity):
+    """Hash of everything about an event except bookkeeping fields"""
+    content = {k: v for k, v in opportunity.items() if k not in VOLATILE_FIELDS}
+    payload = json.dumps(content, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _existing_events(keys):
+    """{event_key: row} for the keys already in the table (one request per batch)"""
+    existing = {}
+    for i in range(0, len(keys), SCRAPER_BATCH_SIZE):
+        batch = keys[i:i + SCRAPER_BATCH_SIZE]
+        rows = supabase.select('opportunities', {
+            'select': 'id,event_key,content_hash,created_at',
+            'event_key': f"in.({','.join(batch)})"
+        })
+        existing.update({row['event_key']: row for row in rows})
+    return existing
+
+
+def save_to_database(opportunities, return_rows=False):
+    """
+    Save opportunities to Supabase in bulk.
+    One lookup of the batch's event keys, then one upsert (on_conflict=event_key; see
+    "Database Migrations" in the README for the columns and constraint it needs)
+    of only the new and changed events. Returns inserted/updated/unchanged/failed counts;
+    with return_rows, counts['rows'] also holds every saved or unchanged row with its id
+    and counts['failed_keys'] the event keys that could not be saved
+    """
     print(f"💾 Saving {len(opportunities)} opportunities to database...")
     
-    supabase_url = f"{SUPABASE_URL}/rest/v1/opportunities"
-    headers = {
-        'apikey': SUPABASE_KEY,
-        'Authorization': f'Bearer {SUPABASE_KEY}',
-        'Content-Type': 'application/json',
-        'Prefer': 'return=representation'
-    }
-    
-    saved_count = 0
+    counts = {"inserted": 0, "updated": 0, "unchanged": 0, "failed": 0}
+    if return_rows:
+        counts["rows"] = []
+        counts["failed_keys"] = []
     
+    # The same event twice in one scrape: keep the last copy
+    rows = {}
     for opportunity in opportunities:
+        row = dict(opportunity)
+        row['event_key'] = event_key(row)
+        row['content_hash'] = content_hash(row)
+        rows[row['event_key']] = row
+    
+    try:
+        existing = _existing_events(list(rows))
+    except Exception as e:
+        print(f"  ❌ Error: {e}")
+        counts["failed"] = len(rows)
+        if return_rows:
+            counts["failed_keys"] = list(rows)
+        return counts
+    
+    writes = []
+    now = datetime.now().isoformat()
+    for key, row in rows.items():
+        current = existing.get(key)
+        # updated_at is the watermark of incremental matching runs (see run_system.py)
+        if current is None:
+            row['updated_at'] = now
+            writes.append(('inserted', row))
+        elif current.get('content_hash') != row['content_hash']:
+            # Keep the original creation time of an event we already had
+            if current.get('created_at'):
+                row['created_at'] = current['created_at']
+            row['updated_at'] = now
+            writes.append(('updated', row))
+        else:
+            counts["unchanged"] += 1
+            print(f"  ⏭️  Unchanged: {row['title']}")
+            if return_rows:
+                counts["rows"].append(dict(row, id=current.get('id'), created_at=current.get('created_at')))
+    
+    for i in range(0, len(writes), SCRAPER_BATCH_SIZE):
+        batch = writes[i:i + SCRAPER_BATCH_SIZE]
         try:
-            check_url = f"{supabase_url}?title=eq.{opportunity['title']}"
-            check_response = requests.get(check_url, headers=headers)
-            
-            if check_response.status_code == 200:
-                existing = check_response.json()
-                
-                if len(existing) == 0:
-                    insert_response = requests.post(
-                        supabase_url,
-                        headers=headers,
-                        json=opportunity
-                    )
-                    
-                    if insert_response.status_code == 201:
-                        saved_count += 1
-                        print(f"  ✅ Saved: {opportunity['title']}")
-                    else:
-                        print(f"  ❌ Failed: {opportunity['title']}")
-                        print(f"     Error: {insert_response.text}")
-                else:
-                    print(f"  ⏭️  Exists: {opportunity['title']}")
-            
+            response = supabase.insert('opportunities', [row for _, row in batch], on_conflict='event_key',
+                                       returning='representation' if return_rows else 'minimal')
         except Exception as e:
             print(f"  ❌ Error: {e}")
+            counts["failed"] += len(batch)
+            if return_rows:
+                counts["failed_keys"].extend(row['event_key'] for _, row in batch)
             continue
+        
+        if response.status_code in (200, 201, 204):
+            for outcome, row in batch:
+                counts[outcome] += 1
+                print(f"  ✅ {outcome.capitalize()}: {row['title']}")
+            if return_rows:
+                counts["rows"].extend(response.json())
+        else:
+            counts["failed"] += len(batch)
+            if return_rows:
+                counts["failed_keys"].extend(row['event_key'] for _, row in batch)
+            print(f"  ❌ Failed to save {len(batch)} opportunities")
+            print(f"     Error: {response.text}")
     
-    print(f"✅ Saved {saved_count} new opportunities")
-    return saved_count
+    print(f"✅ {counts['inserted']} new, {counts['updated']} updated, "
+          f"{counts['unchanged']} unchanged, {counts['failed']} failed")
+    return counts
+
+
+def publish_changes(opportunities, store=None, failed_keys=()):
+    """
+    Diff saved opportunities (the rows of save_to_database(..., return_rows=True),
+    so they carry their database id) against the local fingerprint store and
+    publish only new and changed events as NEW_OPPORTUNITY (via trigger_intake).
+    failed_keys are events that were scraped but not saved: they are not removed,
+    their fingerprint stays as it was. Returns new/changed/removed/unchanged/failed counts
+    """
+    from intake_agent import trigger_intake
+    
+    store = store if store is not None else FingerprintStore()
+    scraped = {}
+    for opportunity in opportunities:
+        key = opportunity.get('event_key') or event_key(opportunity)
+        scraped[key] = (opportunity.get('content_hash') or content_hash(opportunity), opportunity)
+    
+    diff = store.diff(scraped)
+    failed_keys = set(failed_keys)
+    diff['removed'] = [gone for gone in diff['removed'] if gone['event_key'] not in failed_keys]
+    print(f"🔍 {len(diff['new'])} new, {len(diff['changed'])} changed, "
+          f"{len(diff['removed'])} removed, {diff['unchanged']} unchanged since last scrape")
+    for gone in diff['removed']:
+        print(f"  🗑️  No longer listed: {gone['title']}")
+    
+    published = {}
+    failed = 0
+    for opportunity in diff['new'] + diff['changed']:
+        key = opportunity.get('event_key') or event_key(opportunity)
+        if trigger_intake(opportunity):
+            published[key] = scraped[key]
+        else:
+            failed += 1
+    
+    # Events that failed to publish keep their old fingerprint and are retried next run
+    store.record(published, [gone['event_key'] for gone in diff['removed']])
+    return {
+        "new": len(diff['new']),
+        "changed": len(diff['changed']),
+        "removed": len(diff['removed']),
+        "unchanged": diff['unchanged'],
+        "failed": failed
+    }
 
 
 if __name__ == "__main__":
@@ -269,7 +423,9 @@ if __name__ == "__main__":
     events = scrape_uottawa_events()
     
     if len(events) > 0:
-        save_to_database(events)
+        # Saved rows carry the database id the matches will reference
+        counts = save_to_database(events, return_rows=True)
+        publish_changes(counts['rows'], failed_keys=counts['failed_keys'])
     else:
         print("⚠️  No events to save")
     
@@ -0,0 +1,314 @@
+"""
+SEMANTIC INDEX - Offline vector similarity between students and opportunities
+Hashed TF-IDF vectors (no network, no model download) kept in NumPy
+matrices, with cosine top-k search and incremental updates
+"""
+
+import os
+import re
+import zlib
+import threading
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SEMANTIC_FEATURES = int(os.getenv('SEMANTIC_FEATURES', str(2 ** 18)))
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'get', 'in',
+    'into', 'is', 'it', 'its', 'of', 'on', 'or', 'our', 'the', 'their', 'this',
+    'to', 'with', 'you', 'your', 'all', 'will', 'who', 'can', 'new', 'more'
+}
+
+
+def _tokens(text):
+    return [t for t in TOKEN_RE.findall((text or '').lower()) if t not in STOPWORDS and len(t) > 1]
+
+
+def student_terms(student):
+    """Words describing a student: program plus interest tags"""
+    terms = _tokens(student.get('program'))
+    for interest in student.get('interests') or []:
+        terms.extend(_tokens(interest))
+        terms.append(f"tag:{interest.lower()}")
+    return terms
+
+
+def opportunity_terms(opportunity):
+    """Words describing an opportunity: title, description and targeting tags"""
+    terms = _tokens(opportunity.get('title')) * 2  # Titles carry more signal
+    terms.extend(_tokens(opportunity.get('description')))
+    for program in opportunity.get('target_programs') or []:
+        terms.extend(_tokens(program))
+    for interest in opportunity.get('target_interests') or []:
+        terms.extend(_tokens(interest))
+        terms.append(f"tag:{interest.lower()}")
+    return terms
+
+
+class HashedVectorizer:
+    """
+    Hashing-trick term frequencies plus corpus document frequencies.
+    IDF is applied at query time so it can change as documents arrive.
+    """
+
+    def __init__(self, n_features=SEMANTIC_FEATURES):
+        self.n_features = n_features
+        self.df = np.zeros(n_features, dtype=np.float64)
+        self.n_docs = 0
+        self.version = 0
+
+    def tf(self, terms):
+        """Sparse sublinear (1 + log) term frequencies as (indices, values)"""
+        counts = {}
+        for term in terms:
+            # crc32 keeps buckets stable across processes (hash() is salted)
+            bucket = zlib.crc32(term.encode('utf-8')) % self.n_features
+            counts[bucket] = counts.get(bucket, 0) + 1
+        indices = np.fromiter(counts.keys(), dtype=np.int32, count=len(counts))
+        values = 1 + np.log(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))
+        return indices, values
+
+    def dense(self, tf):
+        vector = np.zeros(self.n_features, dtype=np.float32)
+        vector[tf[0]] = tf[1]
+        return vector
+
+    def add(self, tf):
+        self.df[tf[0]] += 1
+        self.n_docs += 1
+        self.version += 1
+
+    def remove(self, tf):
+        self.df[tf[0]] -= 1
+        self.n_docs -= 1
+        self.version += 1
+
+    def idf(self):
+        return (np.log((1 + self.n_docs) / (1 + self.df)) + 1).astype(np.float32)
+
+
+class VectorCollection:
+    """
+    Sparse rows addressed by record id, stored CSR-style in flat arrays.
+    Replaced rows leave garbage behind that is compacted once it outweighs
+    live data; dot products use prefix sums, so row order does not matter.
+    """
+
+    def __init__(self):
+        self.indices = np.zeros(1024, dtype=np.int32)
+        self.values = np.zeros(1024, dtype=np.float32)
+        self.used = 0
+        self.garbage = 0
+        self.ids = []
+        self.rows = {}
+        self.starts = np.zeros(64, dtype=np.int64)
+        self.lengths = np.zeros(64, dtype=np.int64)
+        self.texts = {}
+        self._norms = None
+        self._norms_version = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _row(self, slot):
+        start, length = self.starts[slot], self.lengths[slot]
+        return self.indices[start:start + length].copy(), self.values[start:start + length].copy()
+
+    def _append(self, tf):
+        needed = self.used + len(tf[0])
+        if needed > len(self.indices):
+            size = max(needed, 2 * len(self.indices))
+            self.indices = np.resize(self.indices, size)
+            self.values = np.resize(self.values, size)
+        start = self.used
+        self.indices[start:needed] = tf[0]
+        self.values[start:needed] = tf[1]
+        self.used = needed
+        return start
+
+    def put(self, record_id, tf):
+        """Insert or replace a row; returns the previous sparse vector if any"""
+        slot = self.rows.get(record_id)
+        previous = None
+        if slot is None:
+            slot = len(self.ids)
+            if slot == len(self.starts):
+                self.starts = np.resize(self.starts, 2 * slot)
+                self.lengths = np.resize(self.lengths, 2 * slot)
+            self.ids.append(record_id)
+            self.rows[record_id] = slot
+        else:
+            previous = self._row(slot)
+            self.garbage += self.lengths[slot]
+        self.starts[slot] = self._append(tf)
+        self.lengths[slot] = len(tf[0])
+        self._norms = None
+        self._maybe_compact()
+        return previous
+
+    def delete(self, record_id):
+        """Remove a row by moving the last slot into its place; returns its sparse vector"""
+        slot = self.rows.pop(record_id, None)
+        if slot is None:
+            return None
+        removed = self._row(slot)
+        self.garbage += self.lengths[slot]
+        last = len(self.ids) - 1
+        if slot != last:
+            self.starts[slot] = self.starts[last]
+            self.lengths[slot] = self.lengths[last]
+            self.ids[slot] = self.ids[last]
+            self.rows[self.ids[slot]] = slot
+        self.ids.pop()
+        self.texts.pop(record_id, None)
+        self._norms = None
+        self._maybe_compact()
+        return removed
+
+    def _maybe_compact(self):
+        if self.garbage <= max(1024, self.used - self.garbage):
+            return
+        n = len(self.ids)
+        rows = [self._row(slot) for slot in range(n)]
+        self.used = 0
+        self.garbage = 0
+        for slot, tf in enumerate(rows):
+            self.starts[slot] = self._append(tf)
+
+    def _row_sums(self, contributions):
+        """Sum per-entry contributions over each live row"""
+        n = len(self.ids)
+        prefix = np.concatenate(([0.0], np.cumsum(contributions, dtype=np.float64)))
+        starts = self.starts[:n]
+        return prefix[starts + self.lengths[:n]] - prefix[starts]
+
+    def norms(self, idf, version):
+        """Row norms of the TF-IDF vectors, cached until the IDF changes"""
+        if self._norms is None or self._norms_version != version:
+            weighted = self.values[:self.used] * idf[self.indices[:self.used]]
+            self._norms = np.sqrt(self._row_sums(weighted * weighted))
+            self._norms_version = version
+        return self._norms
+
+    def cosine(self, query, idf, version):
+        """Cosine similarity of a dense TF query against every row"""
+        weighted = query * idf
+        query_norm = np.linalg.norm(weighted)
+        if query_norm == 0 or not len(self.ids):
+            return np.zeros(len(self.ids), dtype=np.float32)
+        norms = self.norms(idf, version)
+        dots = self._row_sums(self.values[:self.used] * (weighted * idf)[self.indices[:self.used]])
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(norms > 0, dots / (norms * query_norm), 0).astype(np.float32)
+
+
+class SemanticIndex:
+    """Students and opportunities in one vector space with a shared IDF"""
+
+    def __init__(self, n_features=SEMANTIC_FEATURES):
+        self.vectorizer = HashedVectorizer(n_features)
+        self.students = VectorCollection()
+        self.opportunities = VectorCollection()
+        self._synced_students = None
+        self._lock = threading.RLock()
+
+    def _put(self, collection, record_id, terms):
+        key = ' '.join(terms)
+        if collection.texts.get(record_id) == key:
+            return False
+        tf = self.vectorizer.tf(terms)
+        previous = collection.put(record_id, tf)
+        if previous is not None:
+            self.vectorizer.remove(previous)
+        self.vectorizer.add(tf)
+        collection.texts[record_id] = key
+        return True
+
+    def _delete(self, collection, record_id):
+        removed = collection.delete(record_id)
+        if removed is not None:
+            self.vectorizer.remove(removed)
+
+    def upsert_student(self, student):
+        """Add or refresh one student (no-op when the profile text is unchanged)"""
+        with self._lock:
+            return self._put(self.students, str(student['id']), student_terms(student))
+
+    def remove_student(self, student_id):
+        with self._lock:
+            self._delete(self.students, str(student_id))
+
+    def upsert_opportunity(self, opportunity):
+        """Add or refresh one opportunity; opportunities without an id are keyed by title"""
+        with self._lock:
+            record_id = str(opportunity.get('id') or opportunity.get('title'))
+            return self._put(self.opportunities, record_id, opportunity_terms(opportunity))
+
+    def remove_opportunity(self, opportunity_id):
+        with self._lock:
+            self._delete(self.opportunities, str(opportunity_id))
+
+    def sync_students(self, students):
+        """Mirror a full student list; skipped when the same list object was synced last"""
+        with self._lock:
+            if students is self._synced_students:
+                return 0
+            changed = sum(self.upsert_student(s) for s in students)
+            current = {str(s['id']) for s in students}
+            for student_id in [i for i in self.students.ids if i not in current]:
+                self._delete(self.students, student_id)
+                changed += 1
+            self._synced_students = students
+            return changed
+
+    def score_students(self, opportunity, student_ids=None):
+        """
+        Cosine similarity of an opportunity to students.
+        With student_ids, the result is aligned to that order (unknown ids score 0).
+        """
+        with self._lock:
+            query = self.vectorizer.dense(self.vectorizer.tf(opportunity_terms(opportunity)))
+            scores = self.students.cosine(query, self.vectorizer.idf(), self.vectorizer.version)
+            if student_ids is None:
+                return scores
+            if not len(scores):
+                return np.zeros(len(student_ids), dtype=np.float32)
+            rows = self.students.rows
+            index = np.array([rows.get(str(i), -1) for i in student_ids], dtype=np.int64)
+            return np.where(index >= 0, scores[index], 0).astype(np.float32)
+
+    def score_opportunities(self, student, opportunity_ids):
+        """Cosine similarity of a student to opportunities, aligned to opportunity_ids"""
+        with self._lock:
+            query = self.vectorizer.dense(self.vectorizer.tf(student_terms(student)))
+            scores = self.opportunities.cosine(query, self.vectorizer.idf(), self.vectorizer.version)
+            if not len(scores):
+                return np.zeros(len(opportunity_ids), dtype=np.float32)
+            rows = self.opportunities.rows
+            index = np.array([rows.get(str(i), -1) for i in opportunity_ids], dtype=np.int64)
+            return np.where(index >= 0, scores[index], 0).astype(np.float32)
+
+    def search_students(self, opportunity, k=10):
+        """Top-k [(student_id, similarity)] for an opportunity"""
+        with self._lock:
+            scores = self.score_students(opportunity)
+            return self._top_k(self.students.ids, scores, k)
+
+    def search_opportunities(self, student, k=10):
+        """Top-k [(opportunity_id, similarity)] for a student"""
+        with self._lock:
+            query = self.vectorizer.dense(self.vectorizer.tf(student_terms(student)))
+            scores = self.opportunities.cosine(query, self.vectorizer.idf(), self.vectorizer.version)
+            return self._top_k(self.opportunities.ids, scores, k)
+
+    def _top_k(self, ids, scores, k):
+        if not len(scores):
+            return []
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [(ids[i], float(scores[i])) for i in top if scores[i] > 0]
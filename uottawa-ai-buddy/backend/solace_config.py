@@ -2,6 +2,9 @@ import os
 from dotenv import load_dotenv
 from solace.messaging.messaging_service import MessagingService
 from solace.messaging.config.solace_properties import service_properties
+from solace.messaging.resources.topic import Topic
+from solace.messaging.resources.topic_subscription import TopicSubscription
+from solace.messaging.receiver.message_receiver import MessageHandler
 
 load_dotenv()
 
@@ -20,17 +23,52 @@ def get_messaging_service():
     print(" Connected to Solace")
     return messaging_service
 
+class TopicPublisher:
+    """Direct publisher bound to one topic"""
+    
+    def __init__(self, publisher, topic_name):
+        self.publisher = publisher
+        self.topic = Topic.of(topic_name)
+    
+    def publish(self, payload):
+        self.publisher.publish(destination=self.topic, message=payload)
+    
+    def terminate(self):
+        self.publisher.terminate()
+
+class _CallbackHandler(MessageHandler):
+    """Hands the raw payload of every inbound message to a callback"""
+    
+    def __init__(self, callback):
+        self.callback = callback
+    
+    def on_message(self, message):
+        payload = message.get_payload_as_bytes()
+        if payload is None:
+            payload = (message.get_payload_as_string() or '').encode('utf-8')
+        self.callback(payload)
+
 def create_publisher(service, topic_name):
     """Create publisher for topic"""
-    # TODO: Implement tomorrow
+    publisher = service.create_direct_message_publisher_builder().build()
+    publisher.start()
     print(f" Publisher created for: {topic_name}")
-    pass
+    return TopicPublisher(publisher, topic_name)
 
-def create_receiver(service, topic_name, callback):
-    """Create receiver for topic"""
-    # TODO: Implement tomorrow
-    print(f" Receiver created for: {topic_name}")
-    pass
+def create_receiver(service, topic_name, callback, group=None):
+    """
+    Create receiver for topic; callback(payload_bytes) runs on the SDK thread.
+    With a group, receivers share the subscription and each message goes to
+    one member of the group (like a consumer group on the local event log)
+    """
+    subscription = f"#share/{group}/{topic_name}" if group else topic_name
+    receiver = service.create_direct_message_receiver_builder() \
+        .with_subscriptions([TopicSubscription.of(subscription)]) \
+        .build()
+    receiver.start()
+    receiver.receive_async(_CallbackHandler(callback))
+    print(f" Receiver created for: {subscription}")
+    return receiver
 
 if __name__ == "__main__":
     # Test connection
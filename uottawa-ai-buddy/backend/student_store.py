@@ -0,0 +1,134 @@
+"""
+STUDENT STORE - Long-lived in-memory copy of the students table
+Loads the table once, then pulls only rows changed since a watermark;
+a periodic full reload picks up edits the watermark misses and deletions
+"""
+
+import os
+import time
+import threading
+from dotenv import load_dotenv
+from supabase_client import supabase
+
+load_dotenv()
+
+# Column used to detect new/changed rows ('updated_at' if the table has one)
+STUDENT_WATERMARK_COLUMN = os.getenv('STUDENT_WATERMARK_COLUMN', 'created_at')
+# Minimum seconds between two delta syncs (0 = sync on every call)
+STUDENT_STORE_REFRESH_SECONDS = float(os.getenv('STUDENT_STORE_REFRESH_SECONDS', '10'))
+# Seconds between full reloads (0 = never): deleted students, and edits when the
+# watermark column is created_at, only show up in a full load
+STUDENT_STORE_RELOAD_SECONDS = float(os.getenv('STUDENT_STORE_RELOAD_SECONDS', '300'))
+
+
+class StudentStore:
+    """
+    Cache of all student profiles with incremental delta sync.
+    get_all() returns the same list object until something changes, so
+    callers can cheaply detect that their derived data is still valid.
+    """
+
+    def __init__(self, watermark_column=STUDENT_WATERMARK_COLUMN,
+                 refresh_interval=STUDENT_STORE_REFRESH_SECONDS, reload_interval=STUDENT_STORE_RELOAD_SECONDS):
+        self.watermark_column = watermark_column
+        self.refresh_interval = refresh_interval
+        self.reload_interval = reload_interval
+        self.watermark = None
+        self.version = 0
+        self.loaded = False
+        self.last_sync = 0
+        self.last_load = 0
+        self._rows = {}
+        self._students = []
+        self._lock = threading.Lock()
+
+    def get_all(self):
+        """Return all students, syncing with the database when due"""
+        with self._lock:
+            self._sync()
+            return self._students
+
+    def snapshot(self):
+        """(students, set_version()) read under one lock, so the version describes exactly that list"""
+        with self._lock:
+            self._sync()
+            return self._students, f"{self.watermark}|{len(self._rows)}"
+
+    def _sync(self):
+        if not self.loaded or (self.reload_interval and time.time() - self.last_load >= self.reload_interval):
+            self._full_load()
+        elif time.time() - self.last_sync >= self.refresh_interval:
+            self._delta_sync()
+
+    def set_version(self):
+        """
+        Persistent identity of the student set (newest watermark value and
+        row count): changes when students sign up or, with an updated_at
+        watermark column, edit their profile. Unlike version it survives restarts
+        """
+        with self._lock:
+            return f"{self.watermark}|{len(self._rows)}"
+
+    def invalidate(self):
+        """Forget the sync state; the next get_all() reloads the whole table (e.g. after a delete)"""
+        with self._lock:
+            self.loaded = False
+            self.watermark = None
+
+    def _full_load(self):
+        try:
+            rows = supabase.select_all('students')
+        except Exception as e:
+            if self.loaded:
+                # Retried at the next refresh; until then the cached rows are served
+                self.last_load = time.time() - self.reload_interval + self.refresh_interval
+                print(f"  Student reload failed, serving cached data: {e}")
+            else:
+                print(f" Database error: {e}")
+            return
+
+        reloaded = {row['id']: row for row in rows}
+        self.last_sync = self.last_load = time.time()
+        self._advance_watermark(rows)
+        # Unchanged table: keep the snapshot (and version) so derived data stays valid
+        if self.loaded and reloaded == self._rows:
+            return
+        self._rows = reloaded
+        self._publish()
+        self.loaded = True
+        print(f" Student store loaded {len(rows)} students")
+
+    def _delta_sync(self):
+        params = {'select': '*', 'order': f'{self.watermark_column}.asc,id.asc'}
+        if self.watermark is not None:
+            # gte + merge by id: rows sharing the watermark timestamp are not missed
+            params[self.watermark_column] = f'gte.{self.watermark}'
+
+        try:
+            rows = supabase.select_all('students', params)
+        except Exception as e:
+            print(f"  Student delta sync failed, serving cached data: {e}")
+            return
+
+        self.last_sync = time.time()
+        changed = [row for row in rows if self._rows.get(row['id']) != row]
+        if not changed:
+            return
+
+        for row in changed:
+            self._rows[row['id']] = row
+        self._advance_watermark(changed)
+        self._publish()
+        print(f" Student store synced {len(changed)} new/updated students")
+
+    def _advance_watermark(self, rows):
+        values = [row[self.watermark_column] for row in rows if row.get(self.watermark_column)]
+        if values:
+            newest = max(values)
+            if self.watermark is None or newest > self.watermark:
+                self.watermark = newest
+
+    def _publish(self):
+        """Swap in a new snapshot list (never mutate the one handed out)"""
+        self._students = list(self._rows.values())
+        self.version += 1
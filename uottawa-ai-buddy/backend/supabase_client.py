@@ -0,0 +1,249 @@
+"""
+SUPABASE CLIENT - Shared REST client used by every backend agent
+Keep-alive connection pooling, timeouts, retries with jittered backoff,
+pagination helpers, plus an asyncio wrapper around the same pool
+"""
+
+import os
+import time
+import random
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+from metrics import counter, histogram
+
+load_dotenv()
+
+SUPABASE_URL = os.getenv('SUPABASE_URL')
+SUPABASE_KEY = os.getenv('SUPABASE_KEY')
+
+SUPABASE_CONNECT_TIMEOUT = float(os.getenv('SUPABASE_CONNECT_TIMEOUT', '5'))
+SUPABASE_READ_TIMEOUT = float(os.getenv('SUPABASE_READ_TIMEOUT', '30'))
+SUPABASE_MAX_RETRIES = int(os.getenv('SUPABASE_MAX_RETRIES', '3'))
+SUPABASE_BACKOFF_BASE = float(os.getenv('SUPABASE_BACKOFF_BASE', '0.25'))
+SUPABASE_BACKOFF_MAX = float(os.getenv('SUPABASE_BACKOFF_MAX', '8'))
+SUPABASE_POOL_SIZE = int(os.getenv('SUPABASE_POOL_SIZE', '20'))
+SUPABASE_PAGE_SIZE = int(os.getenv('SUPABASE_PAGE_SIZE', '1000'))
+
+# Status codes worth another attempt
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Methods that are safe to repeat after the request may have reached the server
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS'}
+
+SUPABASE_SECONDS = histogram('supabase_request_duration_seconds', 'Duration of Supabase REST calls (per attempt)',
+                             ['table', 'method'])
+SUPABASE_REQUESTS = counter('supabase_requests_total', 'Supabase REST calls by outcome (per attempt)',
+                            ['table', 'method', 'status'])
+
+
+class SupabaseError(Exception):
+    """Raised when Supabase answers with a non-2xx status"""
+
+    def __init__(self, response):
+        self.status_code = response.status_code
+        self.text = response.text
+        super().__init__(f"{response.status_code} {response.text}")
+
+
+class SupabaseClient:
+    """Pooled, retrying client for the Supabase REST API (PostgREST)"""
+
+    def __init__(self, url=SUPABASE_URL, key=SUPABASE_KEY,
+                 connect_timeout=SUPABASE_CONNECT_TIMEOUT, read_timeout=SUPABASE_READ_TIMEOUT,
+                 max_retries=SUPABASE_MAX_RETRIES, backoff_base=SUPABASE_BACKOFF_BASE,
+                 backoff_max=SUPABASE_BACKOFF_MAX, pool_size=SUPABASE_POOL_SIZE):
+        self.base_url = f"{url}/rest/v1"
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            'apikey': key or '',
+            'Authorization': f'Bearer {key}'
+        })
+
+    def request(self, method, table, params=None, json=None, headers=None, retry=None):
+        """
+        Send one request and return the Response (any status).
+        retry=None retries idempotent methods only; pass retry=True for
+        writes that are safe to repeat, e.g. upserts.
+        """
+        method = method.upper()
+        if retry is None:
+            retry = method in IDEMPOTENT_METHODS
+
+        attempt = 0
+        while True:
+            try:
+                response = self._send(method, table, params=params, json=json, headers=headers)
+            except requests.exceptions.ConnectTimeout:
+                # Nothing reached the server, so even a plain insert can be resent
+                if attempt >= self.max_retries:
+                    raise
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if not retry or attempt >= self.max_retries:
+                    raise
+            else:
+                if not retry or response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    return response
+                retry_after = response.headers.get('Retry-After')
+                if retry_after and retry_after.isdigit():
+                    time.sleep(min(float(retry_after), self.backoff_max))
+                    attempt += 1
+                    continue
+
+            self._backoff(attempt)
+            attempt += 1
+
+    def _send(self, method, table, **kwargs):
+        """One HTTP attempt, timed into the supabase_* metrics"""
+        started = time.time()
+        status = 'error'
+        try:
+            response = self.session.request(method, f"{self.base_url}/{table}", timeout=self.timeout, **kwargs)
+            status = response.status_code
+            return response
+        finally:
+            SUPABASE_SECONDS.labels(table=table, method=method).observe(time.time() - started)
+            SUPABASE_REQUESTS.labels(table=table, method=method, status=status).inc()
+
+    def _backoff(self, attempt):
+        """Full-jitter exponential backoff"""
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        time.sleep(random.uniform(0, delay))
+
+    def select(self, table, params=None, headers=None):
+        """GET rows as a list (raises SupabaseError on failure)"""
+        response = self.request('GET', table, params=params or {'select': '*'}, headers=headers)
+        if response.status_code != 200:
+            raise SupabaseError(response)
+        return response.json()
+
+    def paginate(self, table, params=None, page_size=SUPABASE_PAGE_SIZE):
+        """
+        Yield pages of rows using limit/offset.
+        Orders by id unless the caller gives an order, so pages are stable.
+        """
+        params = dict(params or {'select': '*'})
+        params.setdefault('order', 'id.asc')
+        offset = 0
+        while True:
+            page = self.select(table, {**params, 'limit': page_size, 'offset': offset})
+            if page:
+                yield page
+            if len(page) < page_size:
+                return
+            offset += page_size
+
+    def select_all(self, table, params=None, page_size=SUPABASE_PAGE_SIZE):
+        """GET every matching row, following pagination past the server row limit"""
+        rows = []
+        for page in self.paginate(table, params, page_size):
+            rows.extend(page)
+        return rows
+
+    def insert(self, table, rows, on_conflict=None, returning='minimal'):
+        """
+        POST a row or a list of rows. With on_conflict the write becomes an
+        upsert (merge-duplicates) and is retried like an idempotent call.
+        """
+        prefer = [f'return={returning}']
+        params = None
+        if on_conflict:
+            prefer.insert(0, 'resolution=merge-duplicates')
+            params = {'on_conflict': on_conflict}
+        return self.request(
+            'POST', table, params=params, json=rows,
+            headers={'Content-Type': 'application/json', 'Prefer': ','.join(prefer)},
+            retry=bool(on_conflict)
+        )
+
+    def delete(self, table, params):
+        """DELETE the rows matching params (PostgREST filters; an empty filter is refused)"""
+        if not params:
+            raise ValueError("delete needs a filter")
+        return self.request('DELETE', table, params=params, headers={'Prefer': 'return=minimal'})
+
+    def count(self, table, params=None):
+        """Exact row count from the Content-Range header"""
+        response = self.request(
+            'HEAD', table, params=params or {'select': '*'},
+            headers={'Prefer': 'count=exact'}
+        )
+        if not 200 <= response.status_code < 300:
+            raise SupabaseError(response)
+        return int(response.headers.get('Content-Range', '*/0').split('/')[-1])
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncSupabaseClient:
+    """
+    asyncio variant sharing the sync client's connection pool.
+    Calls run on a bounded thread pool so coroutines never block the loop.
+    """
+
+    def __init__(self, client=None, max_workers=SUPABASE_POOL_SIZE):
+        self.client = client or supabase
+        self._executor = None
+        self._max_workers = max_workers
+        self._lock = threading.Lock()
+
+    def _run(self, fn, *args, **kwargs):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self._max_workers,
+                                                    thread_name_prefix='supabase')
+        loop = asyncio.get_event_loop()
+        return loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+
+    async def request(self, method, table, **kwargs):
+        return await self._run(self.client.request, method, table, **kwargs)
+
+    async def select(self, table, params=None, headers=None):
+        return await self._run(self.client.select, table, params, headers)
+
+    async def paginate(self, table, params=None, page_size=SUPABASE_PAGE_SIZE):
+        params = dict(params or {'select': '*'})
+        params.setdefault('order', 'id.asc')
+        offset = 0
+        while True:
+            page = await self.select(table, {**params, 'limit': page_size, 'offset': offset})
+            if page:
+                yield page
+            if len(page) < page_size:
+                return
+            offset += page_size
+
+    async def select_all(self, table, params=None, page_size=SUPABASE_PAGE_SIZE):
+        rows = []
+        async for page in self.paginate(table, params, page_size):
+            rows.extend(page)
+        return rows
+
+    async def insert(self, table, rows, on_conflict=None, returning='minimal'):
+        return await self._run(self.client.insert, table, rows, on_conflict, returning)
+
+    async def delete(self, table, params):
+        return await self._run(self.client.delete, table, params)
+
+    async def count(self, table, params=None):
+        return await self._run(self.client.count, table, params)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+
+# Global instance
+supabase = SupabaseClient()
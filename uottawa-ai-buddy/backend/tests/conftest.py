@@ -0,0 +1,83 @@
+"""
+Shared fixtures. Tests run offline: the backend modules are imported from the
+parent directory and every database or log file goes to a temporary directory
+"""
+
+import os
+import sys
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(autouse=True)
+def _workdir(tmp_path, monkeypatch):
+    """Relative data paths (backend/data/...) resolve inside the test's own directory"""
+    monkeypatch.chdir(tmp_path)
+
+
+def _event_page(title, day):
+    return (f'<html><head><meta property="og:description" content="About {title}"></head>'
+            f'<body><h1>{title}</h1><time datetime="{day}T18:00"></time>'
+            f'<div class="location">Tabaret Hall</div></body></html>')
+
+
+# A small copy of the events site: two listing pages, three public events and
+# one event under a path robots.txt disallows
+SITE_PAGES = {
+    '/robots.txt': ('text/plain', 'User-agent: *\nDisallow: /en/events/private\n'),
+    '/en/events-all': ('text/html', '<a href="/en/events/hackathon">Hackathon</a>'
+                                    '<a href="/en/events/career-fair#top">Career fair</a>'
+                                    '<a href="/en/events/private/board-meeting">Board</a>'
+                                    '<a href="https://elsewhere.example/en/events/x">Elsewhere</a>'
+                                    '<a href="/en/events-all?page=1">Next</a>'),
+    '/en/events-all?page=1': ('text/html', '<a href="/en/events/research-day">Research day</a>'
+                                           '<a href="/en/events-all">Back</a>'),
+    '/en/events/hackathon': ('text/html', _event_page('uOttawa Hackathon', '2099-03-14')),
+    '/en/events/career-fair': ('text/html', _event_page('Career Fair', '2099-02-01')),
+    '/en/events/research-day': ('text/html', _event_page('Research Day', '2099-04-20')),
+    '/en/events/private/board-meeting': ('text/html', _event_page('Board Meeting', '2099-05-01')),
+}
+
+
+class _SiteHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.requests.append(self.path)
+        page = SITE_PAGES.get(self.path)
+        if page is None:
+            self.send_error(404)
+            return
+        content_type, body = page
+        body = body.encode('utf-8')
+        etag = '"' + hashlib.sha256(body).hexdigest()[:16] + '"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', f'{content_type}; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def fixture_site():
+    """Local HTTP server for SITE_PAGES (ETag/304 aware); .requests lists the paths fetched"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _SiteHandler)
+    server.daemon_threads = True
+    server.requests = []
+    server.base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
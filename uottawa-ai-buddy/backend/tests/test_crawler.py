@@ -0,0 +1,59 @@
+import threading
+from crawler import Crawler, PageCache, PageParser
+
+
+def _crawl(site, cache, **kwargs):
+    crawler = Crawler(start_url=f"{site.base_url}/en/events-all", cache=cache, concurrency=4, **kwargs)
+    try:
+        return crawler, crawler.run()
+    finally:
+        crawler.close()
+
+
+def test_crawl_follows_listings_and_honours_robots(fixture_site, tmp_path):
+    crawler, events = _crawl(fixture_site, PageCache(str(tmp_path / 'cache.db')))
+
+    assert sorted(e['title'] for e in events) == ['Career Fair', 'Research Day', 'uOttawa Hackathon']
+    assert crawler.stats['disallowed'] == 1
+    assert '/en/events/private/board-meeting' not in fixture_site.requests
+    assert fixture_site.requests.count('/robots.txt') == 1
+
+    hackathon = next(e for e in events if e['title'] == 'uOttawa Hackathon')
+    assert hackathon['event_date'] == '2099-03-14'
+    assert hackathon['location'] == 'Tabaret Hall'
+    assert hackathon['description'] == 'About uOttawa Hackathon'
+
+
+def test_recrawl_revalidates_with_etags(fixture_site, tmp_path):
+    cache = PageCache(str(tmp_path / 'cache.db'))
+    _, first = _crawl(fixture_site, cache)
+    crawler, second = _crawl(fixture_site, cache)
+
+    # Every page comes back 304 and is served from the cache
+    assert crawler.stats['fetched'] == 0
+    assert crawler.stats['not_modified'] == 5
+    assert sorted(e['title'] for e in second) == sorted(e['title'] for e in first)
+
+
+def test_on_event_streams_each_event_once(fixture_site, tmp_path):
+    seen = []
+    _crawl(fixture_site, PageCache(str(tmp_path / 'cache.db')), on_event=seen.append)
+    assert len(seen) == 3
+
+
+def test_stop_cancels_the_crawl(fixture_site, tmp_path):
+    stop = threading.Event()
+    stop.set()
+    crawler, events = _crawl(fixture_site, PageCache(str(tmp_path / 'cache.db')), stop=stop)
+    assert events == []
+    assert fixture_site.requests == []
+
+
+def test_page_parser_reads_event_fields():
+    parser = PageParser()
+    parser.feed('<h1>Open <br>House</h1><time datetime="2099-01-02"></time><p>Come by</p>')
+    parser.close()
+    event = parser.event()
+    assert event['title'] == 'Open House'
+    assert event['event_date'] == '2099-01-02'
+    assert event['description'] == 'Come by'
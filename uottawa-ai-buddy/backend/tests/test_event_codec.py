@@ -0,0 +1,95 @@
+import json
+import pytest
+from event_codec import encode, decode, CodecError, MAGIC
+
+STUDENT_ID = '3f2b8c1e-9d4a-4e6b-8f0a-1c2d3e4f5a6b'
+
+
+def _new_opportunity():
+    return {
+        "type": "NEW_OPPORTUNITY",
+        "topic": "opportunities/new",
+        "timestamp": 1760800000.25,
+        "data": {
+            "id": 42,
+            "title": "uOttawa Hackathon",
+            "description": "Build something in 24h — café provided",
+            "event_date": "2026-11-14",
+            "event_time": None,
+            "location": "STEM Complex",
+            "category": "Event",
+            "posted_by": "Auto-scraper",
+            "target_programs": ["Computer Science", "Software Engineering"],
+            "target_years": [1, 2, 3],
+            "target_interests": ["Hackathons", "Custom interest"],
+            "event_key": "abc123",        # Not in the fixed layout: stored as an extra
+            "content_hash": "ff00"
+        }
+    }
+
+
+def _matches_found():
+    return {
+        "type": "MATCHES_FOUND",
+        "topic": "matches/found",
+        "timestamp": 1760800001.5,
+        "data": {
+            "opportunity_id": 42,
+            "opportunity_title": "uOttawa Hackathon",
+            "matches": [
+                {"student_id": STUDENT_ID, "match_score": 92, "reasoning": "Strong fit",
+                 "idempotency_key": "k1"},
+                {"student_id": STUDENT_ID.upper(), "match_score": 65, "reasoning": "Strong fit"},
+            ],
+            "match_count": 2
+        }
+    }
+
+
+@pytest.mark.parametrize('event', [
+    _new_opportunity(),
+    _matches_found(),
+    {"type": "SOMETHING_ELSE", "data": {"nested": [{"a": -1}, True, False, None, 1.5e300]}},
+    {"type": "MATCHES_FOUND", "data": "not a dict"},
+    {"type": "MATCHES_FOUND", "data": {"matches": [1, 2, 3]}},
+    {"type": "NEW_OPPORTUNITY"},
+    [1, "two", {"three": 3}],
+    "plain string",
+    -(2 ** 70),
+])
+def test_round_trip(event):
+    payload = encode(event)
+    assert payload[0] == MAGIC
+    assert decode(payload) == event
+
+
+def test_round_trip_matches_json():
+    # Whatever the binary form, decoding gives what a JSON round trip would
+    event = _matches_found()
+    event["data"]["matches"][0]["tuple"] = (1, 2)
+    assert decode(encode(event)) == json.loads(json.dumps(event))
+
+
+def test_binary_is_smaller_than_json():
+    for event in (_new_opportunity(), _matches_found()):
+        assert len(encode(event)) < len(json.dumps(event).encode('utf-8'))
+
+
+def test_legacy_json_payloads_still_decode():
+    event = _matches_found()
+    assert decode(json.dumps(event).encode('utf-8')) == event
+
+
+def test_bad_payloads_raise_codec_error():
+    payload = encode(_matches_found())
+    with pytest.raises(CodecError):
+        decode(payload[:len(payload) // 2])
+    with pytest.raises(CodecError):
+        decode(bytes((MAGIC, 99, 0)) + payload[3:])
+    with pytest.raises(CodecError):
+        decode(bytes((MAGIC, payload[1], 77)) + payload[3:])
+
+
+def test_unserializable_values_are_rejected():
+    with pytest.raises(TypeError):
+        encode({"type": "NEW_OPPORTUNITY", "data": {"id": object()}})
@@ -0,0 +1,66 @@
+from event_log import EventLog, HEADER
+
+
+def _event(i):
+    return {"type": "MATCHES_FOUND", "data": {"n": i}}
+
+
+def test_consumer_resumes_from_committed_offset_after_reopen(tmp_path):
+    log = EventLog(str(tmp_path))
+    for i in range(5):
+        log.publish('matches/found', _event(i))
+    consumer = log.consumer('notification', 'matches/found')
+    polled = consumer.poll()
+    assert [offset for offset, _ in polled] == [0, 1, 2, 3, 4]
+    consumer.commit(2)
+
+    # A restarted process gets the uncommitted events again, and only those
+    reopened = EventLog(str(tmp_path)).consumer('notification', 'matches/found')
+    assert [event['data']['n'] for _, event in reopened.poll()] == [3, 4]
+    assert reopened.lag() == 2
+
+
+def test_poll_returns_only_appended_records(tmp_path):
+    log = EventLog(str(tmp_path))
+    consumer = log.consumer('notification', 'matches/found')
+    log.publish('matches/found', _event(0))
+    assert len(consumer.poll()) == 1
+    assert consumer.poll() == []
+    log.publish('matches/found', _event(1))
+    assert [event['data']['n'] for _, event in consumer.poll()] == [1]
+
+
+def test_consumer_groups_keep_their_own_offsets(tmp_path):
+    log = EventLog(str(tmp_path))
+    for i in range(3):
+        log.publish('opportunities/new', _event(i))
+    first = log.consumer('matching', 'opportunities/new')
+    first.poll()
+    first.commit(2)
+    assert log.consumer('analytics', 'opportunities/new').committed == 0
+    assert EventLog(str(tmp_path)).consumer('matching', 'opportunities/new').committed == 3
+
+
+def test_offsets_continue_across_segments(tmp_path):
+    log = EventLog(str(tmp_path), segment_bytes=64)
+    for i in range(10):
+        assert log.publish('matches/found', _event(i)) == i
+    topic = EventLog(str(tmp_path), segment_bytes=64).topic('matches/found')
+    assert len(topic._segments()) > 1
+    consumer = EventLog(str(tmp_path)).consumer('notification', 'matches/found')
+    consumer.seek(7)
+    assert [event['data']['n'] for _, event in consumer.poll()] == [7, 8, 9]
+
+
+def test_torn_tail_is_ignored_and_overwritten(tmp_path):
+    log = EventLog(str(tmp_path))
+    log.publish('matches/found', _event(0))
+    topic = log.topic('matches/found')
+    segment = topic._segment_path(topic._segments()[-1])
+    with open(segment, 'ab') as f:
+        f.write(HEADER.pack(1, 100, 0) + b'partial')
+
+    reopened = EventLog(str(tmp_path))
+    assert reopened.topic('matches/found').end_offset() == 1
+    assert reopened.publish('matches/found', _event(1)) == 1
+    assert [event['data']['n'] for _, event in reopened.consumer('x', 'matches/found').poll()] == [0, 1]
@@ -0,0 +1,149 @@
+import time
+import threading
+import pytest
+from gemini_gateway import (GeminiGateway, GeminiError, GeminiUnavailable, TokenBucket, CircuitBreaker,
+                            estimate_tokens, GEMINI_OUTPUT_TOKENS)
+
+
+class FakeGateway(GeminiGateway):
+    """Gateway whose HTTP call is replaced by a scripted list of outcomes"""
+
+    def __init__(self, outcomes=(), **kwargs):
+        kwargs.setdefault('queue_timeout', 0.05)
+        super().__init__(api_key='test', **kwargs)
+        self.outcomes = list(outcomes)
+        self.sent = []
+
+    def _call(self, prompt):
+        self._count('calls')
+        self.sent.append(prompt)
+        outcome = self.outcomes.pop(0) if self.outcomes else ('ok', None)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+def _wait_for(condition, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_token_bucket_refund_restores_budget_up_to_capacity():
+    bucket = TokenBucket(60)
+    assert bucket.acquire(60, timeout=0)
+    assert not bucket.acquire(30, timeout=0)
+
+    bucket.refund(30)
+    assert bucket.acquire(30, timeout=0)
+
+    bucket.refund(1000)
+    assert bucket.level == pytest.approx(60, abs=1)
+
+
+def test_token_bucket_consume_can_go_negative_and_refills_over_time():
+    bucket = TokenBucket(600)  # 10 per second
+    bucket.consume(605)
+    assert bucket.level < 0
+    assert not bucket.acquire(1, timeout=0.05)
+    assert bucket.acquire(1, timeout=1)
+
+
+def test_token_bucket_refund_wakes_a_waiting_acquire():
+    bucket = TokenBucket(6)  # One token every 10 seconds
+    assert bucket.acquire(6, timeout=0)
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(bucket.acquire(1, timeout=30)))
+    waiter.start()
+    time.sleep(0.05)
+    bucket.refund(1)
+    waiter.join(2)
+    assert got == [True]
+
+
+def test_circuit_breaker_state_changes():
+    breaker = CircuitBreaker(threshold=2, cooldown=0.05)
+    assert breaker.allow()
+
+    assert not breaker.record_failure()
+    breaker.record_success()          # A success resets the streak
+    assert not breaker.record_failure()
+    assert breaker.record_failure()   # Second consecutive failure trips it
+    assert breaker.state == CircuitBreaker.OPEN and not breaker.allow()
+    assert breaker.trips == 1
+
+    assert not breaker.begin_probe()  # Still cooling down
+    time.sleep(0.06)
+    assert breaker.begin_probe()
+    assert breaker.state == CircuitBreaker.HALF_OPEN and not breaker.allow()
+    assert not breaker.begin_probe()  # Only one probe at a time
+
+    breaker.end_probe(False)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.begin_probe()  # Cooldown restarted
+    time.sleep(0.06)
+    assert breaker.begin_probe()
+    breaker.end_probe(True)
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.allow()
+    assert breaker.failures == 0
+
+
+def test_rejected_call_refunds_both_buckets():
+    gateway = FakeGateway(max_in_flight=1)
+    assert gateway.limiter.acquire(0)  # Another call holds the only slot
+    requests_before = gateway.requests_bucket.level
+    tokens_before = gateway.tokens_bucket.level
+
+    with pytest.raises(GeminiUnavailable):
+        gateway.generate("prompt")
+
+    assert gateway.sent == []
+    assert gateway.requests_bucket.level == pytest.approx(requests_before, abs=0.1)
+    assert gateway.tokens_bucket.level == pytest.approx(tokens_before, abs=1)
+    assert gateway.rejected == 1
+
+
+def test_token_budget_rejection_refunds_the_request():
+    gateway = FakeGateway(tpm=100)  # Smaller than one prompt's estimate plus output budget
+    gateway.tokens_bucket.consume(100)
+    requests_before = gateway.requests_bucket.level
+
+    with pytest.raises(GeminiUnavailable):
+        gateway.generate("prompt")
+    assert gateway.requests_bucket.level == pytest.approx(requests_before, abs=0.1)
+
+
+def test_actual_usage_above_the_estimate_is_debited():
+    gateway = FakeGateway([('ok', 50000)])
+    before = gateway.tokens_bucket.level
+    assert gateway.generate("prompt") == 'ok'
+    assert before - gateway.tokens_bucket.level == pytest.approx(50000, abs=1)
+    assert estimate_tokens("prompt") + GEMINI_OUTPUT_TOKENS < 50000
+
+
+def test_breaker_trips_then_recovers_through_the_probe():
+    gateway = FakeGateway([GeminiError(500), GeminiError(503)], breaker_threshold=2, breaker_cooldown=0.05)
+    for _ in range(2):
+        with pytest.raises(GeminiError):
+            gateway.generate("prompt")
+    assert gateway.breaker.state == CircuitBreaker.OPEN
+
+    # Open breaker: rejected locally, nothing sent
+    with pytest.raises(GeminiUnavailable):
+        gateway.generate("prompt")
+    assert len(gateway.sent) == 2
+
+    # The background probe succeeds after the cooldown and closes the breaker
+    assert _wait_for(lambda: gateway.breaker.state == CircuitBreaker.CLOSED)
+    assert gateway.generate("prompt") == 'ok'
+
+
+def test_throttling_halves_the_concurrency_limit():
+    gateway = FakeGateway([GeminiError(429)], max_in_flight=8)
+    with pytest.raises(GeminiError):
+        gateway.generate("prompt")
+    assert gateway.limiter.limit == 4
+    assert gateway.throttled == 1
@@ -0,0 +1,66 @@
+from datetime import date
+from match_ledger import MatchLedger, idempotency_key
+
+TODAY = date(2026, 10, 18)
+
+
+def _opportunity(opportunity_id=1, title='Career Fair', event_date='2026-11-01'):
+    return {'id': opportunity_id, 'title': title, 'description': 'Meet employers',
+            'event_date': event_date, 'target_programs': ['Law']}
+
+
+def _match(student_id, score):
+    return {'student_id': student_id, 'match_score': score, 'reasoning': 'Fits'}
+
+
+def test_delta_emits_only_new_or_rescored_matches(tmp_path):
+    ledger = MatchLedger(str(tmp_path / 'ledger.db'))
+    opportunity = _opportunity()
+
+    first = ledger.delta(opportunity, [_match('a', 80), _match('b', 70)])
+    assert [m['student_id'] for m in first] == ['a', 'b']
+    assert first[0]['idempotency_key'] == idempotency_key('1', 'a', ledger.version)
+    ledger.record(opportunity, first)
+
+    # Same scores: nothing new. A changed score is re-emitted under the same key
+    second = ledger.delta(opportunity, [_match('a', 80), _match('b', 75), _match('c', 66)])
+    assert [(m['student_id'], m['match_score']) for m in second] == [('b', 75), ('c', 66)]
+    assert second[0]['idempotency_key'] == first[1]['idempotency_key']
+
+
+def test_delta_survives_reopen_and_version_bump(tmp_path):
+    path = str(tmp_path / 'ledger.db')
+    opportunity = _opportunity()
+    ledger = MatchLedger(path)
+    ledger.record(opportunity, ledger.delta(opportunity, [_match('a', 80)]))
+
+    assert MatchLedger(path).delta(opportunity, [_match('a', 80)]) == []
+    # New scoring rules: every match gets a new key and is emitted again
+    assert len(MatchLedger(path, version='2.1').delta(opportunity, [_match('a', 80)])) == 1
+
+
+def test_is_processed_tracks_content_and_student_version(tmp_path):
+    ledger = MatchLedger(str(tmp_path / 'ledger.db'))
+    opportunity = _opportunity()
+    ledger.record(opportunity, [], complete=False, student_version='w1|10')
+    assert not ledger.is_processed(opportunity, 'w1|10')
+
+    ledger.record(opportunity, [], student_version='w1|10')
+    assert ledger.is_processed(opportunity, 'w1|10')
+    assert not ledger.is_processed(opportunity, 'w2|11')
+    assert not ledger.is_processed(dict(opportunity, description='Moved online'), 'w1|10')
+    assert ledger.pending([opportunity, _opportunity(2)], 'w1|10') == [_opportunity(2)]
+
+
+def test_stale_lists_upcoming_id_keyed_opportunities_of_older_student_sets(tmp_path):
+    ledger = MatchLedger(str(tmp_path / 'ledger.db'))
+    ledger.record(_opportunity(1), [], student_version='w1|10')
+    ledger.record(_opportunity(2), [], student_version='w2|11')                  # Current
+    ledger.record(_opportunity(3, event_date='2026-10-01'), [], student_version='w1|10')  # Over
+    ledger.record(_opportunity(4, event_date='2026-10-18'), [], student_version='w1|10')  # Today
+    ledger.record(_opportunity(5, event_date=None), [], student_version='w1|10')          # No date
+    ledger.record(_opportunity(None, title='Untitled id'), [], student_version='w1|10')   # Keyed by title
+    ledger.record(_opportunity(6), [], complete=False, student_version='w1|10')          # Not finished
+
+    assert sorted(ledger.stale('w2|11', today=TODAY)) == ['1', '4', '5']
+    assert MatchLedger(str(tmp_path / 'ledger.db'), version='2.1').stale('w2|11', today=TODAY) == []
@@ -0,0 +1,94 @@
+import random
+from scoring_engine import ScoringEngine, INTERESTS, PROGRAMS, ALL_PROGRAMS, MIN_SCORE, rule_reasoning
+
+
+def _old_score(opportunity, student):
+    """The per-student rules of the original _simple_match loop"""
+    target_programs = opportunity.get('target_programs') or []
+    target_years = opportunity.get('target_years') or []
+    target_interests = opportunity.get('target_interests') or []
+    if not target_programs and not target_years and not target_interests:
+        return 75
+
+    score = 50
+    if not target_programs or 'All Programs' in target_programs or student['program'] in target_programs:
+        score += 20
+    if not target_years or student['year'] in target_years:
+        score += 15
+    if target_interests and student.get('interests'):
+        if set(target_interests) & set(student['interests']):
+            score += 15
+    return min(score, 90)
+
+
+def _students(rng, n):
+    students = []
+    for i in range(n):
+        interests = rng.sample(INTERESTS, rng.randint(0, 4))
+        if i % 7 == 0:
+            interests.append(f'Custom tag {i}')  # Outside constants.js: grows the vocabulary
+        students.append({
+            'id': f'student-{i}',
+            'program': rng.choice(PROGRAMS + ['Undeclared']),
+            'year': rng.randint(1, 5),
+            'interests': interests if i % 11 else None
+        })
+    return students
+
+
+def _opportunities(rng, n, students):
+    custom = [i for s in students for i in (s['interests'] or []) if i.startswith('Custom')]
+    opportunities = [{}]  # Open to all
+    for _ in range(n):
+        opportunities.append({
+            'target_programs': rng.sample(PROGRAMS, rng.randint(0, 3)) + ([ALL_PROGRAMS] if rng.random() < 0.1 else []),
+            'target_years': rng.sample([1, 2, 3, 4, 5], rng.randint(0, 2)),
+            'target_interests': rng.sample(INTERESTS + custom, rng.randint(0, 3)) or None
+        })
+    return opportunities
+
+
+def test_scores_match_the_original_rules():
+    rng = random.Random(7)
+    students = _students(rng, 300)
+    opportunities = _opportunities(rng, 60, students)
+    engine = ScoringEngine()
+    engine.load(students)
+
+    scores = engine.score_batch(opportunities, chunk_size=16)
+    for o, opportunity in enumerate(opportunities):
+        expected = [_old_score(opportunity, student) for student in students]
+        assert scores[o].tolist() == expected, opportunity
+
+
+def test_many_interests_span_several_mask_words():
+    students = [{'id': i, 'program': 'Law', 'year': 2, 'interests': [f'tag {i}']} for i in range(150)]
+    engine = ScoringEngine()
+    engine.load(students)
+    assert engine.interest_masks.shape[1] > 1
+
+    opportunity = {'target_programs': ['Nursing'], 'target_years': [4], 'target_interests': ['tag 140']}
+    scores = engine.score(opportunity)
+    assert scores.tolist() == [_old_score(opportunity, s) for s in students]
+    assert [s['id'] for s, _ in engine.top_matches(opportunity)] == [140]
+
+
+def test_top_matches_keep_the_threshold_and_rank_by_score():
+    rng = random.Random(3)
+    students = _students(rng, 100)
+    opportunity = {'target_programs': ['Computer Science'], 'target_years': [3], 'target_interests': ['Coding']}
+    engine = ScoringEngine()
+    engine.load(students)
+
+    top = engine.top_matches(opportunity, limit=15)
+    scores = [score for _, score in top]
+    assert scores == sorted(scores, reverse=True)
+    assert all(score >= MIN_SCORE for score in scores)
+    assert scores == sorted((_old_score(opportunity, s) for s in students
+                             if _old_score(opportunity, s) >= MIN_SCORE), reverse=True)[:15]
+
+
+def test_rule_reasoning_keeps_the_original_wording():
+    student = {'program': 'Law', 'year': 2}
+    assert rule_reasoning(student, {}) == "Open to all students - Law, Year 2"
+    assert rule_reasoning(student, {'target_years': [2]}) == "Matches Law, Year 2"
@@ -0,0 +1,99 @@
+import time
+import random
+import threading
+from worker_pool import OrderedWorkerPool
+
+
+def _collecting_pool(work, **kwargs):
+    published = []
+    pool = OrderedWorkerPool(work, lambda item, result: published.append((item, result)), **kwargs)
+    return pool, published
+
+
+def test_results_publish_in_submission_order():
+    delays = {i: random.Random(i).uniform(0, 0.02) for i in range(40)}
+
+    def work(i):
+        time.sleep(delays[i])
+        return i * i
+
+    pool, published = _collecting_pool(work, workers=8, queue_size=8)
+    acked = []
+    for i in range(40):
+        pool.submit(i, on_published=lambda i=i: acked.append(i))
+    pool.close()
+
+    assert published == [(i, i * i) for i in range(40)]
+    assert acked == list(range(40))
+    assert pool.completed == 40
+
+
+def test_slow_work_is_replaced_by_the_timeout_result():
+    release = threading.Event()
+
+    def work(item):
+        if item == 'slow':
+            release.wait(5)
+        return f"{item} done"
+
+    pool, published = _collecting_pool(work, workers=2, timeout=0.1, on_timeout=lambda item: f"{item} timed out")
+    for item in ('fast', 'slow', 'after'):
+        pool.submit(item)
+    assert pool.drain(timeout=5)
+    release.set()
+    pool.close()
+
+    assert published == [('fast', 'fast done'), ('slow', 'slow timed out'), ('after', 'after done')]
+    assert pool.timed_out == 1
+
+
+def test_timeout_counts_from_when_work_starts():
+    # One worker: the second item waits 0.2s in the queue, but only runs 0.2s itself
+    def work(item):
+        time.sleep(0.2)
+        return item
+
+    pool, published = _collecting_pool(work, workers=1, timeout=0.35, on_timeout=lambda item: None)
+    pool.submit('a')
+    pool.submit('b')
+    pool.close()
+
+    assert published == [('a', 'a'), ('b', 'b')]
+    assert pool.timed_out == 0
+
+
+def test_barrier_runs_after_earlier_items_and_failures_do_not_stall():
+    def work(item):
+        if item == 2:
+            raise ValueError("boom")
+        time.sleep(0.01 * (5 - item))
+        return item
+
+    pool, published = _collecting_pool(work, workers=4)
+    seen_at_barrier = []
+    for i in range(5):
+        pool.submit(i)
+    pool.barrier(lambda: seen_at_barrier.extend(published))
+    pool.submit(5)
+    pool.close()
+
+    assert seen_at_barrier == [(0, 0), (1, 1), (3, 3), (4, 4)]
+    assert published[-1] == (5, 5)
+    assert len(pool) == 0
+
+
+def test_submit_blocks_while_the_pool_is_full():
+    release = threading.Event()
+    pool, published = _collecting_pool(lambda item: release.wait(5), workers=1, queue_size=2)
+    pool.submit(0)
+    pool.submit(1)
+
+    blocked = threading.Thread(target=pool.submit, args=(2,))
+    blocked.start()
+    blocked.join(0.1)
+    assert blocked.is_alive()
+
+    release.set()
+    blocked.join(5)
+    pool.close()
+    assert [item for item, _ in published] == [0, 1, 2]
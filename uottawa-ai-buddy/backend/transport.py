@@ -0,0 +1,231 @@
+"""
+TRANSPORT - Push-based publish/subscribe between agents
+EVENT_TRANSPORT selects the backend: 'local' (durable event log plus a
+unix-socket doorbell, single node) or 'solace' (Solace PubSub+ broker).
+Subscribers get a callback per event instead of polling on a timer
+"""
+
+import os
+import socket
+import functools
+import threading
+from dotenv import load_dotenv
+from event_log import event_log, encode_event, decode_event
+
+load_dotenv()
+
+EVENT_TRANSPORT = os.getenv('EVENT_TRANSPORT', 'local')
+# Local subscribers re-check the log this often even if no doorbell arrives
+LOCAL_WAKEUP_TIMEOUT = float(os.getenv('LOCAL_WAKEUP_TIMEOUT', '1.0'))
+
+DOORBELL_SUFFIX = '.sock'
+
+
+class Subscription:
+    """Handle returned by subscribe(); wait() blocks until close()"""
+
+    def __init__(self, on_close):
+        self._on_close = on_close
+        self._closed = threading.Event()
+
+    def wait(self, timeout=None):
+        return self._closed.wait(timeout)
+
+    def close(self):
+        if not self._closed.is_set():
+            self._closed.set()
+            self._on_close()
+
+
+class LocalTransport:
+    """
+    Events are appended to the durable event log; every subscriber binds a
+    datagram socket in the topic directory and publishers ring all of them
+    after an append, so delivery takes milliseconds even across processes.
+    The log stays the source of truth: a lost doorbell only delays delivery
+    until the next wakeup timeout.
+    """
+
+    def __init__(self, log=event_log, wakeup_timeout=LOCAL_WAKEUP_TIMEOUT):
+        self.log = log
+        self.wakeup_timeout = wakeup_timeout
+        self._ring_socket = None
+        self._lock = threading.Lock()
+
+    def _doorbell_dir(self, topic):
+        path = os.path.join(self.log.topic(topic).path, 'doorbells')
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def publish(self, topic, event):
+        """Append an event and wake subscribers; returns its offset"""
+        offset = self.log.publish(topic, event)
+        self._ring(topic)
+        return offset
+
+    def _ring(self, topic):
+        if not hasattr(socket, 'AF_UNIX'):
+            return
+        directory = self._doorbell_dir(topic)
+        with self._lock:
+            if self._ring_socket is None:
+                self._ring_socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+                self._ring_socket.setblocking(False)
+            for name in os.listdir(directory):
+                if not name.endswith(DOORBELL_SUFFIX):
+                    continue
+                path = os.path.join(directory, name)
+                try:
+                    self._ring_socket.sendto(b'\x01', path)
+                except (ConnectionRefusedError, FileNotFoundError):
+                    # Subscriber died without cleaning up
+                    try:
+                        os.unlink(path)
+                    except FileNotFoundError:
+                        pass
+                except (BlockingIOError, OSError):
+                    pass  # Its buffer is full: it has a wakeup pending already
+
+    def _bind_doorbell(self, topic, group):
+        if not hasattr(socket, 'AF_UNIX'):
+            return None, None
+        path = os.path.join(self._doorbell_dir(topic), f"{group}.{os.getpid()}.{id(self)}{DOORBELL_SUFFIX}")
+        doorbell = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        try:
+            if os.path.exists(path):
+                os.unlink(path)
+            doorbell.bind(path)
+        except OSError as e:
+            # e.g. path longer than the AF_UNIX limit: fall back to timed checks
+            print(f" Doorbell unavailable for {topic} ({e}); polling every {self.wakeup_timeout}s")
+            doorbell.close()
+            return None, None
+        return doorbell, path
+
+    def subscribe(self, topic, group, callback, max_records=100, manual_ack=False):
+        """
+        Deliver every event of topic to callback(event) on a background thread.
+        With manual_ack the callback is called as callback(event, ack) and the
+        offset is committed when ack() is called (acks must come in order)
+        """
+        consumer = self.log.consumer(group, topic)
+        if consumer.lag():
+            print(f" Resuming {topic} at offset {consumer.committed} ({consumer.lag()} pending events)")
+
+        doorbell, doorbell_path = self._bind_doorbell(topic, group)
+        stop = threading.Event()
+
+        def run():
+            while not stop.is_set():
+                events = consumer.poll(max_records)
+                for offset, event in events:
+                    try:
+                        if manual_ack:
+                            callback(event, functools.partial(consumer.commit, offset))
+                        else:
+                            callback(event)
+                    except Exception as e:
+                        print(f" Error handling {topic} event at offset {offset}: {e}")
+                    # Commit after the callback so a crash never drops an event
+                    if not manual_ack:
+                        consumer.commit(offset)
+                if not events:
+                    self._wait(doorbell, stop)
+
+        thread = threading.Thread(target=run, name=f"subscriber-{topic}-{group}", daemon=True)
+
+        def close():
+            stop.set()
+            if doorbell_path:
+                self._ring(topic)
+            thread.join(timeout=5)
+            if doorbell:
+                doorbell.close()
+                try:
+                    os.unlink(doorbell_path)
+                except FileNotFoundError:
+                    pass
+
+        thread.start()
+        return Subscription(close)
+
+    def _wait(self, doorbell, stop):
+        if doorbell is None:
+            stop.wait(self.wakeup_timeout)
+            return
+        doorbell.settimeout(self.wakeup_timeout)
+        try:
+            doorbell.recv(64)
+        except socket.timeout:
+            return
+        # Several publishes may have rung while we were busy: one poll covers them
+        doorbell.setblocking(False)
+        try:
+            while doorbell.recv(64):
+                pass
+        except (BlockingIOError, OSError):
+            pass
+
+    def close(self):
+        with self._lock:
+            if self._ring_socket:
+                self._ring_socket.close()
+                self._ring_socket = None
+
+
+class SolaceTransport:
+    """Solace PubSub+ direct messaging; groups map to shared subscriptions"""
+
+    def __init__(self):
+        import solace_config  # Only needed (and installed) for this backend
+        self._solace = solace_config
+        self.service = solace_config.get_messaging_service()
+        self._publishers = {}
+        self._lock = threading.Lock()
+
+    def publish(self, topic, event):
+        with self._lock:
+            if topic not in self._publishers:
+                self._publishers[topic] = self._solace.create_publisher(self.service, topic)
+            publisher = self._publishers[topic]
+        publisher.publish(encode_event(event))
+        return None
+
+    def subscribe(self, topic, group, callback, manual_ack=False):
+        # Direct messages are not redelivered, so there is nothing to acknowledge
+        def on_payload(payload):
+            try:
+                if manual_ack:
+                    callback(decode_event(payload), lambda: None)
+                else:
+                    callback(decode_event(payload))
+            except Exception as e:
+                print(f" Error handling {topic} event: {e}")
+
+        receiver = self._solace.create_receiver(self.service, topic, on_payload, group=group)
+        return Subscription(receiver.terminate)
+
+    def close(self):
+        with self._lock:
+            for publisher in self._publishers.values():
+                publisher.terminate()
+            self._publishers = {}
+        self.service.disconnect()
+
+
+_transport = None
+_transport_lock = threading.Lock()
+
+
+def get_transport():
+    """Shared transport for this process, created on first use"""
+    global _transport
+    with _transport_lock:
+        if _transport is None:
+            if EVENT_TRANSPORT == 'solace':
+                _transport = SolaceTransport()
+            elif EVENT_TRANSPORT == 'local':
+                _transport = LocalTransport()
+            else:
+                raise ValueError(f"Unknown EVENT_TRANSPORT: {EVENT_TRANSPORT}")
+        return _transport
@@ -0,0 +1,112 @@
+"""
+WORKER POOL - Bounded concurrent processing with in-order publication
+Work items run on a fixed number of threads; results are handed to the
+publish step strictly in submission order, so downstream consumers (and
+committed event offsets) see the same sequence as the sequential loop
+"""
+
+import time
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+
+class _Entry:
+    def __init__(self, item, on_published):
+        self.item = item
+        self.on_published = on_published
+        self.future = None
+        self.started = threading.Event()
+        self.start_time = None
+
+
+class OrderedWorkerPool:
+    """
+    work(item) runs concurrently on `workers` threads; publish(item, result)
+    runs on a single thread in submission order. At most queue_size items
+    are in flight: submit() blocks beyond that (backpressure).
+    When work takes longer than timeout seconds after it started,
+    on_timeout(item) provides the result instead (the late result is dropped).
+    """
+
+    def __init__(self, work, publish, workers=4, queue_size=16, timeout=None, on_timeout=None, name='worker'):
+        self.work = work
+        self.publish = publish
+        self.timeout = timeout
+        self.on_timeout = on_timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+        self._slots = threading.BoundedSemaphore(max(queue_size, workers))
+        self._ordered = queue.Queue()
+        self._idle = threading.Condition()
+        self._in_flight = 0
+        self.completed = 0
+        self.timed_out = 0
+        self._publisher = threading.Thread(target=self._publish_loop, name=f"{name}-publisher", daemon=True)
+        self._publisher.start()
+
+    def _run(self, entry):
+        entry.start_time = time.time()
+        entry.started.set()
+        return self.work(entry.item)
+
+    def submit(self, item, on_published=None):
+        """Queue an item; blocks while the pool is full"""
+        self._slots.acquire()
+        entry = _Entry(item, on_published)
+        with self._idle:
+            self._in_flight += 1
+        entry.future = self._executor.submit(self._run, entry)
+        self._ordered.put(entry)
+
+    def barrier(self, callback):
+        """Run callback on the publish thread once everything submitted before it is published"""
+        self._slots.acquire()
+        entry = _Entry(None, callback)
+        entry.started.set()
+        with self._idle:
+            self._in_flight += 1
+        self._ordered.put(entry)
+
+    def _result(self, entry):
+        entry.started.wait()
+        if self.timeout is None:
+            return entry.future.result()
+        try:
+            return entry.future.result(timeout=max(0, entry.start_time + self.timeout - time.time()))
+        except FutureTimeout:
+            self.timed_out += 1
+            return self.on_timeout(entry.item) if self.on_timeout else None
+
+    def _publish_loop(self):
+        while True:
+            entry = self._ordered.get()
+            if entry is None:
+                return
+            try:
+                if entry.future is not None:
+                    result = self._result(entry)
+                    self.publish(entry.item, result)
+                    self.completed += 1
+                if entry.on_published:
+                    entry.on_published()
+            except Exception as e:
+                print(f" Error publishing result: {e}")
+            finally:
+                self._slots.release()
+                with self._idle:
+                    self._in_flight -= 1
+                    self._idle.notify_all()
+
+    def drain(self, timeout=None):
+        """Wait until every submitted item has been published"""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._in_flight == 0, timeout)
+
+    def close(self):
+        self.drain()
+        self._ordered.put(None)
+        self._publisher.join()
+        self._executor.shutdown(wait=False)
+
+    def __len__(self):
+        return self._in_flight
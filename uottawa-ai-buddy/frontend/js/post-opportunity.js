@@ -287,7 +287,8 @@ async function handleSubmit(e) {
             application_link: document.getElementById('application-link')?.value || null,
             amount: document.getElementById('amount')?.value || null,
             
-            created_at: new Date().toISOString()
+            created_at: new Date().toISOString(),
+            updated_at: new Date().toISOString()
         };
         
         console.log('📋 Opportunity data:', opportunityData);